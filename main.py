@@ -1,12 +1,23 @@
 import sys
+import logging
+import multiprocessing
 from PyQt6.QtWidgets import QApplication
+from PyQt6.QtCore import QThreadPool
 from ui.main_window import MainWindow
+from utils import parse_worker, yaml_codec
 
 def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    yaml_codec.log_backend()
+    parse_worker.warm_up()  # 提前启动解析子进程
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
-    sys.exit(app.exec())
+    status = app.exec()
+    # 后台任务在退出前已被取消，等它们结束后再退出，避免在解释器清理对象时发出信号
+    QThreadPool.globalInstance().waitForDone()
+    sys.exit(status)
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     main()
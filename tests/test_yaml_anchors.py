@@ -0,0 +1,95 @@
+"""锚点和别名的往返测试：导出保留锚点，经过别名的修改只替换锚点处的原文"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import yaml_codec
+from utils.yaml_stream import YamlStream
+
+TEXT = (
+    '# 注释\n'
+    'base: &v 1  # 锚点\n'
+    'copy: *v\n'
+    'shared: &m {k: x}\n'
+    'other: *m\n'
+    'items: [&s hi, *s, 2]\n'
+)
+
+
+def parsed_stream(text):
+    stream = YamlStream(text)
+    stream.documents[0].parse()
+    return stream
+
+
+class DumpTest(unittest.TestCase):
+    def test_dump_keeps_container_and_scalar_anchors(self):
+        doc = parsed_stream(TEXT).documents[0]
+        text = yaml_codec.dump(doc.data, anchors=doc.anchor_names(), sort_keys=False)
+        self.assertIn('base: &v 1', text)
+        self.assertIn('copy: *v', text)
+        self.assertIn('*m', text)
+        self.assertIn('- &s hi', text)
+        self.assertIn('- *s', text)
+        self.assertEqual(yaml_codec.load(text), doc.data)
+        # 导出期间临时替换的值已还原
+        self.assertEqual(doc.data['copy'], 1)
+
+    def test_changed_alias_is_dumped_as_value(self):
+        doc = parsed_stream(TEXT).documents[0]
+        doc.data['copy'] = 5
+        text = yaml_codec.dump(doc.data, anchors=doc.anchor_names(), sort_keys=False)
+        self.assertIn('copy: 5', text)
+        self.assertEqual(yaml_codec.load(text), doc.data)
+
+    def test_rewrite_round_trip(self):
+        stream = parsed_stream(TEXT)
+        data = stream.documents[0].data
+        text = stream.rewrite()
+        again = parsed_stream(text).documents[0]
+        self.assertEqual(again.data, data)
+        self.assertEqual(again.scalar_anchors, stream.documents[0].scalar_anchors)
+
+
+class PatchTest(unittest.TestCase):
+    def patch(self, path, value):
+        stream = parsed_stream(TEXT)
+        start, end, flow = stream.source_span(0, path)
+        replacement = yaml_codec.dump_scalar(value, flow=flow)
+        text = TEXT[:start] + replacement + TEXT[end:]
+        stream.patch(0, path, replacement)
+        self.assertEqual(stream.documents[0].text, text)
+        return text
+
+    def test_anchored_scalar_span_excludes_anchor(self):
+        stream = parsed_stream(TEXT)
+        start, end, _ = stream.source_span(0, ('base',))
+        self.assertEqual(TEXT[start:end], '1')
+
+    def test_patch_through_scalar_alias(self):
+        text = self.patch(('copy',), 7)
+        self.assertIn('# 注释', text)
+        self.assertIn('base: &v 7  # 锚点', text)
+        self.assertIn('copy: *v', text)
+        self.assertEqual(yaml_codec.load(text)['copy'], 7)
+
+    def test_patch_through_container_alias(self):
+        text = self.patch(('other', 'k'), 'y')
+        self.assertIn('shared: &m {k: y}', text)
+        self.assertEqual(yaml_codec.load(text)['other'], {'k': 'y'})
+
+    def test_patch_alias_in_same_list(self):
+        text = self.patch(('items', 1), 'yo')
+        self.assertIn('items: [&s yo, *s, 2]', text)
+
+    def test_set_shared_scalar_updates_every_alias(self):
+        doc = parsed_stream(TEXT).documents[0]
+        doc.data['copy'] = 9
+        self.assertTrue(doc.set_shared_scalar(('copy',), 1, 9))
+        self.assertEqual((doc.data['base'], doc.data['copy']), (9, 9))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,7 +3,8 @@ from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel,
 from PyQt6.QtCore import Qt, pyqtSignal
 
 class FindDialog(QDialog):
-    findNext = pyqtSignal(str, bool, bool)  # 文本, 是否区分大小写, 是否向上搜索
+    findNext = pyqtSignal(str, bool, bool, bool)  # 文本, 是否区分大小写, 是否向上搜索, 是否为正则表达式
+    searchChanged = pyqtSignal(str, bool, bool)  # 查找条件改变（边输入边查找）: 文本, 是否区分大小写, 是否为正则表达式
     
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -26,13 +27,22 @@ class FindDialog(QDialog):
         options_layout = QVBoxLayout(options_group)
         
         self.case_sensitive = QCheckBox("区分大小写")
+        self.case_sensitive.toggled.connect(self.search_changed)
         options_layout.addWidget(self.case_sensitive)
         
         self.search_up = QCheckBox("向上搜索")
         options_layout.addWidget(self.search_up)
         
+        self.use_regex = QCheckBox("正则表达式")
+        self.use_regex.toggled.connect(self.search_changed)
+        options_layout.addWidget(self.use_regex)
+        
         layout.addWidget(options_group)
         
+        # 匹配计数
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+        
         # 按钮
         button_layout = QHBoxLayout()
         
@@ -50,24 +60,34 @@ class FindDialog(QDialog):
     def validate_input(self, text):
         """验证输入，启用/禁用查找按钮"""
         self.find_button.setEnabled(bool(text))
+        self.search_changed()
+    
+    def search_changed(self):
+        """查找内容或选项改变，发送边输入边查找的信号"""
+        self.searchChanged.emit(self.find_edit.text(), self.case_sensitive.isChecked(),
+                                self.use_regex.isChecked())
     
     def find_clicked(self):
         """发送查找信号"""
         text = self.find_edit.text()
         case_sensitive = self.case_sensitive.isChecked()
         search_up = self.search_up.isChecked()
-        self.findNext.emit(text, case_sensitive, search_up)
+        self.findNext.emit(text, case_sensitive, search_up, self.use_regex.isChecked())
     
     def set_find_text(self, text):
         """设置查找文本"""
         self.find_edit.setText(text)
         self.find_edit.selectAll()
         self.find_edit.setFocus()
+    
+    def set_status(self, text):
+        """显示匹配计数等查找结果"""
+        self.status_label.setText(text)
 
 class ReplaceDialog(QDialog):
-    findNext = pyqtSignal(str, bool, bool)  # 文本, 是否区分大小写, 是否向上搜索
-    replace = pyqtSignal(str)  # 替换文本
-    replaceAll = pyqtSignal(str, str, bool)  # 查找文本, 替换文本, 是否区分大小写
+    findNext = pyqtSignal(str, bool, bool, bool)  # 文本, 是否区分大小写, 是否向上搜索, 是否为正则表达式
+    replace = pyqtSignal(str, str, bool, bool)  # 查找文本, 替换文本, 是否区分大小写, 是否为正则表达式
+    replaceAll = pyqtSignal(str, str, bool, bool)  # 查找文本, 替换文本, 是否区分大小写, 是否为正则表达式
     
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -102,8 +122,15 @@ class ReplaceDialog(QDialog):
         self.search_up = QCheckBox("向上搜索")
         options_layout.addWidget(self.search_up)
         
+        self.use_regex = QCheckBox("正则表达式")
+        options_layout.addWidget(self.use_regex)
+        
         layout.addWidget(options_group)
         
+        # 匹配计数
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+        
         # 按钮
         button_layout = QHBoxLayout()
         
@@ -140,21 +167,26 @@ class ReplaceDialog(QDialog):
         text = self.find_edit.text()
         case_sensitive = self.case_sensitive.isChecked()
         search_up = self.search_up.isChecked()
-        self.findNext.emit(text, case_sensitive, search_up)
+        self.findNext.emit(text, case_sensitive, search_up, self.use_regex.isChecked())
     
     def replace_clicked(self):
         """发送替换信号"""
-        self.replace.emit(self.replace_edit.text())
+        self.replace.emit(self.find_edit.text(), self.replace_edit.text(),
+                          self.case_sensitive.isChecked(), self.use_regex.isChecked())
     
     def replace_all_clicked(self):
         """发送全部替换信号"""
         find_text = self.find_edit.text()
         replace_text = self.replace_edit.text()
         case_sensitive = self.case_sensitive.isChecked()
-        self.replaceAll.emit(find_text, replace_text, case_sensitive)
+        self.replaceAll.emit(find_text, replace_text, case_sensitive, self.use_regex.isChecked())
     
     def set_find_text(self, text):
         """设置查找文本"""
         self.find_edit.setText(text)
         self.find_edit.selectAll()
-        self.find_edit.setFocus() 
\ No newline at end of file
+        self.find_edit.setFocus() 
+    
+    def set_status(self, text):
+        """显示匹配计数等查找结果"""
+        self.status_label.setText(text)
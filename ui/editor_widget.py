@@ -1,21 +1,184 @@
 from PyQt6.QtCore import Qt
 from PyQt6.QtWidgets import QWidget, QVBoxLayout, QPlainTextEdit
-from PyQt6.QtGui import QFont, QSyntaxHighlighter, QTextCharFormat
+from PyQt6.QtGui import QFont, QColor, QSyntaxHighlighter, QTextCharFormat
 import re
 
+# 块状态由三部分组成：状态类型、流式集合的嵌套层数、多行结构起始行的缩进。
+# YAML 要求多行结构的后续行比起始行缩进更深，遇到缩进不超过起始行的非空行时
+# 多行结构即告结束，因此输入一个未闭合的引号或括号最多影响到下一个同级的行。
+STATE_NORMAL = 0
+STATE_BLOCK_SCALAR = 1  # | 或 > 之后的块标量内容
+STATE_DOUBLE_QUOTED = 2  # 跨行的双引号字符串
+STATE_SINGLE_QUOTED = 3  # 跨行的单引号字符串
+_KIND_MASK = 0x7
+_DEPTH_SHIFT = 3
+_DEPTH_MASK = 0xFF
+_INDENT_SHIFT = 11
+_INDENT_MASK = 0xFFFFF
+
+
+def _pack_state(kind, depth=0, indent=0):
+    return (kind | min(depth, _DEPTH_MASK) << _DEPTH_SHIFT
+            | min(indent, _INDENT_MASK) << _INDENT_SHIFT)
+
+# 一行中的所有记号用一个正则一次扫描完成，按分组名区分记号类型
+_TOKEN_RE = re.compile(r'''
+    (?P<comment>\#.*)
+  | (?P<key>(?P<keytext>"(?:[^"\\]|\\.)*"|'(?:[^']|'')*'
+        |(?:[^\s\#,\[\]{}&*!|>'"%@`?-]|[?-](?=\S))[^,\[\]{}\#\n]*?)[ \t]*:(?=\s|$|[,\[\]{}]))
+  | (?P<double>"(?:[^"\\]|\\.)*(?P<double_end>"|$))
+  | (?P<single>'(?:[^']|'')*(?P<single_end>'|$))
+  | (?P<anchor>[&*][^\s,\[\]{}]+)
+  | (?P<tag>![^\s,\[\]{}]*)
+  | (?P<block>[|>][-+0-9]*(?=[ \t]*(?:\#.*)?$))
+  | (?P<flow>[\[\]{},])
+  | (?P<indicator>[-?:](?=\s|$))
+  | (?P<word>[^\s,\[\]{}]+)
+''', re.X)
+_DOCUMENT_RE = re.compile(r'(?:---|\.\.\.)(?=\s|$)')
+# 跨行字符串在后续行中的结束位置
+_DOUBLE_END_RE = re.compile(r'(?:[^"\\]|\\.)*"')
+_SINGLE_END_RE = re.compile(r"(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'''[-+]?(?:[0-9][0-9_]*(?:\.[0-9_]*)?(?:[eE][-+]?[0-9]+)?
+    |\.[0-9]+(?:[eE][-+]?[0-9]+)?|0x[0-9a-fA-F_]+|0o[0-7_]+|\.(?:inf|Inf|INF))$
+    |\.(?:nan|NaN|NAN)$''', re.X)
+_KEYWORDS = frozenset([
+    'true', 'True', 'TRUE', 'false', 'False', 'FALSE', 'yes', 'Yes', 'YES',
+    'no', 'No', 'NO', 'on', 'On', 'ON', 'off', 'Off', 'OFF',
+    'null', 'Null', 'NULL', '~',
+])
+
+
+def _char_format(color, bold=False, italic=False):
+    fmt = QTextCharFormat()
+    fmt.setForeground(QColor(color))
+    if bold:
+        fmt.setFontWeight(QFont.Weight.Bold)
+    fmt.setFontItalic(italic)
+    return fmt
+
+
+def syntax_formats():
+    """返回各类记号的字符格式"""
+    return {
+        'key': _char_format("#1a4f8b", bold=True),
+        'string': _char_format("#2e7d32"),
+        'number': _char_format("#b35c00"),
+        'keyword': _char_format(Qt.GlobalColor.blue),
+        'comment': _char_format("#808080", italic=True),
+        'anchor': _char_format("#8e24aa"),
+        'tag': _char_format("#00838f"),
+        'indicator': _char_format("#6d4c41", bold=True),
+        'document': _char_format("#6d4c41", bold=True),
+    }
+
+
+def highlight_line(text, state):
+    """高亮一行文本
+
+    state 是上一行结束时的状态（第一行为 0），返回 ([(起始, 长度, 记号类型), ...], 本行结束时的状态)。
+    缩进为 0 的非空行总是从 STATE_NORMAL 开始，可以作为从文档中间开始高亮的同步点。
+    """
+    kind = state & _KIND_MASK
+    depth = (state >> _DEPTH_SHIFT) & _DEPTH_MASK
+    base = state >> _INDENT_SHIFT
+    indent = len(text) - len(text.lstrip(' '))
+    if kind != STATE_NORMAL or depth:
+        if not text.strip():
+            # 空行不结束任何多行结构
+            ranges = [(0, len(text), 'string')] if kind == STATE_BLOCK_SCALAR and text else []
+            return ranges, state
+        if indent <= base:
+            kind, depth = STATE_NORMAL, 0
+
+    if kind == STATE_BLOCK_SCALAR:
+        return [(0, len(text), 'string')], state
+    ranges = []
+    pos = 0
+    if kind != STATE_NORMAL:
+        end_re = _DOUBLE_END_RE if kind == STATE_DOUBLE_QUOTED else _SINGLE_END_RE
+        match = end_re.match(text)
+        if match is None:
+            return [(0, len(text), 'string')], state
+        pos = match.end()
+        ranges.append((0, pos, 'string'))
+    return ranges, _scan(text, pos, depth, base, indent, ranges)
+
+
+def _scan(text, pos, depth, base, indent, ranges):
+    """从 pos 开始把一行中的记号加入 ranges，返回该行结束时的状态
+
+    depth 是行首所在流式集合的嵌套层数，base 是最外层流式集合起始行的缩进，
+    indent 是本行的缩进。
+    """
+    if pos == 0 and depth == 0:
+        if text.startswith('%'):
+            ranges.append((0, len(text), 'comment'))
+            return STATE_NORMAL
+        match = _DOCUMENT_RE.match(text)
+        if match:
+            ranges.append((0, match.end(), 'document'))
+            pos = match.end()
+
+    next_kind = STATE_NORMAL
+    for match in _TOKEN_RE.finditer(text, pos):
+        group = match.lastgroup
+        start = match.start()
+        if group == 'word':
+            word = match.group()
+            if word in _KEYWORDS:
+                ranges.append((start, len(word), 'keyword'))
+            elif _NUMBER_RE.match(word):
+                ranges.append((start, len(word), 'number'))
+        elif group == 'key':
+            ranges.append((start, match.end('keytext') - start, 'key'))
+            ranges.append((match.end() - 1, 1, 'indicator'))
+        elif group == 'flow':
+            if match.group() in '[{':
+                if depth == 0:
+                    base = indent
+                depth += 1
+            elif match.group() in ']}':
+                depth = max(depth - 1, 0)
+            ranges.append((start, 1, 'indicator'))
+        elif group in ('double', 'single'):
+            ranges.append((start, match.end() - start, 'string'))
+            if not match.group(group + '_end'):
+                next_kind = STATE_DOUBLE_QUOTED if group == 'double' else STATE_SINGLE_QUOTED
+                if depth == 0:
+                    base = indent
+        elif group == 'block':
+            ranges.append((start, match.end() - start, 'indicator'))
+            if depth == 0:
+                return _pack_state(STATE_BLOCK_SCALAR, 0, indent)
+        elif group == 'comment':
+            if start == 0 or text[start - 1] in ' \t':
+                ranges.append((start, len(text) - start, 'comment'))
+                break
+        else:
+            ranges.append((start, match.end() - start, group))
+    if next_kind == STATE_NORMAL and depth == 0:
+        return STATE_NORMAL
+    return _pack_state(next_kind, depth, base)
+
+
 class YamlHighlighter(QSyntaxHighlighter):
+    """YAML 语法高亮
+
+    每个文本块结束时的状态（块标量、跨行字符串、流式集合）保存在块状态中，
+    下一块从该状态继续扫描。编辑后 QSyntaxHighlighter 只重新高亮被修改的块，
+    以及块状态因此发生变化的后续块。
+    """
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.highlighting_rules = []
-        
-        # YAML语法高亮规则
-        keyword_format = QTextCharFormat()
-        keyword_format.setForeground(Qt.GlobalColor.blue)
-        keywords = ['true', 'false', 'null']
-        
-        for word in keywords:
-            pattern = f'\\b{word}\\b'
-            self.highlighting_rules.append((re.compile(pattern), keyword_format))
+        self.formats = syntax_formats()
+
+    def highlightBlock(self, text):
+        ranges, state = highlight_line(text, max(self.previousBlockState(), 0))
+        for start, length, kind in ranges:
+            self.setFormat(start, length, self.formats[kind])
+        self.setCurrentBlockState(state)
+
 
 class YamlEditorWidget(QPlainTextEdit):
     def __init__(self):
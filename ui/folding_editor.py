@@ -0,0 +1,261 @@
+from PyQt6.QtWidgets import QPlainTextEdit, QWidget
+from PyQt6.QtCore import Qt, QEvent, QPointF, QRect, QSize
+from PyQt6.QtGui import QPainter, QColor, QPolygonF, QTextCursor
+from utils.fold_index import FoldIndex
+
+
+class FoldGutter(QWidget):
+    """编辑器左侧的折叠标记栏，绘制和点击都交给编辑器处理"""
+
+    def __init__(self, editor):
+        super().__init__(editor)
+        self.editor = editor
+        self.setCursor(Qt.CursorShape.PointingHandCursor)
+
+    def sizeHint(self):
+        return QSize(self.editor.gutter_width(), 0)
+
+    def paintEvent(self, event):
+        self.editor.paint_gutter(event)
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.MouseButton.LeftButton:
+            self.editor.gutter_clicked(int(event.position().y()))
+
+
+class FoldingTextEdit(QPlainTextEdit):
+    """带折叠标记的文本编辑器
+
+    折叠区域由 FoldIndex 按缩进计算，文本修改时只更新被修改的部分。折叠时把区域内的块
+    设为不可见，QPlainTextEdit 不为不可见的块排版和绘制，折叠后的排版和绘制开销随之减少。
+    """
+    MARKER_COLOR = QColor("#808080")
+    BULK_LINES = 1000
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.folds = FoldIndex([''])
+        self._collapsed = {}  # 已折叠区域的起始行 -> 最后一行
+        self._block_count = self.document().blockCount()
+        self.gutter = FoldGutter(self)
+        self.document().contentsChange.connect(self._on_contents_change)
+        self.updateRequest.connect(self._update_gutter)
+        self.cursorPositionChanged.connect(self._reveal_cursor)
+        self._update_margins()
+
+    # ---- 标记栏 ----
+
+    def gutter_width(self):
+        return self.fontMetrics().height() + 4
+
+    def _update_margins(self):
+        self.setViewportMargins(self.gutter_width(), 0, 0, 0)
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() == QEvent.Type.FontChange:
+            self._update_margins()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        rect = self.contentsRect()
+        self.gutter.setGeometry(QRect(rect.left(), rect.top(), self.gutter_width(), rect.height()))
+
+    def _update_gutter(self, rect, dy):
+        if dy:
+            self.gutter.scroll(0, dy)
+        else:
+            self.gutter.update(0, rect.y(), self.gutter.width(), rect.height())
+
+    def visible_blocks(self, bottom=None):
+        """依次返回视口中可见的块及其在视口中的位置，折叠隐藏的块整段跳过"""
+        if bottom is None:
+            bottom = self.viewport().height()
+        document = self.document()
+        offset = self.contentOffset()
+        block = self.firstVisibleBlock()
+        while block.isValid():
+            if not block.isVisible():
+                block = document.findBlockByNumber(self.next_visible_line(block.blockNumber()))
+                continue
+            rect = self.blockBoundingGeometry(block).translated(offset)
+            if rect.top() > bottom:
+                break
+            yield block, rect
+            block = block.next()
+
+    def paint_gutter(self, event):
+        painter = QPainter(self.gutter)
+        painter.fillRect(event.rect(), self.palette().alternateBase())
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.setBrush(self.MARKER_COLOR)
+        size = self.fontMetrics().height()
+        for block, rect in self.visible_blocks(event.rect().bottom()):
+            line = block.blockNumber()
+            if self.folds.is_fold_start(line) and rect.bottom() >= event.rect().top():
+                self._draw_marker(painter, rect.top(), size, line in self._collapsed)
+
+    def _draw_marker(self, painter, top, size, collapsed):
+        x = 2 + size / 2
+        y = top + size / 2
+        r = size / 4
+        if collapsed:
+            points = [QPointF(x - r / 2, y - r), QPointF(x + r, y), QPointF(x - r / 2, y + r)]
+        else:
+            points = [QPointF(x - r, y - r / 2), QPointF(x + r, y - r / 2), QPointF(x, y + r)]
+        painter.drawPolygon(QPolygonF(points))
+
+    def gutter_clicked(self, y):
+        for block, rect in self.visible_blocks(y):
+            if rect.top() <= y < rect.bottom():
+                line = block.blockNumber()
+                if self.folds.is_fold_start(line):
+                    self.toggle_fold(line)
+                return
+
+    # ---- 折叠 ----
+
+    def is_collapsed(self, line):
+        return line in self._collapsed
+
+    def toggle_fold(self, line):
+        if line in self._collapsed:
+            self.expand(line)
+        else:
+            self.collapse(line)
+
+    def collapse(self, line):
+        """折叠第 line 行的区域"""
+        end = self.folds.fold_end(line)
+        if end <= line or line in self._collapsed:
+            return
+        cursor_line = self.textCursor().blockNumber()
+        self._collapsed[line] = end
+        if line < cursor_line <= end:
+            # 光标不能留在隐藏的块中，移到折叠起始行的末尾
+            cursor = QTextCursor(self.document().findBlockByNumber(line))
+            cursor.movePosition(QTextCursor.MoveOperation.EndOfBlock)
+            self.setTextCursor(cursor)
+        self._set_visible(line + 1, end, False)
+
+    def expand(self, line):
+        """展开第 line 行的区域，区域内已折叠的下级区域保持折叠"""
+        end = self._collapsed.pop(line, None)
+        if end is None:
+            return
+        self._set_visible(line + 1, end, True)
+
+    def expand_all(self):
+        collapsed, self._collapsed = self._collapsed, {}
+        for line, end in collapsed.items():
+            self._set_visible(line + 1, end, True)
+
+    def next_visible_line(self, line):
+        """返回第 line 行之后第一个可见的行"""
+        result = line + 1
+        moved = True
+        while moved:
+            moved = False
+            for start, end in self._collapsed.items():
+                if start < result <= end:
+                    result = end + 1
+                    moved = True
+        return result
+
+    def _set_visible(self, first, last, visible):
+        document = self.document()
+        block = document.findBlockByNumber(first)
+        start = block.position()
+        line = first
+        while block.isValid() and line <= last:
+            if visible and line in self._collapsed:
+                # 仍折叠的下级区域：起始行显示，区域内保持隐藏
+                block.setVisible(True)
+                line = self._collapsed[line] + 1
+                block = document.findBlockByNumber(line)
+                continue
+            block.setVisible(visible)
+            block = block.next()
+            line += 1
+        end = block.position() if block.isValid() else document.characterCount()
+        # 通知排版重新计算这些块的高度
+        document.markContentsDirty(start, end - start)
+        self.viewport().update()
+        self.gutter.update()
+
+    def _reveal_cursor(self):
+        """光标（例如查找结果）进入折叠区域时展开包含它的区域"""
+        line = self.textCursor().blockNumber()
+        if not self._collapsed or self.textCursor().block().isVisible():
+            return
+        for start, end in sorted(self._collapsed.items()):
+            if start < line <= end:
+                self.expand(start)
+
+    # ---- 文本修改 ----
+
+    def _on_contents_change(self, position, removed, added):
+        document = self.document()
+        block = document.findBlock(position)
+        last = document.findBlock(position + added)
+        if not last.isValid():
+            last = document.lastBlock()
+        first = block.blockNumber()
+        count = document.blockCount()
+        delta = count - self._block_count
+        old_count, self._block_count = self._block_count, count
+        new_lines = last.blockNumber() - first + 1
+        removed_lines = new_lines - delta
+
+        lines = None
+        if new_lines > self.BULK_LINES:
+            # 大段替换（如打开文件）时一次取出全部文本比逐块读取快得多
+            text_lines = document.toPlainText().split('\n')
+            if len(text_lines) == count:
+                lines = text_lines[first:first + new_lines]
+        if lines is None:
+            lines = []
+            for _ in range(new_lines):
+                lines.append(block.text())
+                block = block.next()
+
+        if first == 0 and removed_lines >= old_count:
+            # 整个文档被替换，新的块都是可见的
+            self._collapsed = {}
+        else:
+            # 在行首插入以换行结尾的文本（如在折叠起始行前插入新行）时原来的行完整地下移
+            line_kept = (removed == 0 and delta > 0
+                         and document.findBlock(position).position() == position
+                         and document.findBlock(position + added).position() == position + added)
+            self._shift_collapsed(first, removed_lines, delta, line_kept)
+        self.folds.update(first, removed_lines, lines)
+
+        # 缩进变化使折叠区域的范围改变时展开该区域
+        for start, end in list(self._collapsed.items()):
+            if self.folds.fold_end(start) != end:
+                self.expand(start)
+        self.gutter.update()
+
+    def _shift_collapsed(self, first, removed, delta, line_kept=False):
+        """按修改的位置移动已折叠区域的行号，修改落在隐藏部分中的区域被展开
+
+        line_kept 表示修改只是在 first 行之前插入了完整的新行，first 行本身保持不变。
+        """
+        changed_end = first + removed  # 修改前被替换的行之后的第一行
+        collapsed = {}
+        reveal = []
+        for start, end in self._collapsed.items():
+            if end < first:
+                collapsed[start] = end
+            elif start >= changed_end or (start == first and line_kept):
+                collapsed[start + delta] = end + delta
+            elif start == first and changed_end == first + 1:
+                # 只修改了折叠起始行，隐藏的行随之平移
+                collapsed[start] = end + delta
+            else:
+                reveal.append((start, end))
+        self._collapsed = collapsed
+        for start, end in reveal:
+            # 被替换的行已不存在，只需显示修改后仍在原区域中的行
+            self._set_visible(min(start + 1, first), min(end + delta, self._block_count - 1), True)
@@ -0,0 +1,196 @@
+from PyQt6.QtWidgets import (QAbstractScrollArea, QWidget, QVBoxLayout, QHBoxLayout,
+                             QLabel, QLineEdit, QPushButton, QCheckBox)
+from PyQt6.QtCore import Qt, QRect
+from PyQt6.QtGui import QPainter, QColor, QFontDatabase, QIntValidator
+from utils.line_index import LineIndex
+
+
+class LargeFileView(QAbstractScrollArea):
+    """只读文本视图，每次只读取并绘制可见的行"""
+
+    def __init__(self, index, parent=None):
+        super().__init__(parent)
+        self.index = index
+        self.current_line = -1
+        self.match = None  # (行号, 起始列, 结束列)
+        self._content_width = 0
+        self.setFont(QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont))
+        self.setFocusPolicy(Qt.FocusPolicy.StrongFocus)
+        self._update_scrollbars()
+
+    def _line_height(self):
+        return self.fontMetrics().height()
+
+    def _visible_lines(self):
+        return max(1, self.viewport().height() // self._line_height())
+
+    def _gutter_width(self):
+        return self.fontMetrics().horizontalAdvance(str(self.index.line_count)) + 16
+
+    def _update_scrollbars(self):
+        visible = self._visible_lines()
+        vbar = self.verticalScrollBar()
+        vbar.setRange(0, max(0, self.index.line_count - visible))
+        vbar.setPageStep(visible)
+        hbar = self.horizontalScrollBar()
+        text_width = self.viewport().width() - self._gutter_width()
+        hbar.setRange(0, max(0, self._content_width - text_width))
+        hbar.setPageStep(max(1, text_width))
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._update_scrollbars()
+
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        metrics = self.fontMetrics()
+        line_height = self._line_height()
+        gutter = self._gutter_width()
+        first = self.verticalScrollBar().value()
+        lines = self.index.lines(first, self._visible_lines() + 1)
+        x = gutter + 4 - self.horizontalScrollBar().value()
+        width = self.viewport().width()
+        palette = self.palette()
+
+        painter.fillRect(self.viewport().rect(), palette.base())
+        painter.fillRect(QRect(0, 0, gutter, self.viewport().height()), palette.alternateBase())
+        widest = self._content_width
+        for i, text in enumerate(lines):
+            line = first + i
+            y = i * line_height
+            if line == self.current_line:
+                painter.fillRect(QRect(gutter, y, width - gutter, line_height), QColor("#fff3b0"))
+            if self.match and self.match[0] == line:
+                left = metrics.horizontalAdvance(text[:self.match[1]])
+                right = metrics.horizontalAdvance(text[:self.match[2]])
+                painter.fillRect(QRect(x + left, y, max(2, right - left), line_height),
+                                 QColor("#ffcc00"))
+
+            painter.setPen(palette.placeholderText().color())
+            painter.drawText(QRect(0, y, gutter - 8, line_height),
+                             Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter,
+                             str(line + 1))
+            painter.setPen(palette.text().color())
+            painter.setClipRect(QRect(gutter, 0, width - gutter, self.viewport().height()))
+            painter.drawText(x, y + metrics.ascent(), text)
+            painter.setClipping(False)
+            widest = max(widest, metrics.horizontalAdvance(text) + 8)
+        painter.end()
+
+        if widest != self._content_width:
+            self._content_width = widest
+            self._update_scrollbars()
+
+    def goto_line(self, line):
+        """跳转到第 line 行（从 0 开始），并让它显示在视图中间"""
+        line = max(0, min(line, self.index.line_count - 1))
+        self.current_line = line
+        self.verticalScrollBar().setValue(line - self._visible_lines() // 2)
+        self.viewport().update()
+
+    def show_match(self, start, end):
+        """高亮字节范围 [start, end) 的匹配并滚动到该行"""
+        line = self.index.line_at(start)
+        self.match = (line, self.index.column(start), self.index.column(end))
+        self.goto_line(line)
+        # 匹配位于视图右侧之外时水平滚动
+        text = self.index.lines(line, 1)[0]
+        left = self.fontMetrics().horizontalAdvance(text[:self.match[1]])
+        hbar = self.horizontalScrollBar()
+        text_width = self.viewport().width() - self._gutter_width()
+        if not hbar.value() <= left < hbar.value() + text_width - 8:
+            self._content_width = max(self._content_width, left + text_width)
+            self._update_scrollbars()
+            hbar.setValue(max(0, left - text_width // 2))
+
+
+class LargeFileEditor(QWidget):
+    """大文件的只读标签页：文件通过 mmap 打开，支持跳转到行和查找"""
+
+    def __init__(self, file_path, parent=None):
+        super().__init__(parent)
+        self.file_path = file_path
+        self.index = LineIndex(file_path)
+        self._match = None  # 上一次匹配的 (起始, 结束) 字节偏移
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        toolbar = QHBoxLayout()
+        size_mb = self.index.size / (1024 * 1024)
+        toolbar.addWidget(QLabel(f"只读大文件模式  {self.index.line_count:,} 行  {size_mb:,.1f} MB"))
+        toolbar.addStretch()
+
+        toolbar.addWidget(QLabel("跳转到行:"))
+        self.goto_edit = QLineEdit()
+        self.goto_edit.setValidator(QIntValidator(1, max(1, self.index.line_count)))
+        self.goto_edit.setFixedWidth(100)
+        self.goto_edit.returnPressed.connect(self.on_goto)
+        toolbar.addWidget(self.goto_edit)
+
+        toolbar.addWidget(QLabel("查找:"))
+        self.find_edit = QLineEdit()
+        self.find_edit.returnPressed.connect(lambda: self.find_next(False))
+        toolbar.addWidget(self.find_edit)
+        self.case_check = QCheckBox("区分大小写")
+        toolbar.addWidget(self.case_check)
+        prev_btn = QPushButton("上一个")
+        prev_btn.clicked.connect(lambda: self.find_next(True))
+        toolbar.addWidget(prev_btn)
+        next_btn = QPushButton("下一个")
+        next_btn.clicked.connect(lambda: self.find_next(False))
+        toolbar.addWidget(next_btn)
+        layout.addLayout(toolbar)
+
+        self.status_label = QLabel()
+        self.view = LargeFileView(self.index, self)
+        layout.addWidget(self.view)
+        layout.addWidget(self.status_label)
+
+    def on_goto(self):
+        """跳转到输入的行号"""
+        text = self.goto_edit.text()
+        if text:
+            self._match = None  # 之后的查找从这一行开始
+            self.view.match = None
+            self.view.goto_line(int(text) - 1)
+            self.view.setFocus()
+
+    def find_next(self, search_up):
+        """用工具栏中的内容查找下一个或上一个匹配"""
+        text = self.find_edit.text()
+        if text and not self.find(text, self.case_check.isChecked(), search_up):
+            self.status_label.setText("找不到指定内容")
+
+    def find(self, text, case_sensitive, search_up):
+        """从上一次匹配处继续查找，到达文件首尾时从另一端重新开始，返回是否找到"""
+        if self._match is not None:
+            offset = self._match[0] if search_up else self._match[1]
+        else:
+            line = max(self.view.current_line, 0)
+            offset = self.index.line_offset(line)
+        match = self.index.find(text, offset, case_sensitive, search_up)
+        if match is None:
+            match = self.index.find(text, self.index.size if search_up else 0,
+                                    case_sensitive, search_up)
+        if match is None:
+            return False
+        self._match = match
+        self.view.show_match(*match)
+        self.status_label.setText(f"第 {self.view.current_line + 1:,} 行")
+        return True
+
+    def close_file(self):
+        """关闭标签页时释放文件映射"""
+        self.index.close()
+
+    def toPlainText(self):
+        """只读视图不提供完整文本，避免把整个文件读入内存"""
+        raise ValueError("大文件模式下无法获取完整文本")
+
+    def document(self):
+        """提供与编辑器一致的 document().isModified() 接口"""
+        return self
+
+    def isModified(self):
+        return False
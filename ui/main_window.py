@@ -3,18 +3,36 @@ from PyQt6.QtWidgets import (QMainWindow, QToolBar, QMenuBar,
                              QWidget, QTabWidget, QComboBox, QTabBar, QMenu,
                              QDialog, QLabel, QLineEdit, QDialogButtonBox,
                              QPushButton, QHBoxLayout, QCompleter, QTreeWidget, QTreeWidgetItem,
-                             QPlainTextEdit, QSplitter, QStackedWidget, QTextBrowser, QApplication)
-from PyQt6.QtCore import Qt, QStringListModel, QTimer, QPoint, QSize, QSortFilterProxyModel
+                             QSplitter, QStackedWidget, QTextBrowser, QApplication,
+                             QInputDialog)
+from PyQt6.QtCore import Qt, QStringListModel, QTimer, QPoint, QSize, \
+    QModelIndex, QThreadPool, pyqtSignal
 from PyQt6.QtGui import QKeySequence, QShortcut, QAction, QImage, QPainter, QPen, QColor, QPolygon, QActionGroup, \
-    QTextDocument, QTextCursor, QTextCharFormat, QIcon, QFont, QPalette
+    QTextCursor, QIcon, QFont, QPalette
 import os
+import re
 import json
 import shutil
 from .editor_widget import YamlEditorWidget
 from .yaml_editor_widget import YamlEditorWidget
 from .dialogs import FindDialog, ReplaceDialog
+from .parse_scheduler import ParseScheduler
+from .large_file_view import LargeFileEditor
+from .viewport_highlighter import ViewportHighlighter
+from .folding_editor import FoldingTextEdit
+from .search_scheduler import SearchScheduler
+from .workspace_panel import WorkspacePanel
+from .template_catalog import TemplateCatalog
+from .template_results import TemplateResultsModel, TemplateIndexTask
+from utils import disk_cache, text_search, yaml_codec, yaml_query
+from utils.template_search import TemplateKeyCache, display_name
+from utils.template_store import TemplateStore
 
 class SearchComboBox(QComboBox):
+    searchChanged = pyqtSignal(str)  # 输入停顿后的查找内容
+    
+    SEARCH_DELAY_MS = 150  # 输入停顿多久后再查找（毫秒）
+    
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setEditable(True)
@@ -26,18 +44,18 @@ class SearchComboBox(QComboBox):
         # 设置占位符文本
         self.lineEdit().setPlaceholderText("搜索模板...")
         
-        # 当文本改变时触发搜索
-        self.lineEdit().textChanged.connect(self.on_text_changed)
+        # 不使用自带的行内补全，查找结果由主窗口的补全列表显示
+        self.setCompleter(None)
+        
+        # 用户输入停顿后才触发查找
+        self._search_timer = QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(self.SEARCH_DELAY_MS)
+        self._search_timer.timeout.connect(lambda: self.searchChanged.emit(self.currentText()))
+        self.lineEdit().textEdited.connect(lambda _: self._search_timer.start())
         
         # 初始状态
         self.setCurrentText("")
-    
-    def on_text_changed(self, text):
-        """当输入文本改变时"""
-        self.setEditable(True)
-        self.qsmodel = QSortFilterProxyModel(self)
-        self.qsmodel.setSourceModel(self.model())
-
 
     def focusInEvent(self, event):
         """当获得焦点时"""
@@ -288,6 +306,13 @@ class ManageTemplatesDialog(QDialog):
         
         layout = QVBoxLayout(self)
         
+        # 按名称、描述和模板内容查找
+        self.search_edit = QLineEdit(self)
+        self.search_edit.setPlaceholderText("搜索用户模板（名称、描述和内容）")
+        self.search_edit.setClearButtonEnabled(True)
+        self.search_edit.textChanged.connect(self.load_templates)
+        layout.addWidget(self.search_edit)
+        
         # 创建树形视图显示模板
         self.tree = QTreeWidget(self)
         self.tree.setHeaderLabels(["模板名称", "路径"])
@@ -322,10 +347,11 @@ class ManageTemplatesDialog(QDialog):
         
         # 创建分类节点
         categories = {}
+        query = self.search_edit.text().strip()
         
         # 加载内置模板
         for template in self.main_window.template_list:
-            if not template.startswith('user/'):
+            if not template.startswith('user/') and query.lower() in template.lower():
                 category = os.path.dirname(template)
                 if not category:
                     category = "未分类"
@@ -336,14 +362,12 @@ class ManageTemplatesDialog(QDialog):
                 template_name = os.path.basename(template).replace('.yaml', '')
                 QTreeWidgetItem(categories[category], [template_name, template])
         
-        # 加载用户模板
-        if hasattr(self.main_window, 'user_templates'):
-            for category, templates in self.main_window.user_templates.items():
-                if category not in categories:
-                    categories[category] = QTreeWidgetItem(self.tree, [category])
-                
-                for name, info in templates.items():
-                    QTreeWidgetItem(categories[category], [name, f"user/{info['path']}"])
+        # 加载用户模板（有查询时按相关程度排列）
+        store = self.main_window.template_store
+        for category, name, path, _ in (store.search(query) if query else store.templates()):
+            if category not in categories:
+                categories[category] = QTreeWidgetItem(self.tree, [category])
+            QTreeWidgetItem(categories[category], [name, f"user/{path}"])
         
         self.tree.expandAll()
     
@@ -377,18 +401,12 @@ class ManageTemplatesDialog(QDialog):
                                        template_path[5:])  # 移除 'user/' 前缀
                 if os.path.exists(full_path):
                     os.remove(full_path)
+                self.main_window.template_catalog.update_directory(os.path.dirname(full_path))
                 
-                # 从配置中删除
+                # 从模板目录中删除
                 category = current_item.parent().text(0)
                 template_name = current_item.text(0)
-                if category in self.main_window.user_templates:
-                    if template_name in self.main_window.user_templates[category]:
-                        del self.main_window.user_templates[category][template_name]
-                        if not self.main_window.user_templates[category]:
-                            del self.main_window.user_templates[category]
-                
-                # 保存配置
-                self.main_window.save_user_template_config()
+                self.main_window.template_store.remove(category, template_name)
                 
                 # 重新加载模板
                 self.main_window.load_templates()
@@ -410,8 +428,8 @@ class ManageTemplatesDialog(QDialog):
             QMessageBox.warning(self, "警告", "只能重命名用户自定义模板")
             return
         
-        new_name, ok = QLineEdit.getText(self, '重命名模板',
-                                       '输入新名称:', text=current_item.text(0))
+        new_name, ok = QInputDialog.getText(self, '重命名模板',
+                                          '输入新名称:', text=current_item.text(0))
         
         if ok and new_name:
             try:
@@ -428,17 +446,12 @@ class ManageTemplatesDialog(QDialog):
                     raise Exception("该名称已存在")
                 
                 os.rename(old_path, new_path)
+                self.main_window.template_catalog.update_directory(os.path.dirname(new_path))
                 
-                # 更新配置
-                template_info = self.main_window.user_templates[category][old_name]
-                del self.main_window.user_templates[category][old_name]
-                self.main_window.user_templates[category][new_name] = {
-                    'path': os.path.relpath(new_path, self.main_window.user_template_dir),
-                    'description': template_info.get('description', '')
-                }
-                
-                # 保存配置
-                self.main_window.save_user_template_config()
+                # 更新模板目录
+                self.main_window.template_store.rename(
+                    category, old_name, new_name,
+                    os.path.relpath(new_path, self.main_window.user_template_dir))
                 
                 # 重新加载模��
                 self.main_window.load_templates()
@@ -463,6 +476,16 @@ class SwitchableEditor(QWidget):
         toolbar.addWidget(QLabel("编辑器视图:"))
         toolbar.addWidget(self.view_combo)
         toolbar.addStretch()
+        
+        # 路径查询栏：回车执行查询，再次回车跳到下一个结果
+        self.query_edit = QLineEdit()
+        self.query_edit.setPlaceholderText('路径查询，如 ..containers[?(@.name=="app")].image')
+        self.query_edit.setClearButtonEnabled(True)
+        self.query_edit.setMinimumWidth(320)
+        self.query_edit.returnPressed.connect(self.run_query)
+        self.query_label = QLabel()
+        toolbar.addWidget(self.query_edit)
+        toolbar.addWidget(self.query_label)
         self.layout.addLayout(toolbar)
         
         # 创建堆叠部件来容纳两种编辑器
@@ -470,7 +493,8 @@ class SwitchableEditor(QWidget):
         self.layout.addWidget(self.stack)
         
         # 创建两种编辑器
-        self.text_editor = QPlainTextEdit()  # 文本编辑器放在前面
+        self.text_editor = FoldingTextEdit()  # 文本编辑器放在前面
+        self.highlighter = ViewportHighlighter(self.text_editor)
         self.tree_editor = YamlEditorWidget()
         
         # 添加到堆叠部件
@@ -479,8 +503,29 @@ class SwitchableEditor(QWidget):
         
         # 连接编辑器的修改信号
         self.tree_editor.tree.contentChanged.connect(self.on_tree_changed)
+        self.tree_editor.tree.valueEdited.connect(self.on_tree_value_edited)
+        self.tree_editor.tree.valuesEdited.connect(self.on_tree_values_edited)
         self.text_editor.textChanged.connect(self.on_text_changed)
         
+        # 文本修改后延迟到后台解析
+        self.parse_scheduler = ParseScheduler(
+            self.text_editor.toPlainText, parent=self,
+            previous_provider=self.tree_editor.tree.tree_model.stream)
+        self.parse_scheduler.parsed.connect(self.on_text_parsed)
+        self.parse_scheduler.failed.connect(self.on_text_parse_failed)
+        self._tree_revision = self.parse_scheduler.revision  # 树形视图对应的文本修订号
+        
+        # 文本快照和上一次查找的结果 (正则表达式, 全部匹配)，文本修改后失效
+        self._text_revision = 0
+        self._snapshot = None
+        self._matches = None
+        self.text_editor.document().contentsChanged.connect(self._on_contents_changed)
+        
+        # 上一次查询的结果 (表达式, [键路径, ...]) 和当前结果的序号，文本修改后失效
+        self._query_results = None
+        self._query_number = -1
+        self._query_pending = False  # 等待后台解析完成后再执行查询
+        
         # 用于防止循环更新
         self._updating = False
     
@@ -491,53 +536,267 @@ class SwitchableEditor(QWidget):
                 self.update_tree_from_text()
                 self.stack.setCurrentWidget(self.tree_editor)
         else:
+            # 树形视图中的修改已经实时同步到文本，无需重新生成
             if self.stack.currentWidget() != self.text_editor:
-                self.update_text_from_tree()
                 self.stack.setCurrentWidget(self.text_editor)
     
     def on_tree_changed(self):
-        """树形编辑器内容改变时更新文本编辑器"""
-        if not self._updating:
+        """树形结构改变时重新生成整个文本（树中还是旧内容时不回写）"""
+        if not self._updating and self.tree_is_current():
             self._updating = True
             self.update_text_from_tree()
             self._updating = False
     
+    def on_tree_value_edited(self, path, value):
+        """树中单个标量被修改：只替换文本中对应的片段，保留撤销历史"""
+        if self._updating or not self.tree_is_current():
+            return
+        model = self.tree_editor.tree.tree_model
+        span = model.source_span(path)
+        if span is None:
+            self.on_tree_changed()
+            return
+        
+        replacement = yaml_codec.dump_scalar(value, flow=span[2])
+        self._updating = True
+        try:
+            cursor = QTextCursor(self.text_editor.document())
+            cursor.setPosition(span[0])
+            cursor.setPosition(span[1], QTextCursor.MoveMode.KeepAnchor)
+            cursor.insertText(replacement)
+            model.patch_source(path, replacement)
+        finally:
+            self._updating = False
+    
+    def on_tree_values_edited(self, edits):
+        """树中一批标量被修改（全部替换）：在文本中一次替换所有对应的片段，可以一步撤销"""
+        if self._updating or not edits or not self.tree_is_current():
+            return
+        model = self.tree_editor.tree.tree_model
+        spans = [model.source_span(path) for path, _ in edits]
+        if any(span is None for span in spans):
+            self.on_tree_changed()
+            return
+        # 锚点处和别名处的标量对应原文中的同一处，只替换一次
+        unique = {}
+        for edit, span in zip(edits, spans):
+            unique.setdefault(span[0], (edit, span))
+        edits = [edit for edit, _ in unique.values()]
+        spans = [span for _, span in unique.values()]
+        
+        replacements = [yaml_codec.dump_scalar(value, flow=span[2])
+                        for (_, value), span in zip(edits, spans)]
+        order = sorted(range(len(edits)), key=lambda i: spans[i][0])
+        text = self.text_snapshot()
+        start = position = spans[order[0]][0]
+        pieces = []
+        for i in order:
+            pieces.append(text[position:spans[i][0]])
+            pieces.append(replacements[i])
+            position = spans[i][1]
+        
+        self._updating = True
+        try:
+            cursor = QTextCursor(self.text_editor.document())
+            cursor.beginEditBlock()
+            cursor.setPosition(start)
+            cursor.setPosition(position, QTextCursor.MoveMode.KeepAnchor)
+            cursor.insertText(''.join(pieces))
+            cursor.endEditBlock()
+            model.patch_sources([(path, replacement)
+                                 for (path, _), replacement in zip(edits, replacements)])
+        finally:
+            self._updating = False
+    
     def on_text_changed(self):
-        """文本编辑器内容改变时更新树形编辑器"""
+        """文本编辑器内容改变时安排后台解析，不在每次按键时重建树"""
         if not self._updating and self.stack.currentWidget() == self.text_editor:
+            self.parse_scheduler.schedule()
+    
+    def on_text_parsed(self, revision, stream):
+        """后台解析完成：仅当树形视图可见时立即刷新，否则等切换时再应用"""
+        self.show_diagnostics(stream=stream)
+        if revision == self._tree_revision:
+            # 文本由树重新生成，只需补充位置表
+            self.tree_editor.tree.tree_model.adopt_spans(stream)
+        elif self.stack.currentWidget() == self.tree_editor:
             self._updating = True
-            self.update_tree_from_text()
+            self.tree_editor.load_stream(stream)
+            self._tree_revision = revision
             self._updating = False
+        self._run_pending_query()
+    
+    def on_text_parse_failed(self, revision, error):
+        """后台解析失败、超时或超出内存上限：树形视图可见时显示提示"""
+        self.show_diagnostics(error=error)
+        if self.stack.currentWidget() == self.tree_editor:
+            self.tree_editor.set_load_error(error)
+        self._run_pending_query()
+    
+    def _run_pending_query(self):
+        if self._query_pending:
+            self._query_pending = False
+            self.run_query()
+    
+    def tree_is_current(self):
+        """树形视图是否已加载当前文本（后台解析未完成或失败时树中是旧内容）"""
+        return self._tree_revision == self.parse_scheduler.revision
+    
+    def show_diagnostics(self, stream=None, error=None):
+        """在文本编辑器中用波浪线标出解析错误的位置"""
+        diagnostics = []
+        if error is not None:
+            location = yaml_codec.error_location(error)
+            if location is not None:
+                diagnostics.append((*location, str(error)))
+        elif stream is not None and stream.is_multi():
+            # 多文档流中已解析的文档，行号相对于文档开头
+            document = self.text_editor.document()
+            for doc in stream.documents:
+                location = yaml_codec.error_location(doc.error) if doc.error else None
+                if location is not None:
+                    first = document.findBlock(doc.start).blockNumber()
+                    diagnostics.append((first + location[0], location[1], str(doc.error)))
+        self.highlighter.set_diagnostics(diagnostics)
+    
+    @property
+    def text_revision(self):
+        """文本编辑器内容的修订号，每次修改递增"""
+        return self._text_revision
+    
+    def text_snapshot(self):
+        """返回文本编辑器内容的快照（不可变，可以交给工作线程），文本未修改时重复使用"""
+        if self._snapshot is None:
+            self._snapshot = self.text_editor.toPlainText()
+        return self._snapshot
+    
+    def find_all(self, pattern):
+        """返回文本中 pattern 的全部匹配，文本和查找内容都没变时直接使用上一次的结果"""
+        if self._matches is None or self._matches[0] != pattern:
+            self._matches = (pattern, text_search.find_all(self.text_snapshot(), pattern))
+        return self._matches[1]
+    
+    def remember_matches(self, revision, pattern, matches):
+        """保存在后台找到的全部匹配，供之后的查找直接使用"""
+        if revision == self._text_revision:
+            self._matches = (pattern, matches)
+    
+    def _on_contents_changed(self):
+        self._text_revision += 1
+        self._snapshot = None
+        self._matches = None
+        self._query_results = None
+    
+    def select_match(self, matches, index):
+        """选中第 index 个匹配并滚动到该处"""
+        start, end = matches.span(index)
+        cursor = QTextCursor(self.text_editor.document())
+        cursor.setPosition(start)
+        cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+        self.text_editor.setTextCursor(cursor)
+    
+    def run_query(self):
+        """执行查询栏中的路径查询并选中第一个结果；查询和文本都没变时跳到下一个结果"""
+        expression = self.query_edit.text().strip()
+        if not expression:
+            self.query_label.clear()
+            return
+        try:
+            query = yaml_query.compile_query(expression)
+        except ValueError as e:
+            self.query_label.setText(f"查询无效: {e}")
+            return
+        
+        if self._query_results is None or self._query_results[0] != expression:
+            # 查询在树形视图的数据上执行，先让它与文本一致
+            self.update_tree_from_text()
+            if not self.tree_is_current():
+                if self.parse_scheduler.result() is None:
+                    self.query_label.setText("正在解析...")
+                    self._query_pending = True
+                else:
+                    self.query_label.setText("文本有语法错误，无法查询")
+                return
+            model = self.tree_editor.tree.tree_model
+            self._query_results = (expression, list(model.query(query)))
+            self._query_number = -1
+        paths = self._query_results[1]
+        if not paths:
+            self.query_label.setText("没有匹配")
+            return
+        self.select_query_result((self._query_number + 1) % len(paths))
+    
+    def select_query_result(self, number):
+        """选中第 number 个查询结果：树形视图中选中对应的行，文本视图中选中对应的文本"""
+        paths = self._query_results[1]
+        path = paths[number]
+        self._query_number = number
+        status = f"第 {number + 1} 个，共 {len(paths)} 个结果"
+        model = self.tree_editor.tree.tree_model
+        if self.stack.currentWidget() == self.tree_editor:
+            self.tree_editor.tree.reveal(model.index_from_path(path))
+        else:
+            region = model.source_region(path)
+            if region is None:
+                status += "（文本中的位置未知）"
+            else:
+                cursor = QTextCursor(self.text_editor.document())
+                cursor.setPosition(region[0])
+                cursor.setPosition(region[1], QTextCursor.MoveMode.KeepAnchor)
+                self.text_editor.setTextCursor(cursor)
+                self.text_editor.centerCursor()
+        self.query_label.setText(status)
     
     def update_tree_from_text(self):
         """从文本更新树形视图"""
         try:
-            text = self.text_editor.toPlainText()
-            self.tree_editor.setPlainText(text)
-
-
+            revision = self.parse_scheduler.revision
+            if revision == self._tree_revision:
+                return  # 树形视图已是最新
+            
+            result = self.parse_scheduler.result()
+            if result is None:
+                # 解析尚未完成：立即在后台开始，完成后由 on_text_parsed 加载，不阻塞界面
+                self.tree_editor.set_pending()
+                self.parse_scheduler.parse_now()
+                return
+            stream, error = result
+            if error is not None:
+                self.tree_editor.set_load_error(error)
+                return
+            self.tree_editor.load_stream(stream)
+            self._tree_revision = revision
         except Exception as e:
             print(f"更新树形视图失败: {str(e)}")
     
     def update_text_from_tree(self):
         """从树形视图更新文本"""
         try:
-            text = self.tree_editor.toPlainText()
+            text = self.tree_editor.rewrite_text()
+            if text is None:
+                return
             self.text_editor.setPlainText(text)
+            self._tree_revision = self.parse_scheduler.reset()
+            # 重新生成的文档位置表已失效，在后台重新解析生成的文本以恢复局部替换
+            self.parse_scheduler.refresh()
         except Exception as e:
             print(f"更新文本视图失败: {str(e)}")
     
     def setPlainText(self, text):
-        """设置编辑器内容"""
+        """设置编辑器内容，立即在后台解析；树形视图在解析完成后加载"""
         self._updating = True
         self.text_editor.setPlainText(text)
-        self.tree_editor.setPlainText(text)
+        self.parse_scheduler.reset()
+        self.tree_editor.set_pending()
+        self.parse_scheduler.parse_now()
         self._updating = False
     
     def toPlainText(self):
-        """获取编辑器内容"""
-        if self.stack.currentWidget() == self.tree_editor:
-            return self.tree_editor.toPlainText()
+        """获取编辑器内容
+
+        树形视图中的修改会立即同步到文本（单个值原地替换，结构变化时整体重新生成），
+        文本编辑器中始终是最新的内容，保存时也不会丢失注释和格式。
+        """
         return self.text_editor.toPlainText()
     
     def document(self):
@@ -546,7 +805,20 @@ class SwitchableEditor(QWidget):
             return self.tree_editor.document()
         return self.text_editor.document()
 
+    def goto_line(self, line):
+        """切换到文本视图并跳转到第 line 行（从 0 开始）"""
+        self.view_combo.setCurrentText("文本视图")
+        block = self.text_editor.document().findBlockByNumber(line)
+        if block.isValid():
+            cursor = QTextCursor(block)
+            self.text_editor.setTextCursor(cursor)
+            self.text_editor.centerCursor()
+        self.text_editor.setFocus()
+
 class MainWindow(QMainWindow):
+    # 超过该大小（MB）的文件以只读大文件模式打开，可在设置中修改
+    LARGE_FILE_THRESHOLD_MB = 50
+
     def __init__(self):
         super().__init__()
         self.app = QApplication.instance()  # 获取应用程序实例
@@ -621,21 +893,21 @@ class MainWindow(QMainWindow):
                 height: 12px;
             }
             
-            QTreeWidget {
+            QTreeView {
                 border: 1px solid #cccccc;
                 border-radius: 3px;
                 background: white;
             }
             
-            QTreeWidget::item {
+            QTreeView::item {
                 height: 24px;
             }
             
-            QTreeWidget::item:hover {
+            QTreeView::item:hover {
                 background: #f0f0f0;
             }
             
-            QTreeWidget::item:selected {
+            QTreeView::item:selected {
                 background: #e5f3ff;
                 color: black;
             }
@@ -746,12 +1018,30 @@ class MainWindow(QMainWindow):
             '.easyyaml', 
             'template_config.json'
         )
+        self.user_template_db = os.path.join(
+            os.path.expanduser('~'), 
+            '.easyyaml', 
+            'templates.sqlite'
+        )
+        self.settings_path = os.path.join(
+            os.path.expanduser('~'), 
+            '.easyyaml', 
+            'settings.json'
+        )
         
         # 确保用户模板目录存在
         os.makedirs(self.user_template_dir, exist_ok=True)
         
+        # 模板目录索引：启动时只检查目录的修改时间，之后由文件系统通知增量更新
+        self.template_catalog = TemplateCatalog(
+            [('', self.template_dir), ('user/', self.user_template_dir)],
+            os.path.join(os.path.expanduser('~'), '.easyyaml', 'template_catalog.json'),
+            parent=self)
+        self.template_catalog.changed.connect(self.load_templates)
+        
         # 加载用户模板配置
         self.load_user_template_config()
+        self.load_settings()
         
         # 初始化中心部件
         self.central_widget = QWidget()
@@ -762,6 +1052,20 @@ class MainWindow(QMainWindow):
         self.search_box = SearchComboBox()
         self.layout.addWidget(self.search_box)
         
+        # 模板查找：索引在后台建立，结果通过代理模型显示在补全列表中
+        self.template_index = None
+        self._template_index_task = None
+        self._template_index_pending = False
+        self.template_key_cache = TemplateKeyCache(os.path.join(
+            os.path.expanduser('~'), '.easyyaml', 'template_keys.json'))
+        self.template_results = TemplateResultsModel(self)
+        self.template_completer = QCompleter(self.template_results, self)
+        self.template_completer.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        self.template_completer.setMaxVisibleItems(15)
+        self.template_completer.setWidget(self.search_box.lineEdit())
+        self.template_completer.activated[QModelIndex].connect(self.on_template_result_activated)
+        self.search_box.searchChanged.connect(self.filter_templates)
+        
         # 创建标签页管理器
         self.tab_widget = QTabWidget()
         self.tab_widget.setTabsClosable(True)  # 启用关闭按钮
@@ -774,6 +1078,16 @@ class MainWindow(QMainWindow):
         
         self.layout.addWidget(self.tab_widget)
         
+        # 工作区索引面板，打开过的工作区在启动时继续使用
+        self.workspace_panel = WorkspacePanel(self)
+        self.workspace_panel.openRequested.connect(self.open_path)
+        self.addDockWidget(Qt.DockWidgetArea.LeftDockWidgetArea, self.workspace_panel)
+        workspace = self.settings.get('workspace_folder')
+        if workspace and os.path.isdir(workspace):
+            self.workspace_panel.set_root(workspace)
+        else:
+            self.workspace_panel.hide()
+        
         # 创建菜单栏和工具栏
         self.create_menu_bar()  # 先创建菜单栏
         self.create_toolbar()
@@ -802,41 +1116,8 @@ class MainWindow(QMainWindow):
         new_shortcut.activated.connect(self.new_file)
     
     def get_all_templates(self):
-        """获取所有模板，包括内置和用户自定义的"""
-        templates = []
-        try:
-            # 获取内置模板
-            if os.path.exists(self.template_dir):
-                for root, dirs, files in os.walk(self.template_dir):
-                    for file in files:
-                        if file.endswith(('.yaml', '.yml')):
-                            rel_path = os.path.relpath(
-                                os.path.join(root, file), 
-                                self.template_dir
-                            )
-                            templates.append(rel_path)
-            else:
-                print(f"内置模板目录不存在: {self.template_dir}")  # 调试信息
-            
-            # 获用户模板
-            if os.path.exists(self.user_template_dir):
-                for root, dirs, files in os.walk(self.user_template_dir):
-                    for file in files:
-                        if file.endswith(('.yaml', '.yml')):
-                            rel_path = os.path.relpath(
-                                os.path.join(root, file), 
-                                self.user_template_dir
-                            )
-                            templates.append(f"user/{rel_path}")
-            else:
-                print(f"用户模板目录不存在: {self.user_template_dir}")  # 调试信息
-                
-            print(f"找到的所有模板: {templates}")  # 调试信息
-            return templates
-            
-        except Exception as e:
-            print(f"获取模板列表失败: {str(e)}")  # 调试信息
-            return []
+        """获取所有模板，包括内置和用户自定义的（来自模板目录索引，不遍历目录）"""
+        return list(self.template_catalog.templates())
     
     def setup_template_completer(self):
         """设置模板搜索自动补全"""
@@ -845,39 +1126,68 @@ class MainWindow(QMainWindow):
         completer.setFilterMode(Qt.MatchFlag.MatchContains)
         self.search_bar.setCompleter(completer)
     
-    def filter_templates(self):
-        """根据搜索文本过滤模板"""
+    # 补全列表中最多显示的模板数
+    TEMPLATE_RESULT_LIMIT = 50
+    
+    def filter_templates(self, text=None):
+        """在模板索引中模糊查找，把排名最高的结果显示在补全列表中"""
         try:
-            text = self.search_box.currentText().lower()
-            self.search_box.blockSignals(True)
-            self.search_box.clear()
-            
-            if not text:
-                # 如果没有搜索文本，显示所有模板但不显示下拉列表
-                self.setup_search_box()
-                self.search_box.blockSignals(False)
+            if text is None:
+                text = self.search_box.currentText()
+            popup = self.template_completer.popup()
+            if not text.strip() or self.template_index is None:
+                popup.hide()
                 return
             
-            # 过滤匹配的模板
-            filtered = []
-            for template in self.template_list:
-                display_name = template.replace('\\', ' > ').replace('.yaml', '').title()
-                if (text in display_name.lower() or 
-                    text in template.lower()):
-                    filtered.append((display_name, template))
-            
-            # 排序结果
-            filtered.sort(key=lambda x: x[0])
-            
-            # 添加过后的结果
-            for display_name, template_path in filtered:
-                self.search_box.addItem(display_name, template_path)
-            
-            self.search_box.blockSignals(False)
-                
+            results = self.template_index.search(text, self.TEMPLATE_RESULT_LIMIT)
+            self.template_results.set_ranking(results)
+            if results:
+                self.template_completer.complete()
+                popup.setCurrentIndex(self.template_results.index(0, 0))
+            else:
+                popup.hide()
         except Exception as e:
             print(f"过滤模板失败: {str(e)}")
-            self.search_box.blockSignals(False)
+    
+    def on_template_result_activated(self, index):
+        """从查找结果中选择了模板"""
+        template = self.template_results.template(index)
+        if template:
+            self.create_from_template(template)
+            self.search_box.setCurrentText("")
+    
+    def rebuild_template_index(self):
+        """在后台刷新模板的顶层键并重建查找索引（进行中时等它完成后再建一次）"""
+        if self._template_index_task is not None:
+            self._template_index_pending = True
+            return
+        descriptions = {f"user/{path}": description
+                        for _, _, path, description in self.template_store.templates()}
+        entries = []
+        for template in self.template_list:
+            if template.startswith('user/'):
+                file_path = os.path.join(self.user_template_dir, template[5:])
+                category = os.path.dirname(template[5:])
+            else:
+                file_path = os.path.join(self.template_dir, template)
+                category = os.path.dirname(template)
+            entries.append((template, os.path.abspath(file_path), category,
+                            descriptions.get(template, '')))
+        
+        self._template_index_pending = False
+        self._template_index_task = TemplateIndexTask(entries, self.template_key_cache)
+        self._template_index_task.setAutoDelete(False)
+        self._template_index_task.signals.finished.connect(self.on_template_index_ready)
+        QThreadPool.globalInstance().start(self._template_index_task)
+    
+    def on_template_index_ready(self, index):
+        self._template_index_task = None
+        self.template_index = index
+        self.template_results.set_index(index)
+        if self._template_index_pending:
+            self.rebuild_template_index()
+        elif self.search_box.currentText().strip():
+            self.filter_templates()
     
     def create_menu_bar(self):
         """创建菜单栏"""
@@ -906,6 +1216,10 @@ class MainWindow(QMainWindow):
         save_as_action.triggered.connect(self.save_file_as)
         file_menu.addAction(save_as_action)
         
+        workspace_action = QAction('打开工作区文件夹...', self)
+        workspace_action.triggered.connect(self.open_workspace)
+        file_menu.addAction(workspace_action)
+        
         file_menu.addSeparator()
         
         close_action = QAction('关闭', self)
@@ -913,6 +1227,12 @@ class MainWindow(QMainWindow):
         close_action.triggered.connect(lambda: self.close_tab(self.tab_widget.currentIndex()))
         file_menu.addAction(close_action)
         
+        file_menu.addSeparator()
+        
+        threshold_action = QAction('大文件阈值...', self)
+        threshold_action.triggered.connect(self.set_large_file_threshold)
+        file_menu.addAction(threshold_action)
+        
         # 模板菜单
         template_menu = menubar.addMenu('模板')
         
@@ -1045,19 +1365,63 @@ class MainWindow(QMainWindow):
             self, "打开文件", "", "YAML files (*.yaml *.yml)")
         
         if file_path:
+            self.open_path(file_path)
+    
+    def open_path(self, file_path, line=None):
+        """在标签页中打开文件（已打开时切换过去），line 为要跳转到的行号（从 1 开始）"""
+        file_path = os.path.abspath(file_path)
+        for i in range(self.tab_widget.count()):
+            editor = self.tab_widget.widget(i)
+            if getattr(editor, 'file_path', None) == file_path:
+                self.tab_widget.setCurrentIndex(i)
+                break
+        else:
             try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                # 使用可切换的编辑器
-                editor = SwitchableEditor()
-                editor.setPlainText(content)
+                if os.path.getsize(file_path) >= self.large_file_threshold():
+                    # 大文件只读打开，不把内容读入内存
+                    editor = LargeFileEditor(file_path)
+                else:
+                    with open(file_path, 'r', encoding='utf-8') as f:
+                        content = f.read()
+                    
+                    # 使用可切换的编辑器
+                    editor = self.create_editor(file_path, content)
+                    editor.file_path = file_path
                 
                 file_name = os.path.basename(file_path)
                 index = self.tab_widget.addTab(editor, file_name)
                 self.tab_widget.setCurrentIndex(index)
             except Exception as e:
                 QMessageBox.critical(self, "错误", f"无法打开文件: {str(e)}")
+                return
+        if line is not None:
+            if isinstance(editor, LargeFileEditor):
+                editor.view.goto_line(line - 1)
+            else:
+                editor.goto_line(line - 1)
+    
+    def open_workspace(self):
+        """选择工作区文件夹，在后台索引其中的 YAML 文件"""
+        folder = QFileDialog.getExistingDirectory(
+            self, "打开工作区文件夹", self.settings.get('workspace_folder', ''))
+        if folder:
+            self.settings['workspace_folder'] = folder
+            self.save_settings()
+            self.workspace_panel.set_root(folder)
+            self.workspace_panel.show()
+    
+    def create_editor(self, file_path, content):
+        """创建编辑器并加载文件内容，优先使用磁盘上的解析缓存"""
+        cached = disk_cache.prime(file_path, content)
+        editor = SwitchableEditor()
+        if not cached:
+            # 后台解析完成后把结果写入磁盘缓存
+            def remember(revision, stream):
+                editor.parse_scheduler.parsed.disconnect(remember)
+                disk_cache.remember(file_path, content)
+            editor.parse_scheduler.parsed.connect(remember)
+        editor.setPlainText(content)
+        return editor
     
     def save_file(self):
         """保存当前文件"""
@@ -1070,11 +1434,7 @@ class MainWindow(QMainWindow):
         
         if file_path:
             try:
-                # 获取 YAML 内容
-                content = current_editor.toPlainText()
-                
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(content)
+                self.write_editor_content(current_editor, file_path)
                 
                 # 更新标签页标题
                 file_name = os.path.basename(file_path)
@@ -1103,8 +1463,7 @@ class MainWindow(QMainWindow):
                 content = f.read()
             
             # 使用可切换的编辑器
-            editor = SwitchableEditor()
-            editor.setPlainText(content)
+            editor = self.create_editor(template_path, content)
             
             display_name = os.path.basename(template_name).replace('.yaml', '').title()
             index = self.tab_widget.addTab(editor, f"新建 {display_name}")
@@ -1112,25 +1471,60 @@ class MainWindow(QMainWindow):
         except Exception as e:
             QMessageBox.critical(self, "错误", f"无法加载模板: {str(e)}")
     
-    def load_user_template_config(self):
-        """加载用户模板配置"""
+    def load_settings(self):
+        """加载应用设置"""
         try:
-            if os.path.exists(self.user_template_config):
-                with open(self.user_template_config, 'r', encoding='utf-8') as f:
-                    self.user_templates = json.load(f)
+            if os.path.exists(self.settings_path):
+                with open(self.settings_path, 'r', encoding='utf-8') as f:
+                    self.settings = json.load(f)
             else:
-                self.user_templates = {}
+                self.settings = {}
+        except Exception as e:
+            QMessageBox.warning(self, "警告", f"加载设置失败: {str(e)}")
+            self.settings = {}
+    
+    def save_settings(self):
+        """保存应用设置"""
+        try:
+            with open(self.settings_path, 'w', encoding='utf-8') as f:
+                json.dump(self.settings, f, ensure_ascii=False, indent=2)
         except Exception as e:
-            QMessageBox.warning(self, "警告", f"加载用户模板配置失败: {str(e)}")
-            self.user_templates = {}
+            QMessageBox.warning(self, "警告", f"保存设置失败: {str(e)}")
+    
+    def large_file_threshold(self):
+        """返回大文件模式的阈值（字节）"""
+        size_mb = self.settings.get('large_file_threshold_mb', self.LARGE_FILE_THRESHOLD_MB)
+        return int(size_mb * 1024 * 1024)
+    
+    def set_large_file_threshold(self):
+        """设置大文件模式的阈值"""
+        current = self.settings.get('large_file_threshold_mb', self.LARGE_FILE_THRESHOLD_MB)
+        size_mb, ok = QInputDialog.getInt(
+            self, "大文件阈值", "超过该大小（MB）的文件以只读模式打开:",
+            int(current), 1, 1024 * 1024)
+        if ok:
+            self.settings['large_file_threshold_mb'] = size_mb
+            self.save_settings()
+    
+    def write_editor_content(self, editor, file_path):
+        """把标签页内容写入文件；大文件模式直接复制原文件"""
+        if isinstance(editor, LargeFileEditor):
+            if os.path.abspath(file_path) != os.path.abspath(editor.file_path):
+                shutil.copyfile(editor.file_path, file_path)
+            return
+        content = editor.toPlainText()
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        if isinstance(editor, SwitchableEditor):
+            editor.file_path = os.path.abspath(file_path)
     
-    def save_user_template_config(self):
-        """保存用户模板配置"""
+    def load_user_template_config(self):
+        """打开用户模板目录数据库，第一次打开时导入原来的 JSON 配置"""
+        self.template_store = TemplateStore(self.user_template_db)
         try:
-            with open(self.user_template_config, 'w', encoding='utf-8') as f:
-                json.dump(self.user_templates, f, ensure_ascii=False, indent=2)
+            self.template_store.migrate_json(self.user_template_config, self.user_template_dir)
         except Exception as e:
-            QMessageBox.warning(self, "警告", f"保存用户模板配置失败: {str(e)}")
+            QMessageBox.warning(self, "警告", f"导入用户模板配置失败: {str(e)}")
     
     def add_template(self):
         """添加自定义模板"""
@@ -1152,17 +1546,13 @@ class MainWindow(QMainWindow):
                 # 复制模板文件
                 dest_path = os.path.join(category_dir, f"{name}.yaml")
                 shutil.copy2(file_path, dest_path)
+                self.template_catalog.update_directory(category_dir)
                 
-                # 更新配置
-                if category not in self.user_templates:
-                    self.user_templates[category] = {}
-                self.user_templates[category][name] = {
-                    'path': os.path.relpath(dest_path, self.user_template_dir),
-                    'description': ''
-                }
-                
-                # 保存配置
-                self.save_user_template_config()
+                # 登记到模板目录
+                with open(dest_path, 'r', encoding='utf-8', errors='replace') as f:
+                    body = f.read()
+                self.template_store.add(category, name,
+                                        os.path.relpath(dest_path, self.user_template_dir), '', body)
                 
                 # 重新加载模板列表
                 self.load_templates()
@@ -1184,6 +1574,9 @@ class MainWindow(QMainWindow):
         if not current_editor:
             QMessageBox.warning(self, "警告", "没有打开的文件")
             return
+        if isinstance(current_editor, LargeFileEditor):
+            QMessageBox.warning(self, "警告", "大文件不能添加为模板")
+            return
         
         # 获取前文件名（如果有）
         current_name = self.tab_widget.tabText(self.tab_widget.currentIndex())
@@ -1209,11 +1602,7 @@ class MainWindow(QMainWindow):
         category_combo = QComboBox()
         category_combo.setEditable(True)
         # 添加现有分类
-        categories = set()
-        for template_info in self.user_templates.values():
-            for category in template_info.keys():
-                categories.add(category)
-        category_combo.addItems(sorted(categories))
+        category_combo.addItems(self.template_store.categories())
         category_layout.addWidget(category_combo)
         layout.addLayout(category_layout)
         
@@ -1252,20 +1641,15 @@ class MainWindow(QMainWindow):
                 if os.path.exists(template_path):
                     raise ValueError("该模板名称已存在")
                 
+                text = current_editor.toPlainText()
                 with open(template_path, 'w', encoding='utf-8') as f:
-                    f.write(current_editor.toPlainText())
-                
-                # 更新配置
-                if category not in self.user_templates:
-                    self.user_templates[category] = {}
-                
-                self.user_templates[category][template_name] = {
-                    'path': os.path.relpath(template_path, self.user_template_dir),
-                    'description': description
-                }
+                    f.write(text)
+                self.template_catalog.update_directory(category_dir)
                 
-                # 保存配置
-                self.save_user_template_config()
+                # 登记到模板目录
+                self.template_store.add(category, template_name,
+                                        os.path.relpath(template_path, self.user_template_dir),
+                                        description, text)
                 
                 # 刷新模板列表
                 self.load_templates()
@@ -1276,27 +1660,22 @@ class MainWindow(QMainWindow):
                 QMessageBox.critical(self, "错误", f"添加模板失败: {str(e)}")
     
     def load_templates(self):
-        """异步加载所有模板"""
+        """从模板目录索引刷新模板列表"""
         try:
-            print("开始加载模板...")  # 调试信息
             self.template_list = self.get_all_templates()
-            print(f"找到模板: {self.template_list}")  # 调试信息
             self.setup_search_box()
+            self.rebuild_template_index()
         except Exception as e:
-            print(f"加载模板错误: {str(e)}")  # 调试信息
+            print(f"加载模板错误: {str(e)}")
             QMessageBox.warning(self, "警告", f"加载模板失败: {str(e)}")
             self.template_list = []
     
     def setup_search_box(self):
         """设置搜索框的内容"""
         try:
-            print("开始设置搜索框...")
             templates_with_names = []
             for template in self.template_list:
-                display_name = template.replace('\\', ' > ').replace('.yaml', '').title()
-                templates_with_names.append((display_name, template))
-            
-            print(f"处理后的模板: {templates_with_names}")
+                templates_with_names.append((display_name(template), template))
             
             templates_with_names.sort(key=lambda x: x[0])
             
@@ -1307,11 +1686,11 @@ class MainWindow(QMainWindow):
             
             self.search_box.blockSignals(True)
             self.search_box.clear()
-            for display_name, template_path in templates_with_names:
+            for name, template_path in templates_with_names:
                 try:
-                    self.search_box.addItem(display_name, template_path)
+                    self.search_box.addItem(name, template_path)
                 except Exception as e:
-                    print(f"添加项目失败: {display_name}, 错误: {str(e)}")
+                    print(f"添加项目失败: {name}, 错误: {str(e)}")
             
             self.search_box.setCurrentText("")
             self.search_box.blockSignals(False)
@@ -1384,6 +1763,8 @@ class MainWindow(QMainWindow):
                 return
         
         self.tab_widget.removeTab(index)
+        if isinstance(editor, LargeFileEditor):
+            editor.close_file()
     
     def close_other_tabs(self, keep_index):
         """关闭除指定标签页外的所有标签页"""
@@ -1420,9 +1801,7 @@ class MainWindow(QMainWindow):
         
         if file_path:
             try:
-                content = current_editor.toPlainText()
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(content)
+                self.write_editor_content(current_editor, file_path)
                 
                 # 更新标签页标题
                 file_name = os.path.basename(file_path)
@@ -1526,15 +1905,21 @@ class MainWindow(QMainWindow):
     def show_find_dialog(self):
         """显示查找对话框"""
         current_editor = self.get_current_editor()
-        if current_editor and isinstance(current_editor, SwitchableEditor):
+        if current_editor and isinstance(current_editor, (SwitchableEditor, LargeFileEditor)):
             if not hasattr(self, 'find_dialog'):
                 self.find_dialog = FindDialog(self)
                 self.find_dialog.findNext.connect(self.find_text)
+                self.find_dialog.searchChanged.connect(self.incremental_find)
+                self.search_scheduler = SearchScheduler(self)
+                self.search_scheduler.found.connect(self._on_incremental_found)
+                self.search_scheduler.finished.connect(self._on_incremental_finished)
+                self._incremental = None
             
             # 获取选中的文本作为查找内容
-            cursor = current_editor.text_editor.textCursor()
-            if cursor.hasSelection():
-                self.find_dialog.set_find_text(cursor.selectedText())
+            if isinstance(current_editor, SwitchableEditor):
+                cursor = current_editor.text_editor.textCursor()
+                if cursor.hasSelection():
+                    self.find_dialog.set_find_text(cursor.selectedText())
             
             self.find_dialog.show()
             self.find_dialog.raise_()
@@ -1557,136 +1942,247 @@ class MainWindow(QMainWindow):
             self.replace_dialog.show()
             self.replace_dialog.raise_()
     
-    def find_text(self, text, case_sensitive, search_up):
+    def find_text(self, text, case_sensitive, search_up, regex=False):
         """查找文本"""
         try:
             current_editor = self.get_current_editor()
             
+            if isinstance(current_editor, LargeFileEditor):
+                if regex:
+                    QMessageBox.information(self, "查找", "大文件模式不支持正则表达式查找")
+                    return
+                if not current_editor.find(text, case_sensitive, search_up):
+                    QMessageBox.information(self, "查找", "找不到指定内容")
+                return
+            
             if current_editor and isinstance(current_editor, SwitchableEditor):
                 # 确保当前是文本编辑模式
                 current_widget = current_editor.stack.currentWidget()
                 
+                pattern = self._compile_search(text, case_sensitive, regex)
+                if pattern is None:
+                    return
+                
                 if current_widget != current_editor.text_editor:
-                    QMessageBox.information(self, "提示", "请切换到文本编辑模式使用查找功能")
+                    if not current_editor.tree_is_current():
+                        self._show_find_status("树形视图尚未加载当前文本")
+                        return
+                    self.find_in_tree(current_editor.tree_editor.tree, pattern, search_up)
                     return
-                    
-                editor = current_editor.text_editor
                 
-                # 设置查找选项
-                options = QTextDocument.FindFlag(0)  # 初始化为0
+                # 全部匹配只在文本或查找内容变化后扫描一次，之后按光标位置二分查找
+                matches = current_editor.find_all(pattern)
+                # 标记可见区域中所有的匹配（不修改文档格式）
+                current_editor.highlighter.set_search(pattern)
+                if not matches:
+                    self._show_find_status("没有匹配")
+                    QMessageBox.information(self, "查找", "找不到指定内容")
+                    return
                 
-                if case_sensitive:
-                    options |= QTextDocument.FindFlag.FindCaseSensitively
+                # 从当前选中内容的前面或后面继续，到达首尾时从另一端重新开始
+                cursor = current_editor.text_editor.textCursor()
                 if search_up:
-                    options |= QTextDocument.FindFlag.FindBackward
-                
-                # 获取当前光标位置
-                cursor = editor.textCursor()
-                
-                # 如果是向上搜索，将光标移动到选择的开始位置
-                if search_up and cursor.hasSelection():
-                    cursor.setPosition(cursor.selectionStart())
-                    editor.setTextCursor(cursor)
-                
-                # 执行查找
-                found = editor.find(text, options)
-                
-                if found:
-                    # 设置高亮背景颜色
-                    highlight_format = QTextCharFormat()
-                    highlight_format.setBackground(QColor("#ffff00"))  # 设置高亮颜色
-                    cursor.mergeCharFormat(highlight_format)  # 应用高亮格式
-                
-                if not found:
-                    # 如果没找到，从文档头部或尾部继续搜索
-                    cursor = QTextCursor(editor.document())
-                    if search_up:
-                        cursor.movePosition(QTextCursor.MoveOperation.End)
-                    editor.setTextCursor(cursor)
-                    
-                    found = editor.find(text, options)
-                    
-                    if found:
-                        # 设置高亮背景颜色
-                        highlight_format = QTextCharFormat()
-                        highlight_format.setBackground(QColor("#ffcc00"))  # 设置高亮颜色
-                        cursor.mergeCharFormat(highlight_format)  # 应用高亮格式
-                    
-                    if not found:
-                        QMessageBox.information(self, "查找", "找不到指定内容")
-                        # 恢复原始光标位置
-                        editor.setTextCursor(cursor)
+                    index = matches.previous_index(cursor.selectionStart())
+                else:
+                    index = matches.next_index(cursor.selectionEnd())
+                current_editor.select_match(matches, index)
+                self._show_find_status(f"第 {index + 1:,} 个，共 {len(matches):,} 个匹配")
         except Exception as e:
             print(f"发生错误: {str(e)}")
             import traceback
             traceback.print_exc()
             QMessageBox.critical(self, "错误", f"查找过程中发生错误: {str(e)}")
     
-    def replace_text(self, replace_with):
-        """替换文本"""
+    def find_in_tree(self, tree, pattern, search_up):
+        """在树形视图中查找：用解析时生成的索引找出键或值匹配的节点，树中只显示通向它们的路径"""
+        count = tree.search(pattern)
+        if not count:
+            self._show_find_status("没有匹配")
+            QMessageBox.information(self, "查找", "找不到指定内容")
+            return
+        number = tree.next_hit(search_up)
+        self._show_find_status(f"第 {number + 1:,} 个，共 {count:,} 个匹配")
+    
+    def incremental_find(self, text, case_sensitive, regex):
+        """查找对话框中的内容改变时在后台查找，找到的匹配陆续显示"""
+        current_editor = self.get_current_editor()
+        self._incremental = None
+        self.search_scheduler.cancel()
+        if not isinstance(current_editor, SwitchableEditor):
+            return
+        if current_editor.stack.currentWidget() != current_editor.text_editor:
+            # 树形视图在按下“查找下一个”时才查找，清空查找内容时取消筛选
+            if not text:
+                current_editor.tree_editor.tree.clear_search()
+                self._show_find_status("")
+            return
+        if not text:
+            current_editor.highlighter.set_search(None)
+            self._show_find_status("")
+            return
+        try:
+            pattern = text_search.compile_pattern(text, case_sensitive, regex)
+        except re.error as e:
+            self._show_find_status(f"正则表达式无效: {str(e)}")
+            return
+        
+        # 可见区域的标记立即更新，完整的匹配列表在工作线程中查找
+        current_editor.highlighter.set_search(pattern)
+        self._show_find_status("正在查找…")
+        # 从开始输入时的位置向后找第一个匹配；按字面查找时匹配不跨行，可以分块扫描
+        anchor = current_editor.text_editor.textCursor().selectionStart()
+        query = self.search_scheduler.search(current_editor.text_snapshot(), pattern,
+                                             line_local=not regex)
+        self._incremental = {
+            'query': query, 'editor': current_editor, 'revision': current_editor.text_revision,
+            'pattern': pattern, 'anchor': anchor, 'selected': None,
+        }
+    
+    def _incremental_state(self, query):
+        """返回仍然有效的边输入边查找状态：查找未被取代，编辑器和文本都没有变化"""
+        state = self._incremental
+        if (state is None or state['query'] != query
+                or state['editor'] is not self.get_current_editor()
+                or state['editor'].text_revision != state['revision']):
+            return None
+        return state
+    
+    def _on_incremental_found(self, query, matches):
+        """收到一批匹配：选中起始位置之后的第一个匹配并更新计数"""
+        state = self._incremental_state(query)
+        if state is None:
+            return
+        if state['selected'] is None:
+            index = matches.next_index(state['anchor'])
+            if matches.starts[index] >= state['anchor']:
+                state['editor'].select_match(matches, index)
+                state['selected'] = index
+        self._show_find_status(f"已找到 {len(matches):,} 个匹配…")
+    
+    def _on_incremental_finished(self, query, matches):
+        state = self._incremental_state(query)
+        if state is None:
+            return
+        editor = state['editor']
+        editor.remember_matches(state['revision'], state['pattern'], matches)
+        if not matches:
+            self._show_find_status("没有匹配")
+            return
+        if state['selected'] is None:
+            # 起始位置之后没有匹配，从文档开头重新开始
+            state['selected'] = matches.next_index(state['anchor'])
+            editor.select_match(matches, state['selected'])
+        self._show_find_status(f"第 {state['selected'] + 1:,} 个，共 {len(matches):,} 个匹配")
+    
+    def _compile_search(self, text, case_sensitive, regex):
+        """编译查找内容，正则表达式无效时提示并返回 None"""
+        try:
+            return text_search.compile_pattern(text, case_sensitive, regex)
+        except re.error as e:
+            QMessageBox.warning(self, "查找", f"正则表达式无效: {str(e)}")
+            return None
+    
+    def _show_find_status(self, text):
+        """在查找和替换对话框中显示匹配计数"""
+        for name in ('find_dialog', 'replace_dialog'):
+            dialog = getattr(self, name, None)
+            if dialog is not None:
+                dialog.set_status(text)
+    
+    def replace_text(self, find_text, replace_with, case_sensitive, regex=False):
+        """替换选中的匹配，然后选中下一个匹配"""
         current_editor = self.get_current_editor()
         if current_editor and isinstance(current_editor, SwitchableEditor):
-            # 确保当前是文本编辑模式
+            pattern = self._compile_search(find_text, case_sensitive, regex)
+            if pattern is None:
+                return
+            
             if current_editor.stack.currentWidget() != current_editor.text_editor:
-                QMessageBox.information(self, "提示", "请切换到文本编辑模式使用替换功能")
+                if not current_editor.tree_is_current():
+                    self._show_find_status("树形视图尚未加载当前文本")
+                    return
+                # 树形视图：当前行是匹配的标量时替换它的值
+                tree = current_editor.tree_editor.tree
+                try:
+                    tree.replace_current(pattern, replace_with, regex)
+                except re.error as e:
+                    QMessageBox.warning(self, "替换", f"替换内容无效: {str(e)}")
+                    return
+                self.find_in_tree(tree, pattern, False)
                 return
-                
+            
             editor = current_editor.text_editor
             cursor = editor.textCursor()
-            if cursor.hasSelection():
-                cursor.insertText(replace_with)
+            # selectedText() 中的换行是 U+2029，取与查找时相同的纯文本（换行为 \n）再比较
+            selected = cursor.selection().toPlainText() if cursor.hasSelection() else None
+            match = pattern.fullmatch(selected) if selected is not None else None
+            if match is not None:
+                try:
+                    cursor.insertText(match.expand(replace_with) if regex else replace_with)
+                except re.error as e:
+                    QMessageBox.warning(self, "替换", f"替换内容无效: {str(e)}")
+                    return
                 editor.setTextCursor(cursor)
+            self.find_text(find_text, case_sensitive, False, regex)
     
-    def replace_all_text(self, find_text, replace_with, case_sensitive):
-        """替换所有文本"""
+    def replace_all_text(self, find_text, replace_with, case_sensitive, regex=False):
+        """替换所有文本：一次扫描生成替换后的文本，作为一次编辑写回，可以一步撤销"""
         current_editor = self.get_current_editor()
         if current_editor and isinstance(current_editor, SwitchableEditor):
-            # 确保当前是文本编辑模式
+            pattern = self._compile_search(find_text, case_sensitive, regex)
+            if pattern is None:
+                return
+            
             if current_editor.stack.currentWidget() != current_editor.text_editor:
-                QMessageBox.information(self, "提示", "请切换到文本编辑模式使用替换功能")
+                if not current_editor.tree_is_current():
+                    self._show_find_status("树形视图尚未加载当前文本")
+                    return
+                self.replace_all_in_tree(current_editor.tree_editor.tree, pattern, replace_with, regex)
                 return
-                
+            
             editor = current_editor.text_editor
+            try:
+                result = text_search.replace_all(editor.toPlainText(), pattern, replace_with, regex)
+            except re.error as e:
+                QMessageBox.warning(self, "替换", f"替换内容无效: {str(e)}")
+                return
+            if result is None:
+                QMessageBox.information(self, "替换完成", "共替换了 0 处内容")
+                return
             
-            # 开始编辑会话
+            start, end, replaced, count = result
             cursor = editor.textCursor()
+            position = cursor.position()
             cursor.beginEditBlock()
-            
-            try:
-                # 保存当前光标位置
-                original_position = cursor.position()
-                
-                # 移动到文档开始
-                cursor.movePosition(QTextCursor.MoveOperation.Start)
-                editor.setTextCursor(cursor)
-                
-                # 设置查找选项
-                options = QTextDocument.FindFlags()
-                if case_sensitive:
-                    options |= QTextDocument.FindFlag.FindCaseSensitively
-                
-                # 计数器
-                count = 0
-                
-                # 开始替换
-                while editor.find(find_text, options):
-                    cursor = editor.textCursor()
-                    cursor.insertText(replace_with)
-                    count += 1
-                
-                # 恢复原始光标位置
-                cursor.setPosition(original_position)
-                editor.setTextCursor(cursor)
-                
-                # 结束编辑会话
-                cursor.endEditBlock()
-                
-                # 显示结果
-                QMessageBox.information(self, "替换完成", f"共替换了 {count} 处内容")
-                
-            except Exception as e:
-                cursor.endEditBlock()
-                QMessageBox.warning(self, "错误", f"替换过程中发生错误: {str(e)}")
+            cursor.setPosition(start)
+            cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+            cursor.insertText(replaced)
+            cursor.endEditBlock()
+            
+            # 光标在被替换的范围之后时随长度变化平移，在范围之内时放到范围末尾
+            new_end = start + text_search.utf16_length(replaced)
+            if position >= end:
+                position += new_end - end
+            elif position > start:
+                position = new_end
+            cursor.setPosition(position)
+            editor.setTextCursor(cursor)
+            self._show_find_status("")
+            
+            QMessageBox.information(self, "替换完成", f"共替换了 {count} 处内容")
+    
+    def replace_all_in_tree(self, tree, pattern, replace_with, regex):
+        """替换树中所有匹配的标量值：按查找索引直接修改数据，文本中的对应片段一次写回"""
+        try:
+            count, skipped = tree.tree_model.replace_values(pattern, replace_with, regex)
+        except re.error as e:
+            QMessageBox.warning(self, "替换", f"替换内容无效: {str(e)}")
+            return
+        self._show_find_status("")
+        message = f"共替换了 {count} 处内容"
+        if skipped:
+            message += f"，{skipped} 处替换后与原值的类型不符，未替换"
+        QMessageBox.information(self, "替换完成", message)
     
     def setup_themes(self):
         """设置主题样式"""
@@ -1776,24 +2272,24 @@ class MainWindow(QMainWindow):
                 }
                 
                 /* 树形视图 */
-                QTreeWidget {
+                QTreeView {
                     background-color: #ffffff;
                     border: 1px solid #dee2e6;
                     border-radius: 6px;
                     padding: 4px;
                 }
                 
-                QTreeWidget::item {
+                QTreeView::item {
                     padding: 4px;
                     border-radius: 4px;
                 }
                 
-                QTreeWidget::item:selected {
+                QTreeView::item:selected {
                     background: #e7f1ff;
                     color: #000000;
                 }
                 
-                QTreeWidget::item:hover {
+                QTreeView::item:hover {
                     background: #f8f9fa;
                 }
                 
@@ -1952,7 +2448,7 @@ class MainWindow(QMainWindow):
                 }
                 
                 /* 树形视图 */
-                QTreeWidget {
+                QTreeView {
                     background-color: #1f1f1f;
                     border: 1px solid #404040;
                     border-radius: 6px;
@@ -1960,17 +2456,17 @@ class MainWindow(QMainWindow):
                     color: #e0e0e0;
                 }
                 
-                QTreeWidget::item {
+                QTreeView::item {
                     padding: 4px;
                     border-radius: 4px;
                 }
                 
-                QTreeWidget::item:selected {
+                QTreeView::item:selected {
                     background: #264f78;
                     color: #ffffff;
                 }
                 
-                QTreeWidget::item:hover {
+                QTreeView::item:hover {
                     background: #333333;
                 }
                 
@@ -2108,7 +2604,7 @@ class MainWindow(QMainWindow):
                     QLineEdit {
                         color: #ffffff;
                     }
-                    QTreeWidget {
+                    QTreeView {
                         color: #ffffff;
                     }
                     QHeaderView::section {
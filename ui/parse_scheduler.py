@@ -0,0 +1,137 @@
+from PyQt6.QtCore import QCoreApplication, QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+from utils.parse_worker import CancelToken
+from utils.yaml_stream import parse_stream
+
+
+def _parse(text, previous, token=None):
+    """切分并解析文本，返回 (文档流, 异常)"""
+    try:
+        return parse_stream(text, previous, token)
+    except Exception as e:
+        return None, e
+
+
+class _ParseSignals(QObject):
+    """解析任务的结果信号（QRunnable 本身不能发信号）"""
+    finished = pyqtSignal(int, object, object)  # 修订号, 文档流, 异常
+
+
+class _ParseTask(QRunnable):
+    """在工作线程中执行的解析任务"""
+    def __init__(self, scheduler, revision, text, previous):
+        super().__init__()
+        self.scheduler = scheduler
+        self.revision = revision
+        self.text = text
+        self.previous = previous
+        self.token = CancelToken()
+        self.signals = _ParseSignals()
+
+    def run(self):
+        # 排队期间又有新的修改，直接跳过这次解析
+        if self.revision != self.scheduler.revision:
+            self.signals.finished.emit(self.revision, None, None)
+            return
+
+        result, error = _parse(self.text, self.previous, self.token)
+        self.signals.finished.emit(self.revision, result, error)
+
+
+class ParseScheduler(QObject):
+    """YAML 解析调度器
+
+    文本修改先在空闲窗口内合并，窗口结束后再把最新文本交给工作线程解析；
+    每次修改都会递增修订号，进行中的旧解析立即取消（杀掉解析子进程），结果直接丢弃。
+    previous_provider 返回上一次使用的文档流，文本未变的文档沿用其中的解析结果。
+    """
+    parsed = pyqtSignal(int, object)  # 修订号, 文档流
+    failed = pyqtSignal(int, object)  # 修订号, 异常
+
+    IDLE_MS = 300  # 空闲窗口（毫秒）
+
+    def __init__(self, text_provider, idle_ms=None, parent=None, previous_provider=None):
+        super().__init__(parent)
+        self._text_provider = text_provider
+        self._previous_provider = previous_provider
+        self._revision = 0
+        self._result = None  # (修订号, 文档流, 异常)
+        self._tasks = {}  # 进行中的任务，防止被提前回收
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(idle_ms if idle_ms is not None else self.IDLE_MS)
+        self._timer.timeout.connect(self._start_parse)
+
+        # 退出时取消进行中的解析（杀掉子进程），工作线程随即结束
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self._cancel_tasks)
+
+    @property
+    def revision(self):
+        """当前文本的修订号"""
+        return self._revision
+
+    def schedule(self):
+        """文本发生变化：递增修订号，取消进行中的解析并重新开始空闲计时"""
+        self._revision += 1
+        self._result = None
+        self._cancel_tasks()
+        self._timer.start()
+
+    def refresh(self):
+        """不改变修订号，重新在后台解析当前文本（例如文本被整体重写后补充位置表）"""
+        self._result = None
+        self._timer.start()
+
+    def reset(self):
+        """文本已由外部同步（例如整体替换），放弃所有待处理的解析"""
+        self._timer.stop()
+        self._revision += 1
+        self._result = None
+        self._cancel_tasks()
+        return self._revision
+
+    def _cancel_tasks(self):
+        """取消所有进行中的解析"""
+        for task in self._tasks.values():
+            task.token.cancel()
+
+    def result(self):
+        """返回当前修订号的解析结果 (文档流, 异常)，尚未解析完成时返回 None"""
+        if self._result and self._result[0] == self._revision:
+            return self._result[1], self._result[2]
+        return None
+
+    def _previous(self):
+        return self._previous_provider() if self._previous_provider else None
+
+    def parse_now(self):
+        """不等空闲窗口，立即在后台解析最新文本（用于树形视图即将显示的场景）
+
+        结果仍通过 parsed/failed 信号送达；已有结果或当前修订号正在解析时不重复开始。
+        """
+        if self.result() is not None or self._revision in self._tasks:
+            return
+        self._timer.stop()
+        self._start_parse()
+
+    def _start_parse(self):
+        """空闲窗口结束，把文本快照交给工作线程"""
+        task = _ParseTask(self, self._revision, self._text_provider(), self._previous())
+        task.setAutoDelete(False)
+        task.signals.finished.connect(self._on_task_finished)
+        self._tasks[task.revision] = task
+        QThreadPool.globalInstance().start(task)
+
+    def _on_task_finished(self, revision, result, error):
+        """工作线程解析完成（在GUI线程中执行）"""
+        self._tasks.pop(revision, None)
+        if revision != self._revision or (result is None and error is None):
+            return  # 过期结果
+
+        self._result = (revision, result, error)
+        if error is None:
+            self.parsed.emit(revision, result)
+        else:
+            self.failed.emit(revision, error)
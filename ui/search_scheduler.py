@@ -0,0 +1,100 @@
+from array import array
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+from utils import text_search
+
+
+class _SearchSignals(QObject):
+    """查找任务的结果信号（QRunnable 本身不能发信号）"""
+    found = pyqtSignal(int, object, object, bool)  # 查找序号, 起始位置, 结束位置, 是否已完成
+
+
+class _SearchTask(QRunnable):
+    """在工作线程中对文本快照执行的查找任务"""
+    def __init__(self, scheduler, query, text, pattern, line_local):
+        super().__init__()
+        self.scheduler = scheduler
+        self.query = query
+        self.text = text
+        self.pattern = pattern
+        self.line_local = line_local
+        self.signals = _SearchSignals()
+
+    def run(self):
+        for starts, ends in text_search.scan(self.text, self.pattern, self.line_local):
+            # 已有更新的查找，放弃这一次
+            if self.query != self.scheduler.query:
+                self.signals.found.emit(self.query, None, None, True)
+                return
+            if starts:
+                self.signals.found.emit(self.query, starts, ends, False)
+        self.signals.found.emit(self.query, array('q'), array('q'), True)
+
+
+class SearchScheduler(QObject):
+    """边输入边查找的调度器
+
+    查找内容先在空闲窗口内合并，窗口结束后把文本快照（不可变的 str）交给工作线程查找。
+    每次新的查找都会递增查找序号，进行中的旧查找在下一批结果之前停止，结果直接丢弃。
+    找到的匹配分批送回 GUI 线程，found 信号携带目前为止找到的全部匹配。
+    """
+    found = pyqtSignal(int, object)  # 查找序号, 目前找到的匹配 (text_search.Matches)
+    finished = pyqtSignal(int, object)  # 查找序号, 全部匹配
+
+    IDLE_MS = 100  # 空闲窗口（毫秒）
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._query = 0
+        self._pending = None  # (文本, 正则表达式, 是否不跨行)
+        self._matches = None
+        self._tasks = {}  # 进行中的任务，防止被提前回收
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(self.IDLE_MS)
+        self._timer.timeout.connect(self._start_search)
+
+    @property
+    def query(self):
+        """当前查找的序号"""
+        return self._query
+
+    def search(self, text, pattern, line_local=False):
+        """在 text 中查找 pattern，取消进行中的查找，返回新的查找序号
+
+        line_local 为 True 表示匹配不会跨行，工作线程可以分块扫描，取消得更及时。
+        """
+        self._query += 1
+        self._pending = (text, pattern, line_local)
+        self._timer.start()
+        return self._query
+
+    def cancel(self):
+        """停止进行中的查找"""
+        self._query += 1
+        self._pending = None
+        self._timer.stop()
+
+    def _start_search(self):
+        if self._pending is None:
+            return
+        text, pattern, line_local = self._pending
+        self._pending = None
+        self._matches = text_search.Matches(array('q'), array('q'))
+        task = _SearchTask(self, self._query, text, pattern, line_local)
+        task.setAutoDelete(False)
+        task.signals.found.connect(self._on_found)
+        self._tasks[task.query] = task
+        QThreadPool.globalInstance().start(task)
+
+    def _on_found(self, query, starts, ends, done):
+        """工作线程找到一批匹配（在GUI线程中执行）"""
+        if done:
+            self._tasks.pop(query, None)
+        if query != self._query or starts is None:
+            return  # 过期结果
+        self._matches.extend(starts, ends)
+        if done:
+            self.finished.emit(query, self._matches)
+        else:
+            self.found.emit(query, self._matches)
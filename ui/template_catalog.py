@@ -0,0 +1,181 @@
+import json
+import os
+from PyQt6.QtCore import QObject, QFileSystemWatcher, QTimer, pyqtSignal
+
+TEMPLATE_SUFFIXES = ('.yaml', '.yml')
+
+
+class TemplateCatalog(QObject):
+    """模板目录的内存索引
+
+    按目录记录 (修改时间, 模板文件名, 子目录名)，并保存到磁盘。启动时只检查每个目录的
+    修改时间，只有增删过条目的目录才重新列出；之后由 QFileSystemWatcher 报告发生变化的
+    目录，合并一小段时间后只重新列出这些目录，不再遍历整个模板树。
+    模板名是相对于模板根目录的路径，用户模板带 "user/" 前缀（与原来的写法一致）。
+    """
+    changed = pyqtSignal()  # 模板列表有变化
+
+    DEBOUNCE_MS = 200  # 合并文件系统通知的时间窗口（毫秒）
+
+    def __init__(self, roots, state_path, parent=None):
+        """roots 为 [(模板名前缀, 根目录), ...]"""
+        super().__init__(parent)
+        self._roots = [(prefix, os.path.abspath(root)) for prefix, root in roots]
+        self._state_path = state_path
+        self._dirs = {}  # 目录 -> [修改时间, 模板文件名列表, 子目录名列表]
+        self._templates = None  # 排好序的模板名，目录有变化时重新生成
+        self._dirty = set()
+
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.directoryChanged.connect(self._on_directory_changed)
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(self.DEBOUNCE_MS)
+        self._timer.timeout.connect(self._apply_changes)
+
+        self._load()
+        if self._dirs:
+            self._watcher.addPaths(list(self._dirs))
+
+    def templates(self):
+        """返回所有模板名（按名称排序）"""
+        if self._templates is None:
+            templates = []
+            for prefix, root in self._roots:
+                for directory, (_, files, _) in self._dirs.items():
+                    if directory == root or directory.startswith(root + os.sep):
+                        relative = os.path.relpath(directory, root)
+                        for name in files:
+                            path = name if relative == os.curdir else os.path.join(relative, name)
+                            templates.append(prefix + path)
+            self._templates = sorted(templates)
+        return self._templates
+
+    def update_directory(self, directory):
+        """立即重新列出目录（用于程序自己增删模板之后，不必等待文件系统通知）"""
+        directory = os.path.abspath(directory)
+        # 新建的目录尚未登记，从最近的已登记上级目录开始列出
+        while directory not in self._dirs:
+            parent = os.path.dirname(directory)
+            if parent == directory or not any(
+                    parent == root or parent.startswith(root + os.sep) for _, root in self._roots):
+                return
+            directory = parent
+        self._dirty.discard(directory)
+        if self._rescan(directory):
+            self._changed()
+
+    # ---- 扫描 ----
+
+    def _load(self):
+        """读取保存的目录表，只重新列出修改时间变化了的目录"""
+        try:
+            with open(self._state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            saved = {directory: entry for directory, entry in state.get('dirs', {}).items()
+                     if any(directory == root or directory.startswith(root + os.sep)
+                            for _, root in self._roots)}
+        except (OSError, ValueError):
+            saved = {}
+        self._dirs = saved
+
+        changed = False
+        for _, root in self._roots:
+            if root not in self._dirs:
+                changed |= self._scan_tree(root)
+        for directory in sorted(self._dirs):
+            if directory not in self._dirs:
+                continue  # 上级目录已被删除
+            try:
+                mtime = os.stat(directory).st_mtime_ns
+            except OSError:
+                mtime = None
+            if mtime != self._dirs[directory][0]:
+                changed |= self._rescan(directory, watch=False)
+        if changed or not saved:
+            self._save()
+
+    def _list(self, directory):
+        """返回 (修改时间, 模板文件名, 子目录名)，目录不存在时返回 None"""
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+            files = []
+            dirs = []
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        dirs.append(entry.name)
+                    elif entry.name.endswith(TEMPLATE_SUFFIXES):
+                        files.append(entry.name)
+            return [mtime, sorted(files), sorted(dirs)]
+        except OSError:
+            return None
+
+    def _scan_tree(self, directory, watch=False):
+        """登记目录及其所有子目录，返回是否找到了目录"""
+        stack = [directory]
+        found = False
+        while stack:
+            current = stack.pop()
+            entry = self._list(current)
+            if entry is None:
+                continue
+            found = True
+            self._dirs[current] = entry
+            if watch:
+                self._watcher.addPath(current)
+            stack.extend(os.path.join(current, name) for name in entry[2])
+        return found
+
+    def _drop_tree(self, directory, watch=True):
+        removed = [d for d in self._dirs if d == directory or d.startswith(directory + os.sep)]
+        for d in removed:
+            del self._dirs[d]
+        if removed and watch:
+            self._watcher.removePaths(removed)
+
+    def _rescan(self, directory, watch=True):
+        """重新列出一个目录，新出现的子目录整个登记，消失的子目录整个移除；返回是否有变化"""
+        old = self._dirs.get(directory)
+        entry = self._list(directory)
+        if entry is None:
+            self._drop_tree(directory, watch)
+            return old is not None
+        self._dirs[directory] = entry
+        old_dirs = set(old[2]) if old else set()
+        for name in entry[2]:
+            if name not in old_dirs:
+                self._scan_tree(os.path.join(directory, name), watch)
+        for name in old_dirs.difference(entry[2]):
+            self._drop_tree(os.path.join(directory, name), watch)
+        return old is None or old[1:] != entry[1:]
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self._state_path), exist_ok=True)
+            with open(self._state_path, 'w', encoding='utf-8') as f:
+                json.dump({'dirs': self._dirs}, f, ensure_ascii=False)
+        except OSError as e:
+            print(f"保存模板目录索引失败: {str(e)}")
+
+    def _changed(self):
+        self._templates = None
+        self._save()
+        self.changed.emit()
+
+    # ---- 文件系统通知 ----
+
+    def _on_directory_changed(self, directory):
+        self._dirty.add(directory)
+        self._timer.start()
+
+    def _apply_changes(self):
+        dirty, self._dirty = self._dirty, set()
+        changed = False
+        for directory in sorted(dirty):
+            if directory in self._dirs:  # 已随上级目录移除的不再处理
+                changed |= self._rescan(directory)
+        if changed:
+            self._changed()
+        elif dirty:
+            self._save()  # 只有非模板文件变化，记下新的修改时间
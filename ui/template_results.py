@@ -0,0 +1,66 @@
+from PyQt6.QtCore import (QObject, QRunnable, QSortFilterProxyModel, QModelIndex,
+                          QStringListModel, pyqtSignal)
+from utils.template_search import TemplateSearchIndex, display_name
+
+
+class _IndexSignals(QObject):
+    """索引任务的结果信号（QRunnable 本身不能发信号）"""
+    finished = pyqtSignal(object)  # TemplateSearchIndex
+
+
+class TemplateIndexTask(QRunnable):
+    """在工作线程中刷新模板的顶层键缓存并建立查找索引"""
+    def __init__(self, entries, key_cache):
+        """entries 为 [(模板名, 文件路径, 分类, 描述), ...]"""
+        super().__init__()
+        self.entries = entries
+        self.key_cache = key_cache
+        self.signals = _IndexSignals()
+
+    def run(self):
+        try:
+            self.key_cache.refresh([file_path for _, file_path, _, _ in self.entries])
+            self.key_cache.save()
+        except Exception as e:
+            print(f"读取模板顶层键失败: {str(e)}")
+        index = TemplateSearchIndex(
+            (template, category, description, self.key_cache.get(file_path))
+            for template, file_path, category, description in self.entries)
+        self.signals.finished.emit(index)
+
+
+class TemplateResultsModel(QSortFilterProxyModel):
+    """按查找结果的排名显示模板的代理模型
+
+    源模型是所有模板的显示名称（行号即模板在索引中的编号），只在模板列表变化时重建；
+    每次查找只替换排名表，代理模型据此筛选并排序，不重新填充条目。
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rank = {}
+        self._names = []
+        self.setSourceModel(QStringListModel(self))
+        self.sort(0)
+
+    def set_index(self, index):
+        """换成新索引中的模板，清空排名"""
+        self._names = index.names
+        self._rank = {}
+        self.sourceModel().setStringList([display_name(name) for name in index.names])
+
+    def set_ranking(self, numbers):
+        """只显示这些模板，按给出的顺序排列"""
+        self._rank = {number: i for i, number in enumerate(numbers)}
+        self.invalidate()
+
+    def template(self, index):
+        """返回代理模型中某一行对应的模板名"""
+        source = self.mapToSource(index)
+        return self._names[source.row()] if source.isValid() else None
+
+    def filterAcceptsRow(self, source_row, source_parent=QModelIndex()):
+        return source_row in self._rank
+
+    def lessThan(self, left, right):
+        return self._rank.get(left.row(), 0) < self._rank.get(right.row(), 0)
@@ -0,0 +1,282 @@
+from PyQt6.QtCore import QObject, QTimer
+from PyQt6.QtGui import QColor, QTextBlockUserData, QTextCharFormat, QTextLayout
+import time
+from .editor_widget import highlight_line, syntax_formats
+
+
+class _BlockInfo(QTextBlockUserData):
+    """记录块当前的格式是按哪个起始状态和哪一版装饰计算的"""
+    def __init__(self, state_in, generation):
+        super().__init__()
+        self.state_in = state_in  # None 表示起始状态是估计的
+        self.generation = generation
+
+
+class ViewportHighlighter(QObject):
+    """只处理可见区域的语法高亮和装饰层（查找结果标记、错误波浪线）
+
+    QSyntaxHighlighter 在加载文档时会同步处理所有行。这里只对可见的行及其前后
+    MARGIN 行立即计算格式，其余的行在空闲时分批处理，每批不超过 IDLE_SLICE_MS 毫秒，
+    滚动和输入不会被阻塞。
+
+    _done 之前的块都已按正确的起始状态处理过，块状态（userState）保存每行结束时的状态。
+    编辑后从被修改的块重新处理，某块结束时的状态与修改前相同时，直接跳过编辑前已处理过的部分。
+    跳转到尚未处理的远处时，从最近的同步点（缩进为 0 的非空行）开始计算可见区域。
+    """
+    MARGIN = 50
+    SYNC_LIMIT = 1000
+    IDLE_SLICE_MS = 8
+
+    def __init__(self, editor):
+        super().__init__(editor)
+        self.editor = editor
+        self.document = editor.document()
+        self.formats = syntax_formats()
+        search_format = QTextCharFormat()
+        search_format.setBackground(QColor("#ffe066"))
+        self.formats['search'] = search_format
+        lint_format = QTextCharFormat()
+        lint_format.setUnderlineStyle(QTextCharFormat.UnderlineStyle.WaveUnderline)
+        lint_format.setUnderlineColor(QColor("#d32f2f"))
+        self.formats['lint'] = lint_format
+
+        self._done = 0        # 该块之前的块都已按正确的状态处理
+        self._resume = 0      # 编辑前已处理到的位置
+        self._generation = 0  # 装饰的版本，查找内容或错误列表变化时递增
+        self._search = None
+        self._diagnostics = {}  # 行号 -> [(列, 消息), ...]
+        self._block_count = self.document.blockCount()
+        self._applying = False
+
+        self._visible_timer = QTimer(self)
+        self._visible_timer.setSingleShot(True)
+        self._visible_timer.setInterval(0)
+        self._visible_timer.timeout.connect(self.highlight_visible)
+        self._idle_timer = QTimer(self)
+        self._idle_timer.setInterval(0)
+        self._idle_timer.timeout.connect(self._idle_step)
+
+        self.document.contentsChange.connect(self._on_contents_change)
+        editor.updateRequest.connect(self._on_update_request)
+        editor.cursorPositionChanged.connect(self._update_tooltip)
+        self._schedule()
+
+    # ---- 装饰 ----
+
+    def set_search(self, pattern):
+        """标记所有与正则表达式 pattern 匹配的位置，pattern 为 None 时清除标记"""
+        if pattern != self._search:
+            self._search = pattern
+            self._decorations_changed()
+
+    def set_diagnostics(self, diagnostics):
+        """显示错误波浪线，diagnostics 为 [(行, 列, 消息), ...]（行列从 0 开始）"""
+        by_line = {}
+        for line, column, message in diagnostics:
+            by_line.setdefault(line, []).append((column, message))
+        if by_line != self._diagnostics:
+            self._diagnostics = by_line
+            self._decorations_changed()
+            self._update_tooltip()
+
+    def _decorations_changed(self):
+        # 只重新处理可见区域，其余的块在滚动到可见区域时再处理
+        self._generation += 1
+        self._schedule()
+
+    def _update_tooltip(self):
+        """光标所在行有错误时，把错误信息作为编辑区的提示文字"""
+        messages = self._diagnostics.get(self.editor.textCursor().blockNumber(), ())
+        self.editor.viewport().setToolTip("\n".join(message for _, message in messages))
+
+    # ---- 调度 ----
+
+    def _schedule(self):
+        # 已经启动的定时器不重新计时，否则持续的重绘请求会让它一直推迟
+        if not self._visible_timer.isActive():
+            self._visible_timer.start()
+        if not self._idle_timer.isActive():
+            self._idle_timer.start()
+
+    def _on_update_request(self, rect, dy):
+        self._schedule()
+
+    def _on_contents_change(self, position, removed, added):
+        if self._applying:
+            return
+        block = self.document.findBlock(position)
+        last = self.document.findBlock(position + added)
+        # 插入产生的新块没有记录，只需清除首尾两个被修改的块
+        block.setUserData(None)
+        if last.isValid():
+            last.setUserData(None)
+
+        first = block.blockNumber()
+        count = self.document.blockCount()
+        delta = count - self._block_count
+        self._block_count = count
+        if first < self._done:
+            self._resume = self._done + delta
+            self._done = first
+        elif self._resume > first:
+            self._resume += delta
+        self._schedule()
+
+    def _idle_step(self):
+        """空闲时继续处理尚未处理的块"""
+        if self._done >= self.document.blockCount() or not self.editor.isVisible():
+            self._idle_timer.stop()
+            return
+        self._advance(self.document.blockCount(), time.perf_counter() + self.IDLE_SLICE_MS / 1000)
+
+    # ---- 高亮 ----
+
+    def _visible_range(self):
+        # 逐个取可见块的位置，不用 cursorForPosition：它会逐块经过折叠隐藏的块
+        editor = self.editor
+        height = editor.viewport().height()
+        offset = editor.contentOffset()
+        block = editor.firstVisibleBlock()
+        top = bottom = block.blockNumber()
+        while block.isValid():
+            if not block.isVisible():
+                block = self.document.findBlockByNumber(self._next_visible(block.blockNumber()))
+                continue
+            if editor.blockBoundingGeometry(block).translated(offset).top() >= height:
+                break
+            bottom = block.blockNumber()
+            block = block.next()
+        return max(0, top - self.MARGIN), min(self.document.blockCount() - 1, bottom + self.MARGIN)
+
+    def highlight_visible(self):
+        """立即处理可见区域（含前后 MARGIN 行）"""
+        first, last = self._visible_range()
+        if last < self._done + self.SYNC_LIMIT:
+            self._advance(last + 1)
+        self._highlight_detached(first, last)
+
+    def _state_before(self, block):
+        previous = block.previous()
+        return max(previous.userState(), 0) if previous.isValid() else 0
+
+    def _advance(self, target, deadline=None):
+        """按顺序处理块直到第 target 块（不含）或超过 deadline"""
+        n = self._done
+        block = self.document.findBlockByNumber(n)
+        state = self._state_before(block)
+        while block.isValid() and n < target:
+            old_state = block.userState()
+            state = self._apply(block, state)
+            block.setUserState(state)
+            n += 1
+            if n < self._resume and state == old_state:
+                # 状态与编辑前一致，之后的块沿用编辑前的结果
+                n, self._resume = self._resume, 0
+                block = self.document.findBlockByNumber(n)
+                state = self._state_before(block)
+            else:
+                block = block.next()
+            if deadline is not None and n % 64 == 0 and time.perf_counter() > deadline:
+                break
+        self._done = max(self._done, n)
+        if self._done >= self._resume:
+            self._resume = 0
+
+    def _highlight_detached(self, first, last):
+        """处理 first 到 last 之间可见的块，不更新块状态
+
+        _done 之前的块起始状态已知，只需补上变化了的装饰。其余的块从之前最近的同步点
+        开始计算，在 SYNC_LIMIT 行之内找不到同步点时以前一块记录的状态（或初始状态）
+        作为估计，估计得到的格式在顺序处理到这些块时会被更正。折叠隐藏的块整段跳过。
+        """
+        block = self.document.findBlockByNumber(first)
+        state = exact = previous = None
+        while block.isValid() and block.blockNumber() <= last:
+            n = block.blockNumber()
+            if not block.isVisible():
+                block = self.document.findBlockByNumber(self._next_visible(n))
+                continue
+            if previous is None or n != previous + 1:
+                state, exact = self._start_state(block)
+            state = self._apply(block, state, exact)
+            previous = n
+            block = block.next()
+
+    def _start_state(self, block):
+        """返回 (块的起始状态, 是否准确)"""
+        if block.blockNumber() <= self._done:
+            return self._state_before(block), True
+        start = block
+        for _ in range(self.SYNC_LIMIT):
+            text = start.text()
+            if text.strip() and not text.startswith(' '):
+                state = 0
+                break
+            previous = start.previous()
+            if not previous.isValid():
+                state = 0
+                break
+            if previous.blockNumber() < self._done:
+                state = max(previous.userState(), 0)
+                break
+            start = previous
+        else:
+            return self._state_before(block), False
+        while start != block:
+            state = highlight_line(start.text(), state)[1]
+            start = start.next()
+        return state, True
+
+    def _next_visible(self, line):
+        # 折叠编辑器提供跳过折叠区域的方法，其他编辑器逐块前进
+        next_visible = getattr(self.editor, 'next_visible_line', None)
+        return next_visible(line) if next_visible else line + 1
+
+    def _apply(self, block, state_in, exact=True):
+        """计算块的格式，与已应用的格式不一致时重新应用，返回块结束时的状态"""
+        text = block.text()
+        ranges, state = highlight_line(text, state_in)
+        info = block.userData()
+        if exact:
+            stale = (info is None or info.state_in != state_in
+                     or info.generation != self._generation)
+        else:
+            stale = info is None or info.generation != self._generation
+        if stale:
+            self._set_formats(block, text, ranges)
+            block.setUserData(_BlockInfo(state_in if exact else None, self._generation))
+        return state
+
+    def _set_formats(self, block, text, ranges):
+        formats = self.formats
+        format_ranges = []
+        for start, length, kind in ranges:
+            format_ranges.append(self._format_range(start, length, formats[kind]))
+        if self._search is not None:
+            for match in self._search.finditer(text):
+                if match.end() == match.start():
+                    continue
+                format_ranges.append(self._format_range(
+                    match.start(), match.end() - match.start(), formats['search']))
+        for column, _ in self._diagnostics.get(block.blockNumber(), ()):
+            start = min(column, max(len(text) - 1, 0))
+            end = len(text)
+            space = text.find(' ', start)
+            if space > start:
+                end = space
+            format_ranges.append(self._format_range(start, max(end - start, 1), formats['lint']))
+
+        self._applying = True
+        try:
+            block.layout().setFormats(format_ranges)
+            self.document.markContentsDirty(block.position(), block.length())
+        finally:
+            self._applying = False
+
+    @staticmethod
+    def _format_range(start, length, fmt):
+        format_range = QTextLayout.FormatRange()
+        format_range.start = start
+        format_range.length = length
+        format_range.format = fmt
+        return format_range
@@ -0,0 +1,196 @@
+import os
+from PyQt6.QtWidgets import (QDockWidget, QWidget, QVBoxLayout, QHBoxLayout, QComboBox,
+                             QLineEdit, QTreeWidget, QTreeWidgetItem, QLabel, QPushButton,
+                             QApplication)
+from PyQt6.QtCore import Qt, QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+from utils.workspace_index import WorkspaceIndex, QUERY_LIMIT
+
+
+class _IndexSignals(QObject):
+    """索引任务的信号（QRunnable 本身不能发信号）"""
+    progress = pyqtSignal(int, int)  # 已完成, 总数
+    finished = pyqtSignal(object, object)  # (重新索引的文件数, 删除的文件数), 异常
+
+
+class _IndexTask(QRunnable):
+    """在工作线程中增量更新工作区索引，文件在进程池中解析"""
+    def __init__(self, root):
+        super().__init__()
+        self.root = root
+        self.stopped = False
+        self.signals = _IndexSignals()
+
+    def run(self):
+        try:
+            # SQLite 连接不能跨线程，任务使用自己的连接
+            index = WorkspaceIndex(self.root)
+            try:
+                result = index.update(self.signals.progress.emit, lambda: self.stopped)
+            finally:
+                index.close()
+            self.signals.finished.emit(result, None)
+        except Exception as e:
+            self.signals.finished.emit(None, e)
+
+
+class WorkspacePanel(QDockWidget):
+    """工作区索引面板
+
+    打开文件夹后在后台索引其中所有的 YAML 文件（只重新索引修改过的文件），
+    可以按键路径、Kubernetes 对象的 kind/name 或锚点名查找，双击结果打开文件并跳到对应的行。
+    索引更新期间也可以查询，已完成的部分立即可查。
+    """
+    openRequested = pyqtSignal(str, int)  # 文件路径, 行号（从 1 开始）
+
+    QUERY_DELAY_MS = 200
+
+    def __init__(self, parent=None):
+        super().__init__("工作区", parent)
+        self.setObjectName("workspace_panel")
+        self.root = None
+        self.index = None
+        self._task = None
+        self._pending_refresh = False  # 换了文件夹时旧任务仍在运行，结束后再索引新文件夹
+
+        widget = QWidget()
+        layout = QVBoxLayout(widget)
+        layout.setContentsMargins(4, 4, 4, 4)
+
+        query_bar = QHBoxLayout()
+        self.kind_combo = QComboBox()
+        self.kind_combo.addItems(["路径", "kind/name", "锚点"])
+        self.kind_combo.currentIndexChanged.connect(self._on_kind_changed)
+        self.query_edit = QLineEdit()
+        self.query_edit.setClearButtonEnabled(True)
+        self.query_edit.textChanged.connect(self._schedule_query)
+        self.query_edit.returnPressed.connect(self.run_query)
+        self.refresh_button = QPushButton("重新索引")
+        self.refresh_button.clicked.connect(self.refresh)
+        query_bar.addWidget(self.kind_combo)
+        query_bar.addWidget(self.query_edit, 1)
+        query_bar.addWidget(self.refresh_button)
+        layout.addLayout(query_bar)
+
+        self.results = QTreeWidget()
+        self.results.setHeaderLabels(["文件", "行", "内容"])
+        self.results.setRootIsDecorated(False)
+        self.results.setUniformRowHeights(True)
+        self.results.itemActivated.connect(self._on_item_activated)
+        layout.addWidget(self.results)
+
+        self.status_label = QLabel("未打开工作区")
+        layout.addWidget(self.status_label)
+        self.setWidget(widget)
+        self._on_kind_changed()
+
+        # 输入停顿后再查询
+        self._query_timer = QTimer(self)
+        self._query_timer.setSingleShot(True)
+        self._query_timer.setInterval(self.QUERY_DELAY_MS)
+        self._query_timer.timeout.connect(self.run_query)
+
+        QApplication.instance().aboutToQuit.connect(self.stop)
+
+    def set_root(self, root):
+        """打开工作区文件夹并在后台更新索引"""
+        self.stop()
+        if self.index is not None:
+            self.index.close()
+        self.root = os.path.abspath(root)
+        self.index = WorkspaceIndex(self.root)
+        self.setWindowTitle(f"工作区 - {os.path.basename(self.root) or self.root}")
+        self.refresh()
+
+    def refresh(self):
+        """增量更新索引"""
+        if self.root is None:
+            return
+        if self._task is not None:
+            # 旧文件夹的任务已被停止，等它结束后再开始；同一文件夹的任务正在进行则无需重复
+            self._pending_refresh = self._task.root != self.root
+            return
+        self._task = _IndexTask(self.root)
+        self._task.setAutoDelete(False)
+        self._task.signals.progress.connect(self._on_progress)
+        self._task.signals.finished.connect(self._on_finished)
+        self.refresh_button.setEnabled(False)
+        self.status_label.setText("正在扫描文件...")
+        QThreadPool.globalInstance().start(self._task)
+
+    def stop(self):
+        """停止进行中的索引（已完成的部分保留）"""
+        if self._task is not None:
+            self._task.stopped = True
+
+    def _on_progress(self, done, total):
+        if self._task is None or self._task.stopped:
+            return
+        self.status_label.setText(f"正在索引: {done}/{total} 个文件")
+        if done and self.query_edit.text().strip():
+            self.run_query()
+
+    def _on_finished(self, result, error):
+        self._task = None
+        self.refresh_button.setEnabled(True)
+        if self._pending_refresh:
+            self._pending_refresh = False
+            self.refresh()
+            return
+        if error is not None:
+            print(f"更新工作区索引失败: {error}")
+            self.status_label.setText(f"更新索引失败: {error}")
+            return
+        files, failed, entries = self.index.stats()
+        text = f"已索引 {files} 个文件，{entries} 个键"
+        if failed:
+            text += f"，{failed} 个文件无法解析"
+        self.status_label.setText(text)
+        if self.query_edit.text().strip():
+            self.run_query()
+
+    def _on_kind_changed(self):
+        placeholders = ["spec.template.spec.containers[*].image（可使用 * 和 **）",
+                        "Deployment/名称（可使用 * 和 ?）",
+                        "锚点名（可使用 * 和 ?）"]
+        self.query_edit.setPlaceholderText(placeholders[self.kind_combo.currentIndex()])
+        self.run_query()
+
+    def _schedule_query(self):
+        self._query_timer.start()
+
+    def run_query(self):
+        """按当前的查询类型查找并显示结果"""
+        self.results.clear()
+        text = self.query_edit.text().strip()
+        if self.index is None or not text:
+            return
+        try:
+            kind = self.kind_combo.currentIndex()
+            if kind == 0:
+                rows = [(path, line, f"{key}: {value}" if value is not None else key)
+                        for path, line, key, value in self.index.find_path(text)]
+            elif kind == 1:
+                object_kind, _, name = text.rpartition('/')
+                rows = [(path, line, f"{found_kind}/{name}" + (f" ({namespace})" if namespace else ""))
+                        for path, line, found_kind, name, namespace
+                        in self.index.find_objects(object_kind, name)]
+            else:
+                rows = [(path, line, f"&{name}: {key}")
+                        for path, line, key, name in self.index.find_anchors(text)]
+        except ValueError as e:
+            self.results.addTopLevelItem(QTreeWidgetItem(["", "", str(e)]))
+            return
+
+        items = []
+        for path, line, content in rows:
+            item = QTreeWidgetItem([os.path.relpath(path, self.root), str(line), content])
+            item.setData(0, Qt.ItemDataRole.UserRole, (path, line))
+            items.append(item)
+        self.results.addTopLevelItems(items)
+        if len(rows) >= QUERY_LIMIT:
+            self.results.addTopLevelItem(QTreeWidgetItem(["", "", f"只显示前 {QUERY_LIMIT} 条结果"]))
+
+    def _on_item_activated(self, item, column):
+        location = item.data(0, Qt.ItemDataRole.UserRole)
+        if location:
+            self.openRequested.emit(*location)
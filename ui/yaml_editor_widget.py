@@ -1,11 +1,13 @@
-from PyQt6.QtWidgets import (QWidget, QTreeWidget, QTreeWidgetItem, 
+from PyQt6.QtWidgets import (QWidget, QTreeView, QStyledItemDelegate,
                            QVBoxLayout, QHBoxLayout, QPushButton, 
                            QMenu, QInputDialog, QMessageBox, QComboBox,
-                           QLineEdit, QLabel, QDialog, QDialogButtonBox,
-                           QPlainTextEdit, QStackedWidget)
-from PyQt6.QtCore import Qt, pyqtSignal
-import yaml
+                           QLineEdit, QLabel, QDialog, QDialogButtonBox)
+from PyQt6.QtCore import Qt, QModelIndex, QPersistentModelIndex, pyqtSignal
 import copy
+from utils import text_search
+from utils.parse_worker import ParseCancelled
+from utils.yaml_stream import YamlStream
+from .yaml_tree_model import YamlTreeModel, convert_value
 
 class AddNodeDialog(QDialog):
     def __init__(self, parent=None, is_list_item=False):
@@ -114,200 +116,179 @@ class AddNodeDialog(QDialog):
         
         return key, value
 
-class YamlTreeWidget(QTreeWidget):
-    contentChanged = pyqtSignal()  # 内容变化信号
+class ValuePreviewDelegate(QStyledItemDelegate):
+    """值列的委托：绘制时才按列宽截断预览文本"""
+    def initStyleOption(self, option, index):
+        super().initStyleOption(option, index)
+        if option.text:
+            option.text = option.fontMetrics.elidedText(
+                option.text, Qt.TextElideMode.ElideRight, option.rect.width())
+
+class YamlTreeWidget(QTreeView):
+    contentChanged = pyqtSignal()  # 结构变化信号
+    valueEdited = pyqtSignal(object, object)  # 单个标量被修改：路径, 新值
+    valuesEdited = pyqtSignal(object)  # 一批标量被修改：[(路径, 新值), ...]
+    
+    # 加载时默认展开的层数，更深的节点在展开时才计算
+    EXPAND_DEPTH = 2
+    # 自动展开最多显示的行数，超过后其余节点保持折叠
+    EXPAND_ROW_LIMIT = 2000
+    # 查找后自动展开到前多少个匹配，其余的匹配在跳转到时再展开
+    SEARCH_EXPAND_HITS = 200
     
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.setHeaderLabels(["键", "值", "类型"])
+        self.tree_model = YamlTreeModel(self)
+        self.setModel(self.tree_model)
         self.setColumnWidth(0, 200)
         self.setColumnWidth(1, 300)
+        self.setUniformRowHeights(True)  # 行高一致，滚动时无需逐行测量
+        self.setItemDelegateForColumn(1, ValuePreviewDelegate(self))
         
         # 启用编辑
-        self.setEditTriggers(QTreeWidget.EditTrigger.DoubleClicked | 
-                           QTreeWidget.EditTrigger.EditKeyPressed)
+        self.setEditTriggers(QTreeView.EditTrigger.DoubleClicked | 
+                           QTreeView.EditTrigger.EditKeyPressed)
         
         # 右键菜单
         self.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         self.customContextMenuRequested.connect(self.show_context_menu)
         
-        # 连接编辑完成信号
-        self.itemChanged.connect(self.on_item_edited)
+        # 模型内容变化
+        self.tree_model.contentChanged.connect(self.contentChanged)
+        self.tree_model.valueEdited.connect(self.valueEdited)
+        self.tree_model.valuesEdited.connect(self.valuesEdited)
+        self.tree_model.invalidInput.connect(self.on_invalid_input)
+        # 多文档流中的文档在展开时才解析
+        self.expanded.connect(self.tree_model.load_document)
+        
+        # 查找结果：匹配的路径（按文档顺序）和筛选条件 {父节点路径: 要显示的子节点键}
+        self._pattern = None
+        self._hits = None
+        self._hit_numbers = {}
+        self._hit = None  # 最近选中的匹配序号
+        self._filter = None
+        self._hidden = []  # 被隐藏的行
+        self.expanded.connect(self._on_expanded)
+        # 数据变化后匹配结果失效，下次查找时重新查找
+        for signal in (self.tree_model.contentChanged, self.tree_model.valueEdited,
+                       self.tree_model.valuesEdited, self.tree_model.rowsInserted,
+                       self.tree_model.rowsRemoved):
+            signal.connect(self._invalidate_hits)
+        self.tree_model.modelReset.connect(self.clear_search)
         
         # 添加工具栏
         self.toolbar = QHBoxLayout()
         self.add_root_btn = QPushButton("添加根节点")
         self.add_root_btn.clicked.connect(self.add_root_item)
         self.toolbar.addWidget(self.add_root_btn)
-        
-        # 展开所有项
-        self.expandAll()
-        
-        # 防止循环更新
-        self._updating = False
+        self.filter_label = QLabel()
+        self.clear_filter_btn = QPushButton("清除筛选")
+        self.clear_filter_btn.clicked.connect(self.clear_search)
+        self.filter_label.hide()
+        self.clear_filter_btn.hide()
+        self.toolbar.addWidget(self.filter_label)
+        self.toolbar.addWidget(self.clear_filter_btn)
     
-    def on_item_edited(self, item, column):
-        """处理项目编辑完成事件"""
-        if self._updating:
-            return
-            
-        self._updating = True
-        try:
-            if column == 0:  # 编辑键
-                # 对于列表项，不允许编辑键（索引）
-                parent = item.parent()
-                if parent and isinstance(parent.data(0, Qt.ItemDataRole.UserRole), list):
-                    # 恢复原始索引值，不显示警告
-                    item.setText(0, str(self._get_list_index(item)))
-                    return
-            
-            elif column == 1:  # 编辑值
-                value = item.data(0, Qt.ItemDataRole.UserRole)
-                new_text = item.text(1)
-                
-                # 根据原始类型转换新值
-                try:
-                    if isinstance(value, bool):
-                        new_value = new_text.lower() in ['true', '1', 'yes', 'y']
-                    elif isinstance(value, int):
-                        new_value = int(new_text)
-                    elif isinstance(value, float):
-                        new_value = float(new_text)
-                    else:
-                        new_value = new_text
-                    
-                    item.setData(0, Qt.ItemDataRole.UserRole, new_value)
-                    item.setText(1, str(new_value))
-                    item.setText(2, type(new_value).__name__)
-                except ValueError:
-                    item.setText(1, str(value))
-                    QMessageBox.warning(self, "警告", "输入的值格式不正确")
-            
-            self.contentChanged.emit()
-            
-        finally:
-            self._updating = False
-    
-    def _get_list_index(self, item):
-        """获取列表项的实际索引"""
-        parent = item.parent()
-        if parent:
-            return parent.indexOfChild(item)
-        return 0
+    def on_invalid_input(self, message):
+        """提示输入不合法"""
+        QMessageBox.warning(self, "警告", message)
     
     def keyPressEvent(self, event):
         """处理键盘事件"""
         if event.key() == Qt.Key.Key_Delete:
-            current = self.currentItem()
-            if current:
+            current = self.currentIndex()
+            if current.isValid():
                 self.delete_item(current)
         elif event.key() == Qt.Key.Key_Insert:
-            current = self.currentItem()
-            if current:
+            current = self.currentIndex()
+            if current.isValid():
                 self.add_child_item(current)
             else:
                 self.add_root_item()
         else:
             super().keyPressEvent(event)
     
-    def _add_item(self, parent, key, value):
-        """递归添加节点"""
-        item = QTreeWidgetItem(parent)
-        item.setFlags(item.flags() | Qt.ItemFlag.ItemIsEditable)  # 使项目可编辑
-        item.setText(0, str(key))
-        item.setText(1, str(value))
-        item.setText(2, type(value).__name__)
-        item.setData(0, Qt.ItemDataRole.UserRole, value)
-        
-        if isinstance(value, dict):
-            for k, v in value.items():
-                self._add_item(item, k, v)
-        elif isinstance(value, list):
-            for i, v in enumerate(value):
-                self._add_item(item, str(i), v)
-    
     def add_root_item(self):
         """添加根节点"""
-        dialog = AddNodeDialog(self)
-        if dialog.exec() == QDialog.DialogCode.Accepted:
-            key, value = dialog.get_data()
-            if key is not None:  # 确保输入有效
-                item = QTreeWidgetItem(self)
-                item.setFlags(item.flags() | Qt.ItemFlag.ItemIsEditable)
-                item.setText(0, str(key))
-                item.setText(1, str(value))
-                item.setText(2, type(value).__name__)
-                item.setData(0, Qt.ItemDataRole.UserRole, value)
-                self.contentChanged.emit()
-    
-    def add_child_item(self, parent_item):
+        if self.tree_model.is_multi_document():
+            QMessageBox.warning(self, "警告", "多文档文件请在各个文档下添加节点")
+            return
+        self._add_node(QModelIndex())
+    
+    def add_child_item(self, parent_index):
         """添加子节点"""
-        parent_value = parent_item.data(0, Qt.ItemDataRole.UserRole)
+        parent_value = self.tree_model.value(parent_index)
         if not isinstance(parent_value, (dict, list)):
             QMessageBox.warning(self, "警告", "只能向字典或列表添加子项")
             return
-        
+        self._add_node(parent_index.siblingAtColumn(0))
+    
+    def _add_node(self, parent_index):
+        """弹出对话框并向指定节点添加子项"""
         # 如果是列表，则不需要输入键名
-        is_list_item = isinstance(parent_value, list)
+        is_list_item = self.tree_model.is_list_parent(parent_index)
         dialog = AddNodeDialog(self, is_list_item=is_list_item)
         
         if dialog.exec() == QDialog.DialogCode.Accepted:
             key, value = dialog.get_data()
-            if value is not None:  # 确保输入有效
-                item = QTreeWidgetItem(parent_item)
-                item.setFlags(item.flags() | Qt.ItemFlag.ItemIsEditable)
-                
-                # 如果是列表项，使用当前索引作为键
-                if is_list_item:
-                    key = str(self._get_list_index(item))
-                
-                item.setText(0, str(key))
-                item.setText(1, str(value))
-                item.setText(2, type(value).__name__)
-                item.setData(0, Qt.ItemDataRole.UserRole, value)
-                parent_item.setExpanded(True)
-                self.contentChanged.emit()
-    
-    def _update_list_indices(self, parent_item):
-        """更新列表项的索引"""
-        if isinstance(parent_item.data(0, Qt.ItemDataRole.UserRole), list):
-            for i in range(parent_item.childCount()):
-                child = parent_item.child(i)
-                child.setText(0, str(i))
+            if key is None and not is_list_item:
+                return  # 输入无效
+            if is_list_item and value is None and "空值" not in dialog.type_combo.currentText():
+                return  # 输入无效
+            index = self.tree_model.insert_child(parent_index, key, value)
+            if index.isValid():
+                if parent_index.isValid():
+                    self.expand(parent_index)
+                self.setCurrentIndex(index)
     
     def show_context_menu(self, position):
         """显示右键菜单"""
-        item = self.itemAt(position)
+        index = self.indexAt(position)
         menu = QMenu()
         
-        if item:
+        if index.isValid():
             add_action = menu.addAction("添加子项")
             edit_action = menu.addAction("编辑")
             delete_action = menu.addAction("删除")
+            anchor_action = None
+            if self.tree_model.is_alias(index.siblingAtColumn(0)):
+                anchor_action = menu.addAction("跳转到锚点")
             
-            action = menu.exec(self.mapToGlobal(position))
+            action = menu.exec(self.viewport().mapToGlobal(position))
             
-            if action == add_action:
-                self.add_child_item(item)
+            if action is not None and action == anchor_action:
+                self.goto_anchor(index)
+            elif action == add_action:
+                self.add_child_item(index)
             elif action == edit_action:
-                self.edit_item(item)
+                self.edit_item(index)
             elif action == delete_action:
-                self.delete_item(item)
+                self.delete_item(index)
         else:
             add_action = menu.addAction("添加根节点")
-            action = menu.exec(self.mapToGlobal(position))
+            action = menu.exec(self.viewport().mapToGlobal(position))
             if action == add_action:
                 self.add_root_item()
     
-    def edit_item(self, item):
+    def goto_anchor(self, index):
+        """选中别名所引用的锚点所在行"""
+        target = self.tree_model.anchor_index(index.siblingAtColumn(0))
+        if target.isValid():
+            self.scrollTo(target)
+            self.setCurrentIndex(target)
+    
+    def edit_item(self, index):
         """编辑节点"""
-        if not item:
+        if not index.isValid():
             return
             
-        value = item.data(0, Qt.ItemDataRole.UserRole)
+        value = self.tree_model.value(index)
         if isinstance(value, (dict, list)):
             QMessageBox.warning(self, "警告", "不能直接编辑字典或列表的值")
             return
+        if not self.tree_model.flags(index.siblingAtColumn(1)) & Qt.ItemFlag.ItemIsEditable:
+            QMessageBox.warning(self, "警告", "该节点的值不能直接编辑")
+            return
             
         new_value, ok = QInputDialog.getText(
             self, "编辑值", "输入新值:",
@@ -317,22 +298,14 @@ class YamlTreeWidget(QTreeWidget):
         if ok:
             try:
                 # 尝试保持原来的类型
-                if isinstance(value, bool):
-                    new_value = new_value.lower() in ['true', '1', 'yes', 'y']
-                elif isinstance(value, int):
-                    new_value = int(new_value)
-                elif isinstance(value, float):
-                    new_value = float(new_value)
-                
-                item.setText(1, str(new_value))
-                item.setData(0, Qt.ItemDataRole.UserRole, new_value)
-                self.contentChanged.emit()
+                new_value = convert_value(value, new_value)
+                self.tree_model.set_value(index, new_value)
             except ValueError:
                 QMessageBox.warning(self, "警告", "输入的值格式不正确")
     
-    def delete_item(self, item):
+    def delete_item(self, index):
         """删除节点"""
-        if not item:
+        if not index.isValid():
             return
             
         reply = QMessageBox.question(
@@ -342,66 +315,187 @@ class YamlTreeWidget(QTreeWidget):
         )
         
         if reply == QMessageBox.StandardButton.Yes:
-            parent = item.parent()
-            if parent:
-                parent.removeChild(item)
-                # 如果是列表，更新其他项的索引
-                if isinstance(parent.data(0, Qt.ItemDataRole.UserRole), list):
-                    self._update_list_indices(parent)
-            else:
-                self.invisibleRootItem().removeChild(item)
-            self.contentChanged.emit()
-    
-    def dropEvent(self, event):
-        """处理拖放事件"""
-        super().dropEvent(event)
-        # 更新所有列表的索引
-        root = self.invisibleRootItem()
-        for i in range(root.childCount()):
-            item = root.child(i)
-            if isinstance(item.data(0, Qt.ItemDataRole.UserRole), list):
-                self._update_list_indices(item)
-        self.contentChanged.emit()
+            self.tree_model.remove(index.siblingAtColumn(0))
     
-    def to_yaml_data(self):
-        """将树形结构转换为YAML数据"""
-        data = {}
-        root = self.invisibleRootItem()
-        
-        for i in range(root.childCount()):
-            item = root.child(i)
-            key = item.text(0)
-            value = self._get_item_data(item)
-            data[key] = value
-        
-        return data
+    # ---- 查找 ----
     
-    def _get_item_data(self, item):
-        """递归获取节点数据"""
-        value = item.data(0, Qt.ItemDataRole.UserRole)
-        
-        if isinstance(value, dict):
-            result = {}
-            for i in range(item.childCount()):
-                child = item.child(i)
-                result[child.text(0)] = self._get_item_data(child)
-            return result
-        elif isinstance(value, list):
-            result = []
-            for i in range(item.childCount()):
-                child = item.child(i)
-                result.append(self._get_item_data(child))
-            return result
+    def search(self, pattern):
+        """查找键或值与 pattern 匹配的节点，树中只显示通向匹配节点的路径，返回匹配个数
+        
+        匹配的节点由查找索引直接给出行号路径，不逐行检查。查找内容不变且数据没有修改时
+        直接使用上一次的结果；数据修改后重新查找，已展开的行保持展开。
+        """
+        if self._hits is not None and pattern == self._pattern:
+            return len(self._hits)
+        refresh = pattern == self._pattern and self._filter is not None
+        if not refresh:
+            self._hit = None
+        self._pattern = pattern
+        hits = self.tree_model.find_rows(pattern)
+        self._hits = hits
+        self._hit_numbers = {rows: number for number, rows in enumerate(hits)}
+        self._set_filter(hits, expand=not refresh)
+        self.filter_label.setText(f"筛选: {len(hits):,} 个匹配")
+        self.filter_label.show()
+        self.clear_filter_btn.show()
+        return len(hits)
+    
+    def next_hit(self, search_up=False):
+        """选中当前行之后（或之前）的下一个匹配，到达首尾时从另一端开始，返回其序号"""
+        if not self._hits:
+            return None
+        current = self.currentIndex()
+        number = None
+        if current.isValid():
+            number = self._hit_numbers.get(self.tree_model.row_path(current))
+        if number is not None:
+            number += -1 if search_up else 1
+        elif self._hit is not None:
+            # 上一次选中的匹配已被替换掉，原序号处就是它之后的匹配
+            number = self._hit - 1 if search_up else self._hit
         else:
-            return value
+            number = -1 if search_up else 0
+        number %= len(self._hits)
+        self._select_hit(number)
+        return number
+    
+    def _select_hit(self, number):
+        index = self.tree_model.index_from_rows(self._hits[number])
+        if self.reveal(index):
+            self._hit = number
+    
+    def reveal(self, index):
+        """展开上级节点并选中 index，返回 index 是否有效"""
+        if not index.isValid():
+            return False
+        self._expand_to(index)
+        self.setCurrentIndex(index)
+        self.scrollTo(index)
+        return True
+    
+    def _expand_to(self, index):
+        """展开 index 的所有上级节点"""
+        ancestors = []
+        parent = index.parent()
+        while parent.isValid():
+            ancestors.append(parent)
+            parent = parent.parent()
+        for parent in reversed(ancestors):
+            self.expand(parent)
+    
+    def replace_current(self, pattern, replacement, regex=False):
+        """当前行是匹配的标量时替换它的值，返回是否替换；替换内容无效时抛出 re.error"""
+        index = self.currentIndex().siblingAtColumn(0)
+        if (not index.isValid() or not self._hits
+                or self.tree_model.row_path(index) not in self._hit_numbers):
+            return False
+        if not self.tree_model.flags(index.siblingAtColumn(1)) & Qt.ItemFlag.ItemIsEditable:
+            return False
+        value = self.tree_model.value(index)
+        text = text_search.substitute(str(value), pattern, replacement, regex)
+        try:
+            new_value = convert_value(value, text)
+        except ValueError:
+            self.on_invalid_input("替换后的值与原值的类型不符")
+            return False
+        return self.tree_model.set_value(index, new_value)
+    
+    def clear_search(self):
+        """取消筛选，显示所有行"""
+        self._unhide_rows()
+        self._pattern = None
+        self._hits = None
+        self._hit_numbers = {}
+        self._hit = None
+        self._filter = None
+        self.filter_label.hide()
+        self.clear_filter_btn.hide()
+    
+    def _invalidate_hits(self, *args):
+        self._hits = None
+    
+    def _set_filter(self, hits, expand):
+        """按匹配的行号路径设置筛选条件 {父节点的行号路径: 要显示的行}
+        
+        只处理根节点和已展开的父节点下的行，其余父节点在展开时再处理（见 _on_expanded）。
+        expand 为 True 时再展开到前 SEARCH_EXPAND_HITS 个匹配。
+        """
+        self._unhide_rows()
+        self._filter = {}
+        for rows in hits:
+            for depth in range(len(rows)):
+                self._filter.setdefault(rows[:depth], set()).add(rows[depth])
+        
+        model = self.tree_model
+        for rows in self._filter:
+            parent = model.index_from_rows(rows)
+            if not rows or self.isExpanded(parent):
+                self._apply_filter(parent, rows)
+        if expand:
+            for rows in hits[:self.SEARCH_EXPAND_HITS]:
+                self._expand_to(model.index_from_rows(rows))
+    
+    def _on_expanded(self, index):
+        # 数据修改后行号可能已经变化，等重新查找后再筛选
+        if self._filter is not None and self._hits is not None:
+            self._apply_filter(index, self.tree_model.row_path(index))
+    
+    def _apply_filter(self, parent, rows):
+        """隐藏 parent 下不在任何匹配路径上的行"""
+        keep = self._filter.get(rows)
+        if keep is None:
+            return  # 匹配的容器本身，子行全部显示
+        model = self.tree_model
+        for row in range(model.rowCount(parent)):
+            if row not in keep:
+                self.setRowHidden(row, parent, True)
+                self._hidden.append(QPersistentModelIndex(model.index(row, 0, parent)))
+    
+    def _unhide_rows(self):
+        hidden, self._hidden = self._hidden, []
+        for index in hidden:
+            if index.isValid():
+                self.setRowHidden(index.row(), index.parent(), False)
+    
+    def to_yaml_data(self):
+        """返回树形结构对应的YAML数据"""
+        return self.tree_model.root_data()
     
     def from_yaml_data(self, data):
         """从YAML数据加载树形结构"""
-        self.clear()
-        if isinstance(data, dict):
-            for key, value in data.items():
-                self._add_item(self.invisibleRootItem(), key, value)
-        self.expandAll()
+        self.from_stream(YamlStream.from_data(data))
+    
+    def from_stream(self, stream):
+        """从文档流加载树形结构
+
+        首次加载时只展开前几层；之后的加载与现有树比较，只更新变化的行，
+        展开状态、选中项和滚动位置保持不变。
+        """
+        if self.tree_model.rowCount() == 0:
+            self.tree_model.set_stream(stream)
+            self._expand_initial()
+        else:
+            self.tree_model.reconcile(stream)
+    
+    def _expand_initial(self):
+        """逐层展开前 EXPAND_DEPTH 层，可见行数超过上限时停止"""
+        model = self.tree_model
+        level = [QModelIndex()]
+        visible = model.rowCount()
+        for _ in range(self.EXPAND_DEPTH):
+            next_level = []
+            for parent in level:
+                for row in range(model.rowCount(parent)):
+                    index = model.index(row, 0, parent)
+                    count = model.rowCount(index)
+                    if not count or model.is_alias(index):
+                        continue  # 别名行只在用户展开时读取
+                    if visible + count > self.EXPAND_ROW_LIMIT:
+                        return
+                    self.expand(index)
+                    visible += count
+                    next_level.append(index)
+            level = next_level
 
 class YamlEditorWidget(QWidget):
     def __init__(self, parent=None):
@@ -411,38 +505,78 @@ class YamlEditorWidget(QWidget):
         # 创建树形编辑器
         self.tree = YamlTreeWidget(self)
         layout.addLayout(self.tree.toolbar)
+        
+        # 解析失败或被取消时的提示
+        self.status_label = QLabel()
+        self.status_label.setWordWrap(True)
+        self.status_label.setStyleSheet("color: #c62828; padding: 4px;")
+        self.status_label.hide()
+        layout.addWidget(self.status_label)
         layout.addWidget(self.tree)
         
         # 连接信号
         self.tree.contentChanged.connect(self.on_content_changed)
+        self.tree.valueEdited.connect(self.on_content_changed)
+        self.tree.valuesEdited.connect(self.on_content_changed)
         
         # 用于跟踪修改状态
         self._modified = False
         self._can_convert_tree = True
-    def setPlainText(self, text):
-        """从文本加载YAML"""
-        try:
-            data = yaml.safe_load(text) or {}
-            self.tree.from_yaml_data(data)
-            self._modified = False
-            self._can_convert_tree = True  # 成功加载时设置为True
-        except Exception as e:
-            self._can_convert_tree = False  # 加载失败时设置为False
-            print("警告", f"加载YAML失败: {str(e)}")
+        self.load_error = None  # 最近一次加载失败的原因
+    def load_data(self, data):
+        """加载已解析好的YAML数据"""
+        self.load_stream(YamlStream.from_data(data))
+
+    def load_stream(self, stream):
+        """加载已切分好的文档流（例如后台线程的解析结果）"""
+        self.tree.from_stream(stream)
+        self._set_tree_enabled(True)
+        self.status_label.hide()
+        self.load_error = None
+        self._modified = False
+        self._can_convert_tree = True  # 成功加载时设置为True
+
+    def set_pending(self):
+        """文本已更换、后台解析尚未完成：显示提示，并在新结果加载前禁止编辑旧的树"""
+        self._set_tree_enabled(False)
+        self.status_label.setText("正在解析...")
+        self.status_label.show()
+    
+    def _set_tree_enabled(self, enabled):
+        self.tree.setEnabled(enabled)
+        self.tree.add_root_btn.setEnabled(enabled)
+    
+    def set_load_error(self, error):
+        """记录解析失败"""
+        self._can_convert_tree = False  # 加载失败时设置为False
+        self.load_error = error
+        if isinstance(error, ParseCancelled):
+            self.status_label.setText(f"解析已取消: {str(error)}")
+        else:
+            self.status_label.setText(f"解析失败，树形视图未更新: {str(error)}")
+        self.status_label.show()
+        print("警告", f"加载YAML失败: {str(error)}")
 
     def canConvertTree(self):
         return self._can_convert_tree
 
     def toPlainText(self):
-        """将树形结构转换为YAML文本"""
+        """将树形结构转换为YAML文本（不改变已加载的文档流）"""
         try:
-            data = self.tree.to_yaml_data()
-            return yaml.dump(data, allow_unicode=True, sort_keys=False)
+            return self.tree.tree_model.stream().to_text()
         except Exception as e:
             QMessageBox.warning(self, "警告", f"生成YAML失败: {str(e)}")
             return ""
     
-    def on_content_changed(self):
+    def rewrite_text(self):
+        """重新生成YAML文本，文档流的原文随之改为新文本（调用方须用它替换编辑器内容）"""
+        try:
+            return self.tree.tree_model.stream().rewrite()
+        except Exception as e:
+            QMessageBox.warning(self, "警告", f"生成YAML失败: {str(e)}")
+            return None
+    
+    def on_content_changed(self, *args):
         """内容变化时的处理"""
         self._modified = True
     
@@ -453,98 +587,4 @@ class YamlEditorWidget(QWidget):
                 self._modified = modified
             def isModified(self):
                 return self._modified
-        return Document(self._modified) 
-
-class SwitchableEditor(QWidget):
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.layout = QVBoxLayout(self)
-        self.layout.setContentsMargins(0, 0, 0, 0)
-        
-        # 创建工具栏
-        toolbar = QHBoxLayout()
-        self.view_combo = QComboBox()
-        self.view_combo.addItems(["文本视图", "树形视图"])  # 改变默认顺序
-        self.view_combo.currentTextChanged.connect(self.switch_view)
-        toolbar.addWidget(QLabel("编辑器视图:"))
-        toolbar.addWidget(self.view_combo)
-        toolbar.addStretch()
-        self.layout.addLayout(toolbar)
-        
-        # 创建堆叠部件来容纳两种编辑器
-        self.stack = QStackedWidget()
-        self.layout.addWidget(self.stack)
-        
-        # 创建两种编辑器
-        self.text_editor = QPlainTextEdit()  # 文本编辑器放在前面
-        self.tree_editor = YamlEditorWidget()
-        
-        # 添加到堆叠部件
-        self.stack.addWidget(self.text_editor)  # 文本编辑器作为默认视图
-        self.stack.addWidget(self.tree_editor)
-        
-        # 连接编辑器的修改信号
-        self.tree_editor.tree.contentChanged.connect(self.on_tree_changed)
-        self.text_editor.textChanged.connect(self.on_text_changed)
-        
-        # 用于防止循环更新
-        self._updating = False
-
-    def is_tree_view(self):
-        """检查当前是否为树形视图"""
-        return self.stack.currentWidget() == self.tree_editor
-
-    def load_yaml_file(self, file_path):
-        """加载 YAML 文件"""
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                if self.is_tree_view():  # 仅在树形视图下加载
-                    self.tree_editor.load_yaml(content)
-                else:
-                    # 在文本视图下直接显示内容
-                    self.text_editor.setPlainText(content)
-        except Exception as e:
-            if self.is_tree_view():  # 仅在树形视图下显示错误
-                QMessageBox.critical(self, "加载失败", f"该文件不支持使用树形视图: {str(e)}")
-                self.view_combo.setCurrentText("文本视图")  # 切换回文本视图
-                self.text_editor.setPlainText(content)  # 显示内容
-            else:
-                # 在文本视图下不显示错误
-                pass
-
-    def switch_view(self, view_name):
-        """切换编辑器视图"""
-        if view_name == "树形视图":
-            if self.stack.currentWidget() != self.tree_editor:
-                try:
-                    text = self.text_editor.toPlainText()
-                    if not text.strip():
-                        raise ValueError("空文件不能使用树形视图")
-                        
-                    # 尝试解析YAML
-                    self.tree_editor.setPlainText(text)
-                    
-                    # 检查是否可以转换为树形结构
-                    if not self.tree_editor.canConvertTree():
-                        raise ValueError("该文件不支持树形视图编辑")
-                        
-                    self.stack.setCurrentWidget(self.tree_editor)
-                except Exception as e:
-                    QMessageBox.warning(self, "警告", f"无法切换到树形视图: {str(e)}")
-                    # 恢复下拉框选择
-                    self.view_combo.blockSignals(True)
-                    self.view_combo.setCurrentText("文本视图")
-                    self.view_combo.blockSignals(False)
-                    return
-        else:
-            if self.stack.currentWidget() != self.text_editor:
-                self.update_text_from_tree()
-                self.stack.setCurrentWidget(self.text_editor)
-
-    def update_theme(self, theme_style):
-        """更新编辑器主题"""
-        self.setStyleSheet(theme_style)
-        # 更新子组件样式
-        self.text_editor.setStyleSheet(theme_style)
-        self.tree_editor.setStyleSheet(theme_style)
\ No newline at end of file
+        return Document(self._modified)
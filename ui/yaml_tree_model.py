@@ -0,0 +1,972 @@
+from PyQt6.QtCore import Qt, QAbstractItemModel, QModelIndex, pyqtSignal
+from PyQt6.QtGui import QColor
+from array import array
+import difflib
+from utils import text_search
+from utils.parse_worker import ParseCancelled
+from utils.yaml_stream import YamlDocument, YamlStream
+
+
+# 值列预览最多显示的字符数
+PREVIEW_CHARS = 200
+# 别名行的文字颜色
+ALIAS_COLOR = QColor("#1a5fb4")
+
+
+def summarize_value(value):
+    """返回值列的显示文本：容器只显示元素个数，长字符串只取第一行的开头部分"""
+    if isinstance(value, dict):
+        return f"{{{len(value):,} 个键}}"
+    if isinstance(value, list):
+        return f"[{len(value):,} 项]"
+    if isinstance(value, str):
+        end = value.find('\n', 0, PREVIEW_CHARS + 1)
+        if end == -1 and len(value) <= PREVIEW_CHARS:
+            return value
+        if end == -1:
+            end = PREVIEW_CHARS
+        return value[:end] + '…'
+    return str(value)
+
+
+def convert_value(old_value, text):
+    """按原值的类型转换用户输入，格式错误时抛出 ValueError"""
+    if isinstance(old_value, bool):
+        return text.lower() in ['true', '1', 'yes', 'y']
+    elif isinstance(old_value, int):
+        return int(text)
+    elif isinstance(old_value, float):
+        return float(text)
+    return text
+
+
+def convert_replacement(old_value, text):
+    """按原值的类型转换批量替换后的文本，格式错误时抛出 ValueError
+
+    布尔值和空值只接受同类型的字面量（true/false、null/~），否则 "True" 中的部分匹配
+    会被当作 false、"None" 会变成字符串。
+    """
+    if isinstance(old_value, bool):
+        literal = text.strip().lower()
+        if literal not in ('true', 'false'):
+            raise ValueError(f"不是布尔值: {text}")
+        return literal == 'true'
+    if old_value is None:
+        if text.strip().lower() not in ('null', '~', 'none'):
+            raise ValueError(f"不是空值: {text}")
+        return None
+    return convert_value(old_value, text)
+
+
+# 节点类型标记
+TAG_SCALAR = 0
+TAG_DICT = 1
+TAG_LIST = 2
+TAG_PENDING = 3  # 尚未解析（或解析失败）的文档，值为 YamlDocument
+TAG_STREAM = 4   # 多文档流的根节点，值为文档列表
+
+# 有子节点的类型
+CONTAINER_TAGS = (TAG_DICT, TAG_LIST, TAG_STREAM)
+
+
+def tag_of(value):
+    """返回值的类型标记"""
+    if isinstance(value, dict):
+        return TAG_DICT
+    if isinstance(value, list):
+        return TAG_LIST
+    if isinstance(value, YamlDocument):
+        return TAG_PENDING
+    return TAG_SCALAR
+
+
+def document_value(doc):
+    """文档节点的值：解析成功后为文档数据，否则为文档本身"""
+    if doc.parsed and doc.error is None:
+        return doc.data
+    return doc
+
+
+class _Node:
+    """节点表中的一条记录
+
+    只保存父节点编号、行号、键（字典键或列表下标）、类型标记和对值的引用，
+    不复制数据；子节点记录在视图访问到对应行时才创建。
+    """
+    __slots__ = ('parent', 'row', 'key', 'tag', 'value', 'children', 'keys')
+
+    def __init__(self, parent, row, key, value):
+        self.parent = parent
+        self.row = row
+        self.key = key
+        self.tag = tag_of(value)
+        self.value = value
+        self.children = None  # array('q')，-1 表示该行的记录尚未创建
+        self.keys = None      # 字典节点的键列表（按行排列）
+
+
+class NodeTable:
+    """节点编号到节点记录的映射表
+
+    QModelIndex 只携带节点编号（internalId），所有节点信息都通过这张表查询。
+    释放的编号在之后创建节点时重新使用，表的大小不随编辑次数增长。
+    """
+    ROOT = 0
+
+    def __init__(self, data, root_tag=None):
+        root = _Node(-1, 0, None, data)
+        if root_tag is not None:
+            root.tag = root_tag
+        self._nodes = [root]
+        self._free = []  # 已释放、可重新使用的编号
+        self._live = {self.ROOT}  # 正在使用的编号
+
+    def __getitem__(self, node_id):
+        return self._nodes[node_id]
+
+    def __len__(self):
+        """正在使用的节点数"""
+        return len(self._live)
+
+    def live_ids(self):
+        """返回正在使用的节点编号（不按顺序）"""
+        return list(self._live)
+
+    def add(self, parent_id, row, key, value):
+        """登记一个节点，返回其编号"""
+        node = _Node(parent_id, row, key, value)
+        if self._free:
+            node_id = self._free.pop()
+            self._nodes[node_id] = node
+        else:
+            node_id = len(self._nodes)
+            self._nodes.append(node)
+        self._live.add(node_id)
+        return node_id
+
+    def children(self, node_id):
+        """返回子节点编号数组（未创建的行为 -1），首次访问时分配"""
+        node = self._nodes[node_id]
+        if node.children is None:
+            if node.tag not in CONTAINER_TAGS:
+                node.children = array('q')
+            else:
+                node.children = array('q', [-1]) * len(node.value)
+                if node.tag == TAG_DICT:
+                    node.keys = list(node.value)
+        return node.children
+
+    def child(self, node_id, row):
+        """返回第 row 个子节点的编号，必要时创建记录"""
+        children = self.children(node_id)
+        child_id = children[row]
+        if child_id < 0:
+            node = self._nodes[node_id]
+            if node.tag == TAG_DICT:
+                key = node.keys[row]
+                value = node.value.get(key)
+            elif node.tag == TAG_STREAM:
+                key = row
+                value = document_value(node.value[row])
+            else:
+                key = row
+                value = node.value[row] if row < len(node.value) else None
+            child_id = self.add(node_id, row, key, value)
+            children[row] = child_id
+        return child_id
+
+    def nodes_with_value(self, value):
+        """返回值为该对象（按身份比较）的所有节点编号"""
+        return [i for i in self._live if self._nodes[i].value is value]
+
+    def release(self, node_id):
+        """释放节点及其已创建的子孙节点，编号留待重新使用"""
+        stack = [node_id]
+        while stack:
+            released = stack.pop()
+            node = self._nodes[released]
+            if node.children is not None:
+                stack.extend(c for c in node.children if c >= 0)
+            node.value = None
+            node.children = None
+            node.keys = None
+            if released in self._live:
+                self._live.discard(released)
+                self._free.append(released)
+
+
+class YamlTreeModel(QAbstractItemModel):
+    """直接读取 yaml 解析结果（dict/list）的树形模型
+
+    行在视图请求时才计算，数据本身只保存一份，编辑直接写回原始容器。
+    每个索引只携带节点编号，节点信息保存在 NodeTable 中。
+    如果提供了标量位置表，修改单个值时可以只替换源文本中的对应片段。
+    多文档流的每个文档是一个顶层节点，展开时才解析。
+    带锚点的容器在第一次出现处显示锚点名，其余引用显示为别名行，展开时才读取子节点；
+    别名与锚点共享同一个容器，通过任一行所做的修改在所有引用处同步显示。
+    查找和全部替换使用各文档解析时生成的查找索引（TreeIndex），不遍历树中的行。
+    路径查询直接在各文档的数据上执行，结果按键路径对应到行和源文本位置。
+    """
+    contentChanged = pyqtSignal()  # 结构变化（增删节点、重命名键）
+    valueEdited = pyqtSignal(object, object)  # 单个标量被修改：路径, 新值
+    valuesEdited = pyqtSignal(object)  # 一批标量被修改（全部替换）：[(路径, 新值), ...]
+    invalidInput = pyqtSignal(str)  # 输入不合法时的提示
+
+    HEADERS = ["键", "值", "类型"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._stream = YamlStream.from_data({})
+        self._table = NodeTable({})
+
+    # ---- 数据加载 ----
+
+    def set_stream(self, stream):
+        """替换整棵树的数据
+
+        只有一个文档时直接显示文档内容；多个文档时每个文档是一个顶层节点，
+        文档在展开时才解析。
+        """
+        self.beginResetModel()
+        self._stream = stream
+        self._table = self._make_table(stream)
+        self.endResetModel()
+
+    @staticmethod
+    def _make_table(stream):
+        if stream.is_multi():
+            return NodeTable(stream.documents, TAG_STREAM)
+        doc = stream.documents[0]
+        if not isinstance(doc.data, (dict, list)):
+            doc.data = {}
+        return NodeTable(doc.data)
+
+    def reconcile(self, stream):
+        """把新的解析结果合并到现有树中
+
+        只对新增、删除和值发生变化的行发出通知，展开状态、选中项和滚动位置得以保留；
+        只遍历视图访问过的节点，其余节点在被访问时直接从新数据中读取。
+        多文档流中只有原文发生变化且已展开的文档才会重新解析。
+        """
+        root = self._table[NodeTable.ROOT]
+        if stream.is_multi() != self._stream.is_multi():
+            self.set_stream(stream)
+        elif stream.is_multi():
+            self._reconcile_stream(stream)
+        else:
+            data = stream.documents[0].data
+            if not isinstance(data, (dict, list)) or tag_of(data) != root.tag:
+                self.set_stream(stream)
+                return
+            self._stream = stream
+            self._reconcile_node(NodeTable.ROOT, QModelIndex(), data)
+
+    def _reconcile_stream(self, stream):
+        """按文档原文比较新旧文档列表，原文相同的文档沿用已有节点"""
+        root = self._table[NodeTable.ROOT]
+        children = self._table.children(NodeTable.ROOT)
+        old_docs, new_docs = root.value, stream.documents
+        matcher = difflib.SequenceMatcher(None, [doc.text for doc in old_docs],
+                                          [doc.text for doc in new_docs], autojunk=False)
+        self._stream = stream
+        root.value = new_docs
+        for op, i1, i2, j1, j2 in matcher.get_opcodes():
+            paired = min(i2 - i1, j2 - j1)
+            for pos in range(j1, j1 + paired):
+                child_id = children[pos]
+                if child_id < 0:
+                    continue
+                doc = new_docs[pos]
+                if self._table[child_id].tag != TAG_PENDING:
+                    doc.parse()  # 已展开过的文档立即解析，以保留展开状态
+                self._reconcile_node(child_id, self.createIndex(pos, 0, child_id),
+                                     document_value(doc))
+            if op != 'equal':
+                self._splice_rows(QModelIndex(), root, j1 + paired,
+                                  i2 - i1 - paired, j2 - j1 - paired)
+
+    def _reconcile_node(self, node_id, index, new_value):
+        """让节点指向新值，并同步已创建的子节点"""
+        node = self._table[node_id]
+        old_value = node.value
+        if old_value is new_value:
+            return
+
+        new_tag = tag_of(new_value)
+        if new_tag not in CONTAINER_TAGS or node.tag != new_tag:
+            changed = (node.tag != new_tag or type(old_value) is not type(new_value)
+                       or old_value != new_value)
+            if node.children is not None and len(node.children):
+                self.beginRemoveRows(index, 0, len(node.children) - 1)
+                for child_id in node.children:
+                    if child_id >= 0:
+                        self._table.release(child_id)
+                node.children = array('q')
+                node.keys = None
+                self.endRemoveRows()
+            count = len(new_value) if new_tag in CONTAINER_TAGS else 0
+            if count:
+                self.beginInsertRows(index, 0, count - 1)
+            node.tag = new_tag
+            node.value = new_value
+            node.children = None
+            if count:
+                self.endInsertRows()
+            if changed:
+                self._row_changed(index)
+            return
+
+        old_count = len(old_value)
+        node.value = new_value
+        if node.children is None:
+            # 子节点从未被访问过，之后会直接从新值读取
+            if len(new_value) != old_count:
+                self._row_changed(index)
+            return
+
+        if new_tag == TAG_DICT:
+            new_keys = list(new_value)
+            matcher = difflib.SequenceMatcher(None, node.keys, new_keys, autojunk=False)
+            opcodes = matcher.get_opcodes()
+        else:
+            new_keys = None
+            opcodes = self._list_opcodes(old_value, new_value)
+
+        children = node.children
+        for op, i1, i2, j1, j2 in opcodes:
+            if op == 'equal':
+                for pos in range(j1, j2):
+                    child_id = children[pos]
+                    if child_id >= 0:
+                        key = new_keys[pos] if new_keys is not None else pos
+                        self._reconcile_node(child_id, self.createIndex(pos, 0, child_id),
+                                             new_value[key])
+                continue
+
+            self._splice_rows(index, node, j1, i2 - i1, j2 - j1,
+                              new_keys[j1:j2] if new_keys is not None else None)
+
+        if len(new_value) != old_count:
+            self._row_changed(index)
+
+    def _splice_rows(self, index, node, pos, removed, inserted, new_keys=None):
+        """在 pos 处删除 removed 行，再插入 inserted 个尚未创建的行"""
+        children = node.children
+        if removed:
+            self.beginRemoveRows(index, pos, pos + removed - 1)
+            for child_id in children[pos:pos + removed]:
+                if child_id >= 0:
+                    self._table.release(child_id)
+            del children[pos:pos + removed]
+            if node.keys is not None:
+                del node.keys[pos:pos + removed]
+            self._renumber(node, pos)
+            self.endRemoveRows()
+        if inserted:
+            self.beginInsertRows(index, pos, pos + inserted - 1)
+            children[pos:pos] = array('q', [-1]) * inserted
+            if new_keys is not None:
+                node.keys[pos:pos] = new_keys
+            self._renumber(node, pos + inserted)
+            self.endInsertRows()
+
+    @staticmethod
+    def _list_opcodes(old, new):
+        """列表的差异：去掉相同的前缀和后缀，中间重叠部分原位更新，其余部分增删"""
+        n_old, n_new = len(old), len(new)
+        prefix = 0
+        limit = min(n_old, n_new)
+        while prefix < limit and old[prefix] == new[prefix]:
+            prefix += 1
+        suffix = 0
+        limit -= prefix
+        while suffix < limit and old[n_old - 1 - suffix] == new[n_new - 1 - suffix]:
+            suffix += 1
+
+        old_end, new_end = n_old - suffix, n_new - suffix
+        overlap = min(old_end - prefix, new_end - prefix)
+        opcodes = [('equal', 0, prefix + overlap, 0, prefix + overlap)]
+        if old_end > prefix + overlap or new_end > prefix + overlap:
+            opcodes.append(('replace', prefix + overlap, old_end, prefix + overlap, new_end))
+        opcodes.append(('equal', old_end, n_old, new_end, n_new))
+        return opcodes
+
+    def _renumber(self, node, start):
+        """更新从 start 开始的已创建子节点的行号（列表还要更新下标）"""
+        is_list = node.tag != TAG_DICT
+        children = node.children
+        for pos in range(start, len(children)):
+            child_id = children[pos]
+            if child_id >= 0:
+                child = self._table[child_id]
+                child.row = pos
+                if is_list:
+                    child.key = pos
+
+    def _row_changed(self, index):
+        """刷新一行的显示"""
+        if index.isValid():
+            self.dataChanged.emit(index.siblingAtColumn(0), index.siblingAtColumn(2))
+
+    def stream(self):
+        """返回当前的文档流（与编辑结果保持同步）"""
+        return self._stream
+
+    def root_data(self):
+        """返回根数据（与编辑结果保持同步）；多文档流返回各文档数据的列表"""
+        if self._stream.is_multi():
+            return [doc.data if doc.parse() else None for doc in self._stream.documents]
+        return self._table[NodeTable.ROOT].value
+
+    def is_multi_document(self):
+        """是否为多文档流"""
+        return self._stream.is_multi()
+
+    # ---- 源文本位置 ----
+
+    def _document_path(self, path):
+        """把树中的路径拆分为 (文档序号, 文档内路径)"""
+        if self._stream.is_multi():
+            return path[0], path[1:]
+        return 0, path
+
+    def adopt_spans(self, stream):
+        """文本由树重新生成后，从对同一文本的后台解析结果中取回位置表"""
+        for doc, parsed in zip(self._stream.documents, stream.documents):
+            if (not doc.spans_valid and parsed.spans_valid and doc.error is None
+                    and parsed.text == doc.text):
+                doc.spans = parsed.spans
+                doc.scalar_anchors = parsed.scalar_anchors
+                doc.spans_valid = True
+
+    def source_span(self, path):
+        """返回路径对应标量在源文本中的位置，未知时返回 None"""
+        return self._stream.source_span(*self._document_path(path))
+
+    def source_region(self, path):
+        """返回路径对应节点（标量或容器）在源文本中的位置，未知时返回 None"""
+        return self._stream.source_region(*self._document_path(path))
+
+    def patch_source(self, path, replacement):
+        """源文本中该标量已被替换为 replacement，更新文档原文和位置表"""
+        doc_index, doc_path = self._document_path(path)
+        self._stream.patch(doc_index, doc_path, replacement)
+
+    def patch_sources(self, replacements):
+        """源文本中一批标量 [(路径, 新文本), ...] 已被替换，按文档一次更新原文和位置表"""
+        by_document = {}
+        for path, replacement in replacements:
+            doc_index, doc_path = self._document_path(path)
+            by_document.setdefault(doc_index, {})[doc_path] = replacement
+        for doc_index, doc_replacements in by_document.items():
+            self._stream.patch_many(doc_index, doc_replacements)
+
+    # ---- 查找和替换 ----
+
+    def _searchable_documents(self):
+        """依次返回 (路径前缀, 文档)，尚未解析的文档先解析并显示其内容"""
+        multi = self._stream.is_multi()
+        for doc_index, doc in enumerate(self._stream.documents):
+            if multi:
+                self.load_document(self.index(doc_index, 0))
+            yield ((doc_index,) if multi else ()), doc
+
+    def find_rows(self, pattern):
+        """返回键或标量值与 pattern 匹配的所有节点的行号路径（从根开始每一级的行号），按文档顺序"""
+        found = []
+        for prefix, doc in self._searchable_documents():
+            index = doc.search_index()
+            if index is not None:
+                found.extend(prefix + index.row_path(entry) for entry in index.search(pattern))
+        return found
+
+    def query(self, query):
+        """执行路径查询（yaml_query.Query），按文档顺序逐个返回匹配节点的键路径；
+        多文档流中依次解析各文档，路径以文档序号开头"""
+        roots = ((prefix, doc.data) for prefix, doc in self._searchable_documents()
+                 if doc.parsed and doc.error is None)
+        for path, _ in query.evaluate_all(roots):
+            yield path
+
+    def replace_values(self, pattern, replacement, regex=False):
+        """替换所有标量值中 pattern 的匹配，返回 (替换的个数, 因类型不符未替换的个数)
+
+        按查找索引直接定位并修改数据，之后只刷新已创建的节点；替换后的文本按原值的
+        类型转换，转换失败的值（包括不再是同类型字面量的布尔值和空值）保持不变。替换内容无效时抛出 re.error。
+        """
+        edits = []
+        skipped = 0
+        for prefix, doc in self._searchable_documents():
+            index = doc.search_index()
+            if index is None:
+                continue
+            count = len(edits)
+            for entry in index.search(pattern, keys=False):
+                old_value = index.value(entry)
+                text = text_search.substitute(str(old_value), pattern, replacement, regex)
+                try:
+                    new_value = convert_replacement(old_value, text)
+                except ValueError:
+                    skipped += 1
+                    continue
+                if type(new_value) is type(old_value) and new_value == old_value:
+                    continue
+                path = index.path(entry)
+                container = doc.data
+                for key in path[:-1]:
+                    container = container[key]
+                container[path[-1]] = new_value
+                edits.append((prefix + path, new_value))
+            if len(edits) > count:
+                doc.index = None
+        if edits:
+            self._refresh_scalars()
+            self.valuesEdited.emit(edits)
+        return len(edits), skipped
+
+    def _refresh_scalars(self):
+        """数据被直接修改后，让已创建的标量节点重新读取值（共享容器的各处引用一并更新）"""
+        for node_id in self._table.live_ids():
+            node = self._table[node_id]
+            if node_id == NodeTable.ROOT or node.tag != TAG_SCALAR:
+                continue
+            parent = self._table[node.parent]
+            if parent.tag not in (TAG_DICT, TAG_LIST):
+                continue
+            value = parent.value[node.key]
+            if value is not node.value:
+                node.value = value
+                self._row_changed(self.createIndex(node.row, 0, node_id))
+
+    def _invalidate_index(self, node_id):
+        """节点所在文档的数据被修改，查找索引在下次查找时重新生成"""
+        path = self.node_path(node_id)
+        if self._stream.is_multi() and path:
+            self._stream.documents[path[0]].index = None
+        else:
+            for doc in self._stream.documents:
+                doc.index = None
+
+    def index_from_rows(self, rows):
+        """返回行号路径对应的索引，路径无效时返回无效索引"""
+        index = QModelIndex()
+        for row in rows:
+            index = self.index(row, 0, index)
+            if not index.isValid():
+                break
+        return index
+
+    def row_path(self, index):
+        """返回索引从根开始每一级的行号"""
+        rows = []
+        node_id = self.node_id(index)
+        while node_id != NodeTable.ROOT:
+            node = self._table[node_id]
+            rows.append(node.row)
+            node_id = node.parent
+        return tuple(reversed(rows))
+
+    # ---- 锚点和别名 ----
+
+    def _has_anchors(self):
+        return any(doc.anchors for doc in self._stream.documents)
+
+    def _anchor_of(self, node_id):
+        """返回节点的 (锚点名, 是否为别名)，值不是带锚点的容器时返回 None"""
+        node = self._table[node_id]
+        if node.tag not in (TAG_DICT, TAG_LIST):
+            return None
+        doc_index, doc_path = self._document_path(self.node_path(node_id))
+        found = self._stream.documents[doc_index].anchor_of(node.value)
+        if found is None:
+            return None
+        name, anchor_path = found
+        return name, doc_path != anchor_path
+
+    def is_alias(self, index):
+        """索引是否为别名行（引用在别处定义了锚点的容器）"""
+        if not index.isValid():
+            return False
+        anchor = self._anchor_of(index.internalId())
+        return anchor is not None and anchor[1]
+
+    def anchor_index(self, index):
+        """返回别名所引用的锚点所在行的索引，不是别名时返回无效索引"""
+        if not self.is_alias(index):
+            return QModelIndex()
+        node_id = index.internalId()
+        doc_index, _ = self._document_path(self.node_path(node_id))
+        _, path = self._stream.documents[doc_index].anchor_of(self._table[node_id].value)
+        if path is None:
+            return QModelIndex()
+        if self._stream.is_multi():
+            path = (doc_index,) + path
+        return self.index_from_path(path)
+
+    def index_from_path(self, path):
+        """返回键路径对应的索引，路径无效时返回无效索引"""
+        index = QModelIndex()
+        node_id = NodeTable.ROOT
+        for key in path:
+            node = self._table[node_id]
+            if node.tag == TAG_PENDING:
+                self.load_document(index)
+                node = self._table[node_id]
+            children = self._table.children(node_id)
+            if node.tag == TAG_DICT:
+                if key not in node.value:
+                    return QModelIndex()
+                row = node.keys.index(key)
+            elif isinstance(key, int) and 0 <= key < len(children):
+                row = key
+            else:
+                return QModelIndex()
+            node_id = self._table.child(node_id, row)
+            index = self.createIndex(row, 0, node_id)
+        return index
+
+    def _sync_shared(self, node_id):
+        """容器被多处引用时，让显示同一容器的其他节点重新读取子节点"""
+        if not self._has_anchors():
+            return
+        node = self._table[node_id]
+        for other_id in self._table.nodes_with_value(node.value):
+            if other_id == node_id:
+                continue
+            other = self._table[other_id]
+            index = self.createIndex(other.row, 0, other_id)
+            if other.children is not None:
+                self._splice_rows(index, other, 0, len(other.children), len(node.value),
+                                  list(node.value) if other.tag == TAG_DICT else None)
+            self._row_changed(index)
+
+    def _sync_shared_value(self, parent_id, row, new_value):
+        """共享容器中的标量被修改后，更新其他引用处已创建的对应节点"""
+        if not self._has_anchors():
+            return
+        container = self._table[parent_id].value
+        for other_id in self._table.nodes_with_value(container):
+            other = self._table[other_id]
+            if other_id == parent_id or other.children is None:
+                continue
+            child_id = other.children[row]
+            if child_id >= 0:
+                self._table[child_id].value = new_value
+                self._row_changed(self.createIndex(row, 0, child_id))
+
+    def _sync_shared_scalar(self, node_id, old_value, new_value):
+        """带锚点的标量（或引用它的别名）被修改后，锚点处和各别名处一起改为新值，
+        与原文中只替换锚点处的值一致"""
+        doc_index, doc_path = self._document_path(self.node_path(node_id))
+        if self._stream.documents[doc_index].set_shared_scalar(doc_path, old_value, new_value):
+            self._refresh_scalars()
+
+    def _remap_scalar_anchors(self, parent_id, key, new_key=None):
+        """父节点下 key 处的子节点改名为 new_key 或被删除（new_key 为 None）后，更新标量锚点的路径"""
+        doc_index, doc_path = self._document_path(self.node_path(parent_id))
+        doc = self._stream.documents[doc_index]
+        if not doc.scalar_anchors:
+            return
+        prefix = doc.source_path(doc_path)
+        depth = len(prefix)
+        shift = new_key is None and self._table[parent_id].tag == TAG_LIST
+
+        def remap(path):
+            if len(path) <= depth or path[:depth] != prefix:
+                return path
+            child = path[depth]
+            if child == key:
+                return None if new_key is None else prefix + (new_key,) + path[depth + 1:]
+            if shift and child > key:
+                return prefix + (child - 1,) + path[depth + 1:]  # 列表中后面的项前移
+            return path
+
+        doc.remap_scalar_anchors(remap)
+
+    def node_path(self, node_id):
+        """返回节点从根开始的键路径"""
+        path = []
+        while node_id != NodeTable.ROOT:
+            node = self._table[node_id]
+            path.append(node.key)
+            node_id = node.parent
+        return tuple(reversed(path))
+
+    # ---- 节点访问 ----
+
+    def node_id(self, index):
+        """返回索引对应的节点编号，无效索引对应根节点"""
+        if index.isValid():
+            return index.internalId()
+        return NodeTable.ROOT
+
+    def node(self, index):
+        """返回索引对应的节点记录"""
+        return self._table[self.node_id(index)]
+
+    def value(self, index):
+        """返回索引对应的值"""
+        return self.node(index).value
+
+    def is_list_parent(self, index):
+        """索引对应的节点是否为列表"""
+        return self.node(index).tag == TAG_LIST
+
+    def is_document(self, index):
+        """索引是否为多文档流中的文档节点"""
+        return index.isValid() and self._is_document(self._table[index.internalId()])
+
+    def _is_document(self, node):
+        return node.parent == NodeTable.ROOT and self._table[NodeTable.ROOT].tag == TAG_STREAM
+
+    def load_document(self, index):
+        """解析尚未解析的文档节点，并把文档内容作为子节点插入"""
+        node_id = self.node_id(index)
+        node = self._table[node_id]
+        if node.tag != TAG_PENDING or node.value.parsed:
+            return
+        doc = node.value
+        if doc.parse():
+            self._reconcile_node(node_id, index.siblingAtColumn(0), doc.data)
+        else:
+            self._row_changed(index)  # 显示错误信息
+
+    # ---- QAbstractItemModel 接口 ----
+
+    def index(self, row, column, parent=QModelIndex()):
+        # 直接检查范围，不经过 hasIndex（它会再回调 rowCount 和 columnCount）
+        if parent.column() > 0 or not 0 <= column < len(self.HEADERS):
+            return QModelIndex()
+        parent_id = self.node_id(parent)
+        if not 0 <= row < len(self._table.children(parent_id)):
+            return QModelIndex()
+        return self.createIndex(row, column, self._table.child(parent_id, row))
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        parent_id = self._table[index.internalId()].parent
+        if parent_id == NodeTable.ROOT:
+            return QModelIndex()
+        return self.createIndex(self._table[parent_id].row, 0, parent_id)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        node = self.node(parent)
+        if node.children is not None:
+            return len(node.children)
+        if node.tag in CONTAINER_TAGS:
+            return len(node.value)
+        return 0
+
+    def hasChildren(self, parent=QModelIndex()):
+        node = self.node(parent)
+        if node.tag == TAG_PENDING:
+            return parent.column() <= 0 and not node.value.parsed
+        return self.rowCount(parent) > 0
+
+    def canFetchMore(self, parent):
+        if not parent.isValid():
+            return False
+        node = self._table[parent.internalId()]
+        return node.tag == TAG_PENDING and not node.value.parsed
+
+    def fetchMore(self, parent):
+        # 文档节点展开时才解析
+        self.load_document(parent)
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.ItemDataRole.ForegroundRole:
+            return ALIAS_COLOR if self.is_alias(index) else None
+        if role not in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            return None
+
+        node = self._table[index.internalId()]
+        column = index.column()
+        if self._is_document(node):
+            return self._document_data(node, column)
+        if column == 0:
+            return str(node.key)
+        anchor = self._anchor_of(index.internalId()) if column else None
+        if column == 1:
+            # 完整文本只在打开编辑器时生成
+            if role == Qt.ItemDataRole.EditRole and node.tag == TAG_SCALAR:
+                return str(node.value)
+            if anchor is not None:
+                name, is_alias = anchor
+                return f"{'*' if is_alias else '&'}{name}  {summarize_value(node.value)}"
+            return summarize_value(node.value)
+        if anchor is not None and anchor[1]:
+            return "alias"
+        return type(node.value).__name__
+
+    def _document_data(self, node, column):
+        """文档节点的显示文本"""
+        if column == 0:
+            return f"文档 {node.row + 1}"
+        if node.tag != TAG_PENDING:
+            return summarize_value(node.value) if column == 1 else type(node.value).__name__
+        if column == 2:
+            return "document"
+        doc = node.value
+        if isinstance(doc.error, ParseCancelled):
+            return summarize_value(f"解析已取消: {doc.error}")
+        if doc.error is not None:
+            return summarize_value(f"解析失败: {doc.error}")
+        return "（展开后解析）"
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.ItemFlag.NoItemFlags
+        flags = Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+        node = self._table[index.internalId()]
+        if index.column() == 0 and self._table[node.parent].tag == TAG_DICT:
+            flags |= Qt.ItemFlag.ItemIsEditable  # 列表下标不允许编辑
+        elif index.column() == 1 and node.tag == TAG_SCALAR:
+            flags |= Qt.ItemFlag.ItemIsEditable
+        return flags
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if not index.isValid() or role != Qt.ItemDataRole.EditRole:
+            return False
+
+        if index.column() == 0:
+            return self.rename_key(index, value)
+        elif index.column() == 1:
+            node = self._table[index.internalId()]
+            try:
+                new_value = convert_value(node.value, value)
+            except ValueError:
+                self.invalidInput.emit("输入的值格式不正确")
+                return False
+            return self.set_value(index, new_value)
+        return False
+
+    # ---- 编辑操作 ----
+
+    def set_value(self, index, new_value):
+        """修改标量节点的值"""
+        node_id = self.node_id(index)
+        node = self._table[node_id]
+        if node.tag != TAG_SCALAR:
+            return False
+        parent = self._table[node.parent]
+        old_value = node.value
+        if parent.tag == TAG_STREAM:
+            parent.value[node.key].data = new_value  # 整个文档就是一个标量
+        else:
+            parent.value[node.key] = new_value
+            self._sync_shared_value(node.parent, node.row, new_value)
+        node.value = new_value
+        if parent.tag != TAG_STREAM:
+            self._sync_shared_scalar(node_id, old_value, new_value)
+        self._invalidate_index(node_id)
+        self.dataChanged.emit(index.siblingAtColumn(0), index.siblingAtColumn(2))
+        self.valueEdited.emit(self.node_path(node_id), new_value)
+        return True
+
+    def rename_key(self, index, new_key):
+        """修改字典键，保持原有顺序"""
+        node = self.node(index)
+        parent = self._table[node.parent]
+        if parent.tag != TAG_DICT or new_key == node.key:
+            return False
+        container = parent.value
+        if new_key in container:
+            self.invalidInput.emit("该键名已存在")
+            return False
+
+        items = list(container.items())
+        container.clear()
+        for k, v in items:
+            container[new_key if k == node.key else k] = v
+        parent.keys[node.row] = new_key
+        self._remap_scalar_anchors(node.parent, node.key, new_key)
+        node.key = new_key
+        self._invalidate_index(node.parent)
+        self.dataChanged.emit(index.siblingAtColumn(0), index.siblingAtColumn(0))
+        self._sync_shared(node.parent)
+        self.contentChanged.emit()
+        return True
+
+    def insert_child(self, parent_index, key, value):
+        """向字典或列表末尾添加子节点，返回新节点的索引"""
+        parent_id = self.node_id(parent_index)
+        parent = self._table[parent_id]
+        container = parent.value
+        if parent.tag == TAG_DICT:
+            if key in container:
+                self.invalidInput.emit("该键名已存在")
+                return QModelIndex()
+        elif parent.tag != TAG_LIST:
+            return QModelIndex()
+
+        row = len(container)
+        self.beginInsertRows(parent_index, row, row)
+        if parent.tag == TAG_DICT:
+            container[key] = value
+        else:
+            key = row
+            container.append(value)
+        if parent.children is not None:
+            parent.children.append(-1)
+            if parent.keys is not None:
+                parent.keys.append(key)
+        self.endInsertRows()
+        self._invalidate_index(parent_id)
+        self._summary_changed(parent_index)
+        self._sync_shared(parent_id)
+        self.contentChanged.emit()
+        return self.index(row, 0, parent_index)
+
+    def remove(self, index):
+        """删除节点"""
+        if not index.isValid():
+            return False
+        node_id = index.internalId()
+        node = self._table[node_id]
+        parent = self._table[node.parent]
+        row = node.row
+
+        parent_index = self.parent(index)
+        self.beginRemoveRows(parent_index, row, row)
+        del parent.value[node.key]
+        if parent.children is not None:
+            del parent.children[row]
+            if parent.keys is not None:
+                del parent.keys[row]
+            # 更新后续已创建的兄弟节点的行号（列表还要更新下标）
+            is_list = parent.tag != TAG_DICT
+            for sibling_id in parent.children[row:]:
+                if sibling_id < 0:
+                    continue
+                sibling = self._table[sibling_id]
+                sibling.row -= 1
+                if is_list:
+                    sibling.key = sibling.row
+        self._table.release(node_id)
+        self.endRemoveRows()
+        if parent.tag in (TAG_DICT, TAG_LIST):
+            self._remap_scalar_anchors(node.parent, node.key)
+        self._invalidate_index(node.parent)
+        self._summary_changed(parent_index)
+        self._sync_shared(node.parent)
+        self.contentChanged.emit()
+        return True
+
+    def _summary_changed(self, parent_index):
+        """子项数量变化后刷新父节点的摘要"""
+        if parent_index.isValid():
+            summary = parent_index.siblingAtColumn(1)
+            self.dataChanged.emit(summary, summary)
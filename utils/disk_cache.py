@@ -0,0 +1,150 @@
+"""磁盘上的解析缓存
+
+每个文件对应缓存目录中的一个条目，以文件路径、修改时间、大小和内容哈希校验，
+内容是解析结果、标量位置表和锚点表的 pickle。打开文件时命中的条目直接放入进程内的
+解析缓存，之后的解析只需一次查表。
+
+条目格式：魔数 | 头部（修改时间、大小、内容哈希、数据校验和）| 数据。
+任何一项校验失败的条目都会被删除。
+"""
+import datetime
+import hashlib
+import io
+import os
+import pickle
+import struct
+import time
+from utils import parse_cache
+
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.easyyaml', 'cache')
+MAGIC = b'EYPC\x04'
+_HEADER = struct.Struct('>qq16s16s')  # 修改时间(ns), 文件大小, 内容哈希, 数据校验和
+# 缓存目录的总大小上限和条目的最长保留时间
+MAX_BYTES = 512 * 1024 * 1024
+MAX_AGE = 30 * 24 * 3600
+
+# 解析结果中可能出现的非内置类型（SafeLoader 只会构造这些）
+_ALLOWED_CLASSES = {
+    ('datetime', 'date'), ('datetime', 'datetime'),
+    ('datetime', 'timedelta'), ('datetime', 'timezone'),
+}
+
+
+class _SafeUnpickler(pickle.Unpickler):
+    """只允许还原 YAML 数据类型，防止被篡改的缓存执行任意代码"""
+    def find_class(self, module, name):
+        if (module, name) in _ALLOWED_CLASSES:
+            return getattr(datetime, name)
+        raise pickle.UnpicklingError(f"缓存中出现不允许的类型: {module}.{name}")
+
+
+def _entry_path(path):
+    name = hashlib.blake2b(os.path.abspath(path).encode('utf-8', 'surrogatepass'),
+                           digest_size=16).hexdigest()
+    return os.path.join(CACHE_DIR, name + '.bin')
+
+
+def _checksum(payload):
+    return hashlib.blake2b(payload, digest_size=16).digest()
+
+
+def _invalidate(entry):
+    try:
+        os.remove(entry)
+    except OSError:
+        pass
+
+
+def load(path, text):
+    """读取文件的缓存条目，返回 (数据, 位置表, 锚点表)；不存在或已失效时返回 None"""
+    entry = _entry_path(path)
+    try:
+        stat = os.stat(path)
+        with open(entry, 'rb') as f:
+            blob = f.read()
+    except OSError:
+        return None
+
+    try:
+        if not blob.startswith(MAGIC):
+            raise ValueError("魔数不匹配")
+        mtime, size, content_hash, checksum = _HEADER.unpack_from(blob, len(MAGIC))
+        if mtime != stat.st_mtime_ns or size != stat.st_size:
+            raise ValueError("文件已修改")
+        if content_hash != parse_cache.ParseCache.key(text)[0]:
+            raise ValueError("内容不一致")
+        payload = memoryview(blob)[len(MAGIC) + _HEADER.size:]
+        if _checksum(payload) != checksum:
+            raise ValueError("校验和错误")
+        data, spans, anchors = _SafeUnpickler(io.BytesIO(payload)).load()
+    except Exception as e:
+        print(f"解析缓存失效: {path}: {str(e)}")
+        _invalidate(entry)
+        return None
+
+    os.utime(entry)  # 记录最近使用时间，供淘汰时参考
+    return data, spans, anchors
+
+
+def store(path, text, data, spans, anchors):
+    """写入文件的缓存条目，并按总大小和保留时间清理缓存目录"""
+    try:
+        stat = os.stat(path)
+        payload = pickle.dumps((data, spans, anchors), protocol=pickle.HIGHEST_PROTOCOL)
+        header = _HEADER.pack(stat.st_mtime_ns, stat.st_size,
+                              parse_cache.ParseCache.key(text)[0], _checksum(payload))
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        entry = _entry_path(path)
+        temp = f"{entry}.{os.getpid()}.tmp"
+        with open(temp, 'wb') as f:
+            f.write(MAGIC)
+            f.write(header)
+            f.write(payload)
+        os.replace(temp, entry)  # 原子替换，读到的条目总是完整的
+    except Exception as e:
+        print(f"写入解析缓存失败: {str(e)}")
+        return
+    prune()
+
+
+def prune(max_bytes=MAX_BYTES, max_age=MAX_AGE):
+    """删除过期的条目，总大小超出上限时从最久未使用的条目开始删除"""
+    try:
+        names = os.listdir(CACHE_DIR)
+    except OSError:
+        return
+    now = time.time()
+    entries = []
+    for name in names:
+        entry = os.path.join(CACHE_DIR, name)
+        try:
+            stat = os.stat(entry)
+        except OSError:
+            continue
+        if now - stat.st_mtime > max_age:
+            _invalidate(entry)
+        else:
+            entries.append((stat.st_mtime, stat.st_size, entry))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, entry in sorted(entries):
+        if total <= max_bytes:
+            break
+        _invalidate(entry)
+        total -= size
+
+
+def prime(path, text):
+    """打开文件时调用：磁盘缓存命中时把结果放入进程内解析缓存，返回是否命中"""
+    cached = load(path, text)
+    if cached is None:
+        return False
+    parse_cache.seed(text, cached)
+    return True
+
+
+def remember(path, text):
+    """文件解析完成后调用：把进程内缓存中的解析结果写入磁盘"""
+    cached = parse_cache.peek(text)
+    if cached is not None:
+        store(path, text, *cached)
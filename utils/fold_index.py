@@ -0,0 +1,110 @@
+"""按缩进计算的折叠区域索引
+
+一行之后缩进比它深的连续行（中间可以有空行和注释）构成它的折叠区域，以 ] 或 } 开头且
+与起始行缩进相同的行（流式集合的结束括号）也算在区域内。区域的结尾是最后一个非空行，
+末尾的空行不折叠。
+
+每行只记录缩进、是否以结束括号开头和折叠的行数。文本修改后只重新计算被修改的行，
+以及折叠区域可能跨过修改位置的上级行（向上逐级缩进更浅的行）。
+"""
+from array import array
+
+_BLANK = -1  # 空行和只有注释的行不参与缩进比较
+
+
+def line_infos(lines):
+    """返回各行的缩进（array）和是否以结束括号开头（bytearray），空行和注释行的缩进为 -1"""
+    stripped = [text.lstrip(' ') for text in lines]
+    indents = array('i', [
+        len(text) - len(rest) if rest and rest[0] != '#' and not rest.isspace() else _BLANK
+        for text, rest in zip(lines, stripped)])
+    closers = bytearray(rest.startswith((']', '}')) for rest in stripped)
+    return indents, closers
+
+
+class FoldIndex:
+    """文本各行的折叠区域"""
+
+    def __init__(self, lines=()):
+        self._indent = array('i')
+        self._closer = bytearray()
+        self._span = array('i')  # 折叠区域包含的行数（不含起始行），0 表示不能折叠
+        self.update(0, 0, list(lines))
+
+    def __len__(self):
+        return len(self._indent)
+
+    def reset(self, lines):
+        """按全部文本重建索引"""
+        self.update(0, len(self._indent), list(lines))
+
+    def is_fold_start(self, line):
+        return 0 <= line < len(self._span) and self._span[line] > 0
+
+    def fold_end(self, line):
+        """返回第 line 行折叠区域的最后一行，不能折叠时返回 line 本身"""
+        if not 0 <= line < len(self._span):
+            return line
+        return line + self._span[line]
+
+    def update(self, first, removed, lines):
+        """第 first 行起的 removed 行被替换为 lines，返回折叠区域是否可能有变化"""
+        indents, closers = line_infos(lines)
+        end = first + removed
+        if (len(lines) == removed and self._indent[first:end] == indents
+                and self._closer[first:end] == closers):
+            # 只改动了行内的内容，缩进结构不变
+            return False
+
+        delta = len(lines) - removed
+        # 修改位置之前、折叠区域可能跨过修改位置的行：向上逐级找缩进更浅的行
+        ancestors = []
+        limit = None
+        for line in range(first - 1, -1, -1):
+            indent = self._indent[line]
+            if indent == _BLANK or (limit is not None and indent >= limit):
+                continue
+            ancestors.append((line, line + self._span[line]))
+            limit = indent
+            if indent == 0:
+                break
+
+        self._indent[first:end] = indents
+        self._closer[first:end] = closers
+        self._span[first:end] = array('i', [0]) * len(lines)
+
+        # 修改的行从后往前计算，计算某行时其后的下级区域都已算好，可以整段跳过
+        for line in range(first + len(lines) - 1, first - 1, -1):
+            if self._indent[line] != _BLANK:
+                self._span[line] = self._scan_end(line) - line
+
+        shallowest = min((indent for indent in indents if indent != _BLANK), default=None)
+        for line, old_end in ancestors:
+            if (old_end >= end and shallowest is not None
+                    and shallowest > self._indent[line]):
+                # 原区域越过了修改位置，修改的行仍在区域内：结尾只需平移
+                self._span[line] += delta
+            else:
+                self._span[line] = self._scan_end(line) - line
+        return True
+
+    def _scan_end(self, line):
+        """向后查找第 line 行折叠区域的最后一行，下级区域整段跳过"""
+        indents = self._indent
+        spans = self._span
+        indent = indents[line]
+        count = len(indents)
+        last = line
+        current = line + 1
+        while current < count:
+            child = indents[current]
+            if child == _BLANK:
+                current += 1
+                continue
+            if child <= indent:
+                if child == indent and self._closer[current] and last > line:
+                    last = current
+                break
+            last = current + spans[current]
+            current = last + 1
+        return last
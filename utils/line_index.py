@@ -0,0 +1,109 @@
+"""大文件的行索引
+
+文件通过 mmap 映射到内存，不读入 Python 字符串。索引按固定大小分块，只记录每块
+开头所在的行号，建立索引时只需统计每块中的换行符个数。
+"""
+import mmap
+import os
+import re
+from array import array
+from bisect import bisect_left
+
+# 每块的字节数
+BLOCK_SIZE = 1 << 16
+# 反向查找时每次扫描的字节数
+SEARCH_CHUNK = 1 << 20
+# 单行最多解码的字节数，超长的行只显示开头部分
+MAX_LINE_BYTES = 1 << 14
+
+
+class LineIndex:
+    """基于 mmap 的只读分块行索引"""
+
+    def __init__(self, path):
+        self.path = path
+        self.size = os.path.getsize(path)
+        self._file = open(path, 'rb')
+        # 空文件无法映射，直接用空字节串代替
+        self._mm = (mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+                    if self.size else b'')
+        self._block_lines = array('q')  # 每块第一个字节之前的换行符个数
+        newlines = 0
+        for start in range(0, self.size, BLOCK_SIZE):
+            self._block_lines.append(newlines)
+            newlines += self._mm[start:start + BLOCK_SIZE].count(b'\n')
+        self.line_count = newlines + 1
+
+    def close(self):
+        """释放映射和文件句柄"""
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+        self._file.close()
+
+    def line_offset(self, line):
+        """返回第 line 行（从 0 开始）起始处的字节偏移"""
+        if line <= 0:
+            return 0
+        line = min(line, self.line_count - 1)
+        # 第 line 个换行符所在的块：最后一个之前换行数小于 line 的块
+        block = bisect_left(self._block_lines, line) - 1
+        pos = block * BLOCK_SIZE
+        for _ in range(line - self._block_lines[block]):
+            pos = self._mm.find(b'\n', pos) + 1
+        return pos
+
+    def line_at(self, offset):
+        """返回字节偏移所在的行号"""
+        offset = max(0, min(offset, self.size))
+        block = min(offset // BLOCK_SIZE, len(self._block_lines) - 1)
+        if block < 0:
+            return 0
+        start = block * BLOCK_SIZE
+        return self._block_lines[block] + self._mm[start:offset].count(b'\n')
+
+    def lines(self, first, count):
+        """返回从第 first 行开始的至多 count 行文本（不含换行符）"""
+        result = []
+        if first >= self.line_count:
+            return result
+        pos = self.line_offset(first)
+        for _ in range(min(count, self.line_count - first)):
+            end = self._mm.find(b'\n', pos)
+            if end < 0:
+                end = self.size
+            raw = self._mm[pos:min(end, pos + MAX_LINE_BYTES)]
+            result.append(raw.decode('utf-8', errors='replace').rstrip('\r'))
+            pos = end + 1
+        return result
+
+    def column(self, offset):
+        """返回字节偏移在所在行中的字符列号"""
+        start = self.line_offset(self.line_at(offset))
+        return len(self._mm[start:offset].decode('utf-8', errors='replace'))
+
+    def find(self, text, offset=0, case_sensitive=True, backward=False):
+        """从字节偏移 offset 开始查找文本，返回匹配的 (起始, 结束) 字节偏移，找不到时返回 None
+
+        不区分大小写时只对 ASCII 字母生效。向后查找时返回结束位置不超过 offset 的最后一个匹配。
+        """
+        needle = text.encode('utf-8')
+        if not needle or not self.size:
+            return None
+        flags = 0 if case_sensitive else re.IGNORECASE
+        pattern = re.compile(re.escape(needle), flags)
+        if not backward:
+            match = pattern.search(self._mm, offset)
+            return match.span() if match else None
+
+        end = min(offset, self.size)
+        while end > 0:
+            start = max(0, end - SEARCH_CHUNK)
+            last = None
+            for last in pattern.finditer(self._mm, start, end):
+                pass
+            if last is not None:
+                return last.span()
+            if start == 0:
+                break
+            end = start + len(needle) - 1  # 与前一块重叠，避免漏掉跨块的匹配
+        return None
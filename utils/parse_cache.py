@@ -0,0 +1,140 @@
+"""进程内共享的解析缓存
+
+以文本内容的哈希为键，缓存解析结果、标量位置表和锚点表，所有编辑器标签页共用一份。
+缓存中的数据不会被修改，取出时返回容器的副本，调用方可以自由编辑。
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from utils import parse_worker
+
+# 解析结果占用的内存大约是源文本字节数的倍数（用于估算缓存大小）
+OBJECT_OVERHEAD = 8
+_CONTAINERS = (dict, list, set)
+
+
+def clone(data):
+    """复制解析结果中的所有容器，标量直接共享；别名指向的同一容器只复制一次"""
+    if type(data) not in _CONTAINERS:
+        return data
+    memo = {}
+    root = type(data)()
+    memo[id(data)] = root
+    stack = [(data, root)]
+    while stack:
+        source, target = stack.pop()
+        if type(source) is dict:
+            items = source.items()
+        else:
+            items = enumerate(source)
+        for key, value in items:
+            if type(value) in _CONTAINERS:
+                copied = memo.get(id(value))
+                if copied is None:
+                    copied = memo[id(value)] = type(value)()
+                    stack.append((value, copied))
+                value = copied
+            if type(target) is dict:
+                target[key] = value
+            elif type(target) is list:
+                target.append(value)
+            else:
+                target.add(value)
+    return root
+
+
+class ParseCache:
+    """按内容哈希索引、按估算字节数限制大小的 LRU 缓存（线程安全）"""
+    DEFAULT_BUDGET = 256 * 1024 * 1024
+
+    def __init__(self, budget=DEFAULT_BUDGET):
+        self.budget = budget
+        self._entries = OrderedDict()  # 键 -> (值, 大小)
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(text):
+        """返回文本的缓存键和估算大小"""
+        raw = text.encode('utf-8', 'surrogatepass')
+        return hashlib.blake2b(raw, digest_size=16).digest(), len(raw) * OBJECT_OVERHEAD
+
+    def get(self, key):
+        """查找缓存，命中时把条目移到最近使用的位置"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, size):
+        """加入缓存，超出预算时淘汰最久未使用的条目"""
+        if size > self.budget:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= old[1]
+            self._entries[key] = (value, size)
+            self._size += size
+            while self._size > self.budget:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._size -= evicted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+_shared = ParseCache()
+
+
+def shared_cache():
+    """返回进程内共享的缓存"""
+    return _shared
+
+
+def _lookup(text, token=None):
+    key, size = ParseCache.key(text)
+    entry = _shared.get(key)
+    if entry is None:
+        entry = parse_worker.load_with_spans(text, token)
+        _shared.put(key, entry, size)
+    return entry
+
+
+def peek(text):
+    """返回缓存中的 (数据, 位置表, 锚点表) 原件（调用方不得修改），未缓存时返回 None"""
+    return _shared.get(ParseCache.key(text)[0])
+
+
+def seed(text, entry):
+    """把别处得到的解析结果 (数据, 位置表, 锚点表) 放入缓存"""
+    key, size = ParseCache.key(text)
+    _shared.put(key, entry, size)
+
+
+def load_with_spans(text, token=None):
+    """带缓存的 yaml_codec.load_with_spans，返回数据、位置表和锚点表的副本
+
+    未命中时在解析子进程中解析，token 可用于取消。
+    """
+    data, spans, anchors = _lookup(text, token)
+    return clone(data), (dict(spans) if spans is not None else None), dict(anchors)
+
+
+def load_spans(text):
+    """只取位置表（副本），不复制数据"""
+    spans = _lookup(text)[1]
+    return dict(spans) if spans is not None else None
+
+
+def load_anchors(text):
+    """只取锚点表（副本），不复制数据"""
+    return dict(_lookup(text)[2])
@@ -0,0 +1,193 @@
+"""在子进程中解析 YAML
+
+解析在常驻的子进程中进行，主进程只等待结果。子进程有内存上限，等待有时间上限；
+超出任一上限或调用方取消时直接杀掉子进程，并立即启动一个新的备用进程。
+来自外部的不可信文件（别名炸弹、超大文档）因此不会卡死或拖垮编辑器。
+"""
+import multiprocessing
+import threading
+from utils import yaml_codec
+
+# 单次解析的最长时间（秒）
+TIME_LIMIT = 60
+# 没有 CancelToken 的解析来自 GUI 线程的同步调用（展开尚未解析的文档、树中查找、
+# 补充位置表），无法被取消，只等待这么久（秒）
+INTERACTIVE_TIME_LIMIT = 5
+# 子进程的地址空间上限（字节），只在支持 resource 模块的系统上生效
+MEMORY_LIMIT = 4 * 1024 * 1024 * 1024
+# 最多保留的空闲进程数
+MAX_IDLE = 2
+
+# 取消原因
+CANCELLED = 'cancelled'
+TIMEOUT = 'timeout'
+TOO_LARGE = 'too_large'
+
+
+class ParseCancelled(Exception):
+    """解析没有完成：被更新的文本取消、超时或超出内存上限"""
+    def __init__(self, reason, message):
+        super().__init__(message)
+        self.reason = reason
+
+
+def _limit_memory(limit):
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+def _worker_main(conn, memory_limit):
+    """子进程主循环：接收文本，返回 (状态, 结果)"""
+    _limit_memory(memory_limit)
+    while True:
+        try:
+            text = conn.recv()
+        except (EOFError, OSError):
+            return
+        try:
+            result = ('ok', yaml_codec.load_with_spans(text))
+        except MemoryError:
+            result = (TOO_LARGE, None)
+        except Exception as e:
+            result = ('error', yaml_codec.pack_error(e))
+        del text
+        try:
+            conn.send(result)
+        except MemoryError:
+            conn.send((TOO_LARGE, None))
+
+
+class _Worker:
+    """一个解析子进程"""
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main,
+                                       args=(child_conn, MEMORY_LIMIT), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def alive(self):
+        return self.process.is_alive()
+
+    def kill(self):
+        """杀掉进程；等待结果的线程会在管道上读到 EOF"""
+        try:
+            self.process.kill()
+            self.process.join(1)
+        except Exception:
+            pass
+
+    def close(self):
+        """杀掉进程并关闭管道（只能由使用该进程的线程调用）"""
+        self.kill()
+        self.conn.close()
+
+
+class _Pool:
+    """空闲子进程池（线程安全）"""
+    def __init__(self):
+        # 不使用 fork：GUI 进程中有多个线程，fork 出的子进程状态不可靠
+        self._context = multiprocessing.get_context('spawn')
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            while self._idle:
+                worker = self._idle.pop()
+                if worker.alive():
+                    return worker
+        return _Worker(self._context)
+
+    def release(self, worker):
+        with self._lock:
+            if len(self._idle) < MAX_IDLE and worker.alive():
+                self._idle.append(worker)
+                return
+        worker.close()
+
+    def discard(self, worker):
+        """杀掉出问题的进程，并补充一个备用进程"""
+        worker.close()
+        self.warm_up()
+
+    def warm_up(self):
+        with self._lock:
+            if not self._idle:
+                self._idle.append(_Worker(self._context))
+
+
+_pool = _Pool()
+
+
+def warm_up():
+    """提前启动一个备用进程，第一次解析时无需等待进程启动"""
+    _pool.warm_up()
+
+
+class CancelToken:
+    """用于取消进行中的解析：取消时杀掉正在执行它的子进程"""
+    def __init__(self):
+        self.cancelled = False
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            if self._worker is not None:
+                self._worker.kill()
+
+    def _attach(self, worker):
+        with self._lock:
+            if self.cancelled:
+                return False
+            self._worker = worker
+            return True
+
+    def _detach(self):
+        with self._lock:
+            self._worker = None
+
+
+def load_with_spans(text, token=None, time_limit=None):
+    """在子进程中执行 yaml_codec.load_with_spans
+
+    超时、超出内存上限或被取消时抛出 ParseCancelled，语法错误抛出 YAMLError。
+    未指定 time_limit 时，带 token 的后台解析最多等待 TIME_LIMIT 秒，
+    不带 token 的同步解析最多等待 INTERACTIVE_TIME_LIMIT 秒。
+    """
+    if time_limit is None:
+        time_limit = TIME_LIMIT if token is not None else INTERACTIVE_TIME_LIMIT
+    worker = _pool.acquire()
+    if token is not None and not token._attach(worker):
+        _pool.release(worker)
+        raise ParseCancelled(CANCELLED, "解析已取消")
+    try:
+        worker.conn.send(text)
+        if not worker.conn.poll(time_limit):
+            _pool.discard(worker)
+            raise ParseCancelled(TIMEOUT, f"解析超时（超过 {time_limit} 秒）")
+        status, payload = worker.conn.recv()
+    except (EOFError, OSError):
+        _pool.discard(worker)
+        if token is not None and token.cancelled:
+            raise ParseCancelled(CANCELLED, "解析已取消")
+        raise ParseCancelled(TOO_LARGE, "解析进程意外退出，文件可能过大")
+    finally:
+        if token is not None:
+            token._detach()
+
+    if status == TOO_LARGE:
+        _pool.discard(worker)
+        raise ParseCancelled(TOO_LARGE, "文件过大，超出解析内存上限")
+    _pool.release(worker)
+    if status == 'error':
+        raise yaml_codec.unpack_error(payload)
+    return payload
@@ -0,0 +1,169 @@
+"""模板的模糊查找
+
+为所有模板的名称、分类、描述和顶层键预先建立三元组（trigram）倒排索引。查找时只访问
+查询中各个三元组的倒排表，按命中的三元组数（名称中的命中权重最高）打分，拼写有误或
+只记得一部分也能找到；只返回得分最高的前 N 个。
+
+模板的顶层键从文件中读取，按文件的修改时间和大小缓存在磁盘上，只有修改过的模板才重新读取。
+"""
+import heapq
+import json
+import os
+import re
+from array import array
+
+# 各字段中命中一个三元组的权重
+NAME_WEIGHT = 3
+CATEGORY_WEIGHT = 2
+KEY_WEIGHT = 1
+DESCRIPTION_WEIGHT = 1
+# 得分低于 查询三元组数 × 该比例 的模板不返回
+MIN_SCORE_RATIO = 0.4
+# 默认返回的最大结果数
+RESULT_LIMIT = 50
+# 每个模板最多记录的顶层键数
+MAX_KEYS = 30
+
+_WORD_RE = re.compile(r'\w+')
+# 顶层键：不缩进、不是注释或列表项的 "键:" 行
+_TOP_KEY_RE = re.compile(r'^([^\s#\-][^:\n]*?)\s*:(?:[ \t]|$)', re.MULTILINE)
+
+
+def display_name(template):
+    """模板在列表中显示的名称，如 k8s/deployment.yaml -> K8S/Deployment"""
+    return template.replace('\\', ' > ').replace('.yaml', '').title()
+
+
+def trigrams(text):
+    """文本中每个词（前面补两个空格、后面补一个空格）的三元组集合"""
+    found = set()
+    for word in _WORD_RE.findall(text.lower()):
+        padded = f'  {word} '
+        found.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return found
+
+
+def top_level_keys(text):
+    """返回文本中的顶层键（按出现顺序，最多 MAX_KEYS 个），不做完整解析"""
+    keys = []
+    for match in _TOP_KEY_RE.finditer(text):
+        key = match.group(1).strip('\'"')
+        if key not in keys:
+            keys.append(key)
+            if len(keys) >= MAX_KEYS:
+                break
+    return keys
+
+
+class TemplateSearchIndex:
+    """模板的三元组索引，模板按加入的顺序编号"""
+
+    def __init__(self, entries=()):
+        """entries 为 [(模板名, 分类, 描述, 顶层键列表), ...]"""
+        self.names = []
+        self._lower_names = []
+        self._postings = {}  # 三元组 -> (模板编号数组, 权重)
+        for entry in entries:
+            self.add(*entry)
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, template, category='', description='', keys=()):
+        """加入一个模板，返回其编号"""
+        number = len(self.names)
+        name = display_name(os.path.basename(template))
+        self.names.append(template)
+        self._lower_names.append(display_name(template).lower())
+        # 每个三元组只按它出现的权重最高的字段记一次
+        weights = {}
+        for text, weight in ((' '.join(keys), KEY_WEIGHT),
+                             (description, DESCRIPTION_WEIGHT),
+                             (category, CATEGORY_WEIGHT),
+                             (name, NAME_WEIGHT)):
+            for gram in trigrams(text):
+                weights[gram] = weight
+        for gram, weight in weights.items():
+            posting = self._postings.get(gram)
+            if posting is None:
+                posting = self._postings[gram] = (array('I'), bytearray())
+            posting[0].append(number)
+            posting[1].append(weight)
+        return number
+
+    def search(self, text, limit=RESULT_LIMIT):
+        """返回与查询最相近的模板编号（最多 limit 个，按相关程度排序）"""
+        grams = trigrams(text)
+        if not grams:
+            return []
+        scores = {}
+        for gram in grams:
+            posting = self._postings.get(gram)
+            if posting is None:
+                continue
+            for number, weight in zip(*posting):
+                scores[number] = scores.get(number, 0) + weight
+        threshold = len(grams) * MIN_SCORE_RATIO
+        bonus = len(grams) * NAME_WEIGHT
+        query = text.strip().lower()
+
+        # 名称中直接包含查询的排在前面，同分时名称短的在前
+        def rank(item):
+            number, score = item
+            if query in self._lower_names[number]:
+                score += bonus
+            return score, -len(self.names[number])
+        best = heapq.nlargest(limit, (item for item in scores.items() if item[1] >= threshold),
+                              key=rank)
+        return [number for number, _ in best]
+
+
+class TemplateKeyCache:
+    """模板文件的顶层键，按 (修改时间, 大小) 缓存在磁盘上"""
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self._entries = json.load(f)
+        except (OSError, ValueError):
+            self._entries = {}
+        self.modified = False  # 有尚未保存的记录
+
+    def get(self, file_path):
+        """返回缓存中的顶层键（不检查文件是否已修改），没有记录时返回空列表"""
+        entry = self._entries.get(file_path)
+        return entry[2] if entry else []
+
+    def refresh(self, file_paths):
+        """重新读取修改过的文件，删除已不在列表中的记录，返回是否有变化（可在工作线程中调用）"""
+        changed = False
+        entries = {}
+        for file_path in file_paths:
+            old = self._entries.get(file_path)
+            try:
+                stat = os.stat(file_path)
+                if old and old[0] == stat.st_mtime_ns and old[1] == stat.st_size:
+                    entries[file_path] = old
+                    continue
+                with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+                    keys = top_level_keys(f.read())
+                entries[file_path] = [stat.st_mtime_ns, stat.st_size, keys]
+                self.modified = True
+                changed |= old is None or old[2] != keys
+            except OSError:
+                continue
+        if len(entries) != len(self._entries):
+            changed = self.modified = True
+        self._entries = entries
+        return changed
+
+    def save(self):
+        if not self.modified:
+            return
+        try:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f, ensure_ascii=False)
+            self.modified = False
+        except OSError as e:
+            print(f"保存模板键缓存失败: {str(e)}")
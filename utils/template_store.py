@@ -0,0 +1,195 @@
+"""用户模板目录
+
+用户模板的分类、名称、文件路径和描述保存在 SQLite 数据库中（~/.easyyaml/templates.sqlite），
+每次增加、重命名或删除只修改对应的一行（各自在一个事务中），不再重写整个配置文件。
+
+名称、描述和模板内容建立 FTS5 全文索引（优先使用 trigram 分词，中文和部分单词也能查到）；
+SQLite 不支持 FTS5 时退回到 LIKE 查找。第一次打开时从原来的 template_config.json 导入一次。
+"""
+import json
+import os
+import sqlite3
+
+SCHEMA_VERSION = 1
+# trigram 分词时短于该长度的查询无法使用全文索引，改用 LIKE
+_TRIGRAM_MIN = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS templates (
+    id INTEGER PRIMARY KEY, category TEXT NOT NULL, name TEXT NOT NULL,
+    path TEXT NOT NULL, description TEXT NOT NULL DEFAULT '',
+    UNIQUE (category, name));
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+def _like_pattern(text):
+    escaped = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+
+class TemplateStore:
+    """用户模板目录，所有修改立即写入数据库"""
+
+    def __init__(self, db_path):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._db = sqlite3.connect(db_path)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        with self._db:
+            self._db.executescript(_SCHEMA)
+            self._db.execute(f'PRAGMA user_version={SCHEMA_VERSION}')
+        self.tokenizer = self._create_fts()
+
+    def _create_fts(self):
+        """创建全文索引表，返回使用的分词器；不支持 FTS5 时改用普通表保存模板内容并返回 None"""
+        row = self._db.execute("SELECT sql FROM sqlite_master WHERE name = 'templates_fts'").fetchone()
+        if row is not None:
+            return 'trigram' if 'trigram' in row[0] else 'unicode61'
+        for tokenizer in ('trigram', 'unicode61'):
+            try:
+                with self._db:
+                    self._db.execute('CREATE VIRTUAL TABLE templates_fts USING fts5('
+                                     f'name, description, body, tokenize="{tokenizer}")')
+                return tokenizer
+            except sqlite3.OperationalError:
+                continue
+        with self._db:
+            self._db.execute('CREATE TABLE IF NOT EXISTS template_bodies '
+                             '(id INTEGER PRIMARY KEY, body TEXT NOT NULL)')
+        return None
+
+    def close(self):
+        self._db.close()
+
+    # ---- 读取 ----
+
+    def templates(self):
+        """返回所有用户模板 [(分类, 名称, 路径, 描述), ...]，按分类和名称排序"""
+        return self._db.execute('SELECT category, name, path, description FROM templates '
+                                'ORDER BY category, name').fetchall()
+
+    def categories(self):
+        return [row[0] for row in self._db.execute(
+            'SELECT DISTINCT category FROM templates ORDER BY category')]
+
+    def get(self, category, name):
+        """返回 (路径, 描述)，不存在时返回 None"""
+        return self._db.execute('SELECT path, description FROM templates '
+                                'WHERE category = ? AND name = ?', (category, name)).fetchone()
+
+    def search(self, text, limit=200):
+        """按名称、描述和模板内容全文查找，返回 [(分类, 名称, 路径, 描述), ...]，最相关的在前"""
+        text = text.strip()
+        if not text:
+            return self.templates()[:limit]
+        if self.tokenizer is None or (self.tokenizer == 'trigram' and len(text) < _TRIGRAM_MIN):
+            pattern = _like_pattern(text)
+            body_condition = ''
+            params = [pattern, pattern]
+            if self.tokenizer is None:
+                body_condition = (' OR t.id IN (SELECT id FROM template_bodies '
+                                  "WHERE body LIKE ? ESCAPE '\\')")
+                params.append(pattern)
+            elif self.tokenizer == 'trigram':
+                body_condition = " OR t.id IN (SELECT rowid FROM templates_fts WHERE body LIKE ? ESCAPE '\\')"
+                params.append(pattern)
+            return self._db.execute(
+                'SELECT t.category, t.name, t.path, t.description FROM templates t '
+                "WHERE t.name LIKE ? ESCAPE '\\' OR t.description LIKE ? ESCAPE '\\'"
+                f'{body_condition} ORDER BY t.category, t.name LIMIT ?',
+                params + [limit]).fetchall()
+        query = '"' + text.replace('"', '""') + '"'
+        return self._db.execute(
+            'SELECT t.category, t.name, t.path, t.description FROM templates_fts f '
+            'JOIN templates t ON t.id = f.rowid WHERE templates_fts MATCH ? '
+            'ORDER BY f.rank LIMIT ?', (query, limit)).fetchall()
+
+    # ---- 修改（每个操作一个事务） ----
+
+    def add(self, category, name, path, description='', body=''):
+        """添加模板，同分类下同名的模板被替换"""
+        with self._db:
+            self._add(category, name, path, description, body)
+
+    def _add(self, category, name, path, description, body):
+        row = self._db.execute('SELECT id FROM templates WHERE category = ? AND name = ?',
+                               (category, name)).fetchone()
+        if row is None:
+            template_id = self._db.execute(
+                'INSERT INTO templates (category, name, path, description) VALUES (?, ?, ?, ?)',
+                (category, name, path, description)).lastrowid
+        else:
+            template_id = row[0]
+            self._db.execute('UPDATE templates SET path = ?, description = ? WHERE id = ?',
+                             (path, description, template_id))
+        self._set_text(template_id, name, description, body)
+
+    def remove(self, category, name):
+        """删除模板，返回是否存在"""
+        with self._db:
+            row = self._db.execute('SELECT id FROM templates WHERE category = ? AND name = ?',
+                                   (category, name)).fetchone()
+            if row is None:
+                return False
+            self._db.execute('DELETE FROM templates WHERE id = ?', row)
+            self._delete_text(row[0])
+            return True
+
+    def rename(self, category, old_name, new_name, new_path):
+        """重命名模板（模板内容不变），新名称已存在时抛出 ValueError"""
+        with self._db:
+            row = self._db.execute('SELECT id, description FROM templates '
+                                   'WHERE category = ? AND name = ?', (category, old_name)).fetchone()
+            if row is None:
+                raise ValueError(f"模板不存在: {category}/{old_name}")
+            if self.get(category, new_name) is not None:
+                raise ValueError("该名称已存在")
+            template_id, description = row
+            self._db.execute('UPDATE templates SET name = ?, path = ? WHERE id = ?',
+                             (new_name, new_path, template_id))
+            if self.tokenizer is not None:
+                self._db.execute('UPDATE templates_fts SET name = ? WHERE rowid = ?',
+                                 (new_name, template_id))
+
+    def _set_text(self, template_id, name, description, body):
+        self._delete_text(template_id)
+        if self.tokenizer is not None:
+            self._db.execute('INSERT INTO templates_fts (rowid, name, description, body) '
+                             'VALUES (?, ?, ?, ?)', (template_id, name, description, body))
+        else:
+            self._db.execute('INSERT INTO template_bodies (id, body) VALUES (?, ?)',
+                             (template_id, body))
+
+    def _delete_text(self, template_id):
+        if self.tokenizer is not None:
+            self._db.execute('DELETE FROM templates_fts WHERE rowid = ?', (template_id,))
+        else:
+            self._db.execute('DELETE FROM template_bodies WHERE id = ?', (template_id,))
+
+    # ---- 迁移 ----
+
+    def migrate_json(self, config_path, template_dir):
+        """从原来的 JSON 配置导入一次（在一个事务中），返回导入的模板数；
+        已经导入过或配置不存在时返回 0。原配置文件保留不动。"""
+        if self._db.execute("SELECT 1 FROM meta WHERE key = 'json_migrated'").fetchone():
+            return 0
+        try:
+            with open(config_path, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+        except FileNotFoundError:
+            config = {}
+        count = 0
+        with self._db:
+            for category, templates in config.items():
+                for name, info in templates.items():
+                    path = info.get('path', '')
+                    try:
+                        with open(os.path.join(template_dir, path), 'r', encoding='utf-8') as f:
+                            body = f.read()
+                    except OSError:
+                        body = ''
+                    self._add(category, name, path, info.get('description', ''), body)
+                    count += 1
+            self._db.execute("INSERT INTO meta (key, value) VALUES ('json_migrated', ?)",
+                             (config_path,))
+        return count
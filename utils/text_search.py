@@ -0,0 +1,159 @@
+"""文本查找与替换
+
+对文本快照做一次正则扫描得到全部匹配的位置，之后查找下一个、上一个只需二分查找；
+全部替换一次生成替换后的文本，由调用方作为一次编辑写回文档。
+
+返回的位置按 UTF-16 编码单元计算，与 QTextDocument 中的位置一致
+（文本中有基本多文种平面以外的字符时两者不同）。
+"""
+import re
+from array import array
+from bisect import bisect_left
+
+_ASTRAL_RE = re.compile('[\U00010000-\U0010ffff]')
+# 分块扫描时每块的字符数（re 在一次扫描中不释放 GIL，分块后其他线程可以及时运行）
+CHUNK_SIZE = 1 << 20
+# 逐批返回匹配时每批的最大个数
+BATCH_SIZE = 2000
+
+
+def compile_pattern(text, case_sensitive=False, regex=False):
+    """把查找内容编译为正则表达式，regex 为 False 时按字面匹配；正则表达式无效时抛出 re.error"""
+    flags = re.MULTILINE if case_sensitive else re.MULTILINE | re.IGNORECASE
+    return re.compile(text if regex else re.escape(text), flags)
+
+
+def utf16_length(text):
+    """文本在 QTextDocument 中占的长度"""
+    if text.isascii():
+        return len(text)
+    return len(text) + sum(1 for _ in _ASTRAL_RE.finditer(text))
+
+
+class _Utf16Offsets:
+    """把 Python 字符串下标换算为 UTF-16 位置"""
+    def __init__(self, text):
+        self._astral = [] if text.isascii() else [m.start() for m in _ASTRAL_RE.finditer(text)]
+
+    def __call__(self, index):
+        if not self._astral:
+            return index
+        return index + bisect_left(self._astral, index)
+
+
+class Matches:
+    """一次查找得到的全部匹配，按位置排序"""
+
+    def __init__(self, starts, ends):
+        self.starts = starts
+        self.ends = ends
+
+    def __len__(self):
+        return len(self.starts)
+
+    def extend(self, starts, ends):
+        """追加一批位于已有匹配之后的匹配"""
+        self.starts.extend(starts)
+        self.ends.extend(ends)
+
+    def span(self, index):
+        return self.starts[index], self.ends[index]
+
+    def next_index(self, position):
+        """返回 position 之后第一个匹配的序号，到达末尾时从头开始；没有匹配时返回 None"""
+        if not self.starts:
+            return None
+        index = bisect_left(self.starts, position)
+        return index if index < len(self.starts) else 0
+
+    def previous_index(self, position):
+        """返回 position 之前最后一个匹配的序号，到达开头时从末尾开始；没有匹配时返回 None"""
+        if not self.starts:
+            return None
+        index = bisect_left(self.starts, position) - 1
+        return index if index >= 0 else len(self.starts) - 1
+
+    def index_at(self, start, end):
+        """返回恰好位于 [start, end) 的匹配的序号，不存在时返回 None"""
+        index = bisect_left(self.starts, start)
+        if index < len(self.starts) and self.starts[index] == start and self.ends[index] == end:
+            return index
+        return None
+
+
+def _chunks(text, line_local):
+    if not line_local:
+        yield 0, len(text)
+        return
+    position = 0
+    while position < len(text):
+        end = text.find('\n', position + CHUNK_SIZE)
+        end = len(text) if end < 0 else end + 1
+        yield position, end
+        position = end
+
+
+def scan(text, pattern, line_local=False, batch_size=BATCH_SIZE):
+    """逐批返回 pattern 的匹配 (起始位置数组, 结束位置数组)，用于在工作线程中边找边显示
+
+    line_local 为 True 表示匹配不会跨行（按字面查找时），此时在行边界处分块扫描，
+    每块结束时都会返回一批（可能为空），调用方可以在批与批之间检查是否需要停止。
+    """
+    offset = _Utf16Offsets(text)
+    starts = array('q')
+    ends = array('q')
+    for chunk_start, chunk_end in _chunks(text, line_local):
+        for match in pattern.finditer(text, chunk_start, chunk_end):
+            if match.end() == match.start():
+                continue  # 空匹配（如 a*）没有可以选中或替换的内容
+            starts.append(offset(match.start()))
+            ends.append(offset(match.end()))
+            if len(starts) >= batch_size:
+                yield starts, ends
+                starts = array('q')
+                ends = array('q')
+        yield starts, ends
+        starts = array('q')
+        ends = array('q')
+
+
+def find_all(text, pattern):
+    """扫描一遍文本，返回 pattern 的全部匹配"""
+    matches = Matches(array('q'), array('q'))
+    for starts, ends in scan(text, pattern):
+        matches.extend(starts, ends)
+    return matches
+
+
+def replace_all(text, pattern, replacement, regex=False):
+    """替换全部匹配
+
+    返回 (起始位置, 结束位置, 新文本, 替换次数)：把原文本中从起始位置到结束位置的部分
+    换成新文本即完成全部替换，第一个匹配之前和最后一个匹配之后的文本不变。
+    regex 为 True 时替换文本中可以引用分组（\\1、\\g<name>）。没有匹配时返回 None。
+    """
+    pieces = []
+    first = position = None
+    count = 0
+    for match in pattern.finditer(text):
+        if match.end() == match.start():
+            continue
+        if first is None:
+            first = position = match.start()
+        pieces.append(text[position:match.start()])
+        pieces.append(match.expand(replacement) if regex else replacement)
+        position = match.end()
+        count += 1
+    if first is None:
+        return None
+    offset = _Utf16Offsets(text)
+    return offset(first), offset(position), ''.join(pieces), count
+
+
+def substitute(text, pattern, replacement, regex=False):
+    """返回把 text 中全部匹配替换后的文本（用于单个值，空匹配不替换）"""
+    def expand(match):
+        if match.end() == match.start():
+            return ''
+        return match.expand(replacement) if regex else replacement
+    return pattern.sub(expand, text)
@@ -0,0 +1,119 @@
+"""键路径和标量值的查找索引
+
+解析时按文档顺序记录每个节点的父节点、键和值（只保存引用，不复制数据），并把所有键
+和所有标量值的文本分别用换行连接成一个字符串。查找时对这两个字符串各做一次正则扫描，
+再用二分查找把匹配位置换算为节点，不必逐个访问树中的行。
+别名引用的容器只在第一次出现（锚点所在）处记录一次。
+"""
+from array import array
+from bisect import bisect_right
+from itertools import accumulate
+
+
+def _items(container):
+    return container.items() if isinstance(container, dict) else enumerate(container)
+
+
+def _starts(texts):
+    """各段文本用换行连接后每段的起始位置，末尾多一项表示总长度（含最后的换行）"""
+    return array('q', accumulate((len(text) + 1 for text in texts), initial=0))
+
+
+class TreeIndex:
+    """一个文档中所有节点的键和标量值"""
+
+    def __init__(self, data):
+        self._parents = array('q')  # 父节点的编号，-1 表示文档的顶层
+        self._rows = array('q')     # 在父节点中的行号
+        self._keys = []             # 字典键或列表下标
+        self._values = []           # 标量值，容器为 None
+        self._scalar = bytearray()  # 是否为标量
+        if isinstance(data, (dict, list)):
+            self._collect(data)
+
+        key_texts = [str(key) for key in self._keys]
+        value_texts = [str(value) if scalar else ''
+                       for value, scalar in zip(self._values, self._scalar)]
+        self._key_text = '\n'.join(key_texts)
+        self._key_starts = _starts(key_texts)
+        self._value_text = '\n'.join(value_texts)
+        self._value_starts = _starts(value_texts)
+
+    def _collect(self, data):
+        """按文档顺序（先序）登记所有节点"""
+        seen = {id(data)}
+        stack = [(-1, enumerate(_items(data)))]
+        while stack:
+            parent, items = stack[-1]
+            for row, (key, value) in items:
+                entry = len(self._keys)
+                self._parents.append(parent)
+                self._rows.append(row)
+                self._keys.append(key)
+                if isinstance(value, (dict, list)):
+                    self._values.append(None)
+                    self._scalar.append(0)
+                    if id(value) not in seen:
+                        seen.add(id(value))
+                        stack.append((entry, enumerate(_items(value))))
+                        break  # 先处理子节点，之后继续这一层剩下的项
+                else:
+                    self._values.append(value)
+                    self._scalar.append(1)
+            else:
+                stack.pop()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def path(self, entry):
+        """返回节点的键路径"""
+        path = []
+        while entry >= 0:
+            path.append(self._keys[entry])
+            entry = self._parents[entry]
+        return tuple(reversed(path))
+
+    def row_path(self, entry):
+        """返回节点从顶层开始每一级的行号"""
+        rows = []
+        while entry >= 0:
+            rows.append(self._rows[entry])
+            entry = self._parents[entry]
+        return tuple(reversed(rows))
+
+    def value(self, entry):
+        return self._values[entry]
+
+    def is_scalar(self, entry):
+        return bool(self._scalar[entry])
+
+    def search(self, pattern, keys=True, values=True):
+        """返回键（keys 为 True 时）或标量值（values 为 True 时）与 pattern 匹配的节点编号，按文档顺序"""
+        if not self._keys:
+            return []
+        found = set()
+        if keys:
+            found.update(self._scan(self._key_text, self._key_starts, pattern))
+        if values:
+            found.update(self._scan(self._value_text, self._value_starts, pattern))
+        return sorted(found)
+
+    @staticmethod
+    def _scan(text, starts, pattern):
+        """依次返回文本中有匹配的段的序号，每段找到一个匹配后直接跳到下一段"""
+        position = 0
+        while True:
+            match = pattern.search(text, position)
+            if match is None:
+                return
+            entry = bisect_right(starts, match.start()) - 1
+            end = starts[entry + 1] - 1  # 该段末尾（换行之前）
+            if match.start() < match.end() <= end:
+                yield entry
+                position = end + 1
+            else:
+                # 空匹配，或者匹配跨过了段之间的换行
+                position = match.start() + 1
+            if position > len(text):
+                return
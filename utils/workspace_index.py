@@ -0,0 +1,452 @@
+"""工作区 YAML 索引
+
+把工作区文件夹中所有 YAML 文件的键路径（所在行和标量值）、Kubernetes 对象的 kind/name
+和锚点保存在 SQLite 数据库中（~/.easyyaml/workspace/<文件夹路径的哈希>.sqlite）。
+文件在进程池中解析；再次打开时按修改时间和大小只重新索引变化了的文件，并删除已不存在的文件。
+
+路径的写法与 yq 相同：spec.template.spec.containers[0].image，键中含有 . [ ] 等字符时写作
+["kubernetes.io/name"]。路径按“形状”（列表下标都换成 [*]）分组保存，每种形状只存一次，
+每条记录只保存形状编号和具体的下标，查询 spec.template.spec.containers[*].image
+只需一次索引查找。
+"""
+import concurrent.futures
+import hashlib
+import multiprocessing
+import os
+import re
+import sqlite3
+import yaml
+from utils import yaml_codec
+
+INDEX_DIR = os.path.join(os.path.expanduser('~'), '.easyyaml', 'workspace')
+SCHEMA_VERSION = 1
+YAML_SUFFIXES = ('.yaml', '.yml')
+# 不进入的目录（以 . 开头的目录也跳过）
+SKIP_DIRS = {'node_modules', '__pycache__'}
+# 超过该大小的文件不索引（字节）
+MAX_FILE_BYTES = 16 * 1024 * 1024
+# 记录中保存的标量值的最大长度
+VALUE_CHARS = 200
+# 每批提交的文件数
+COMMIT_FILES = 200
+# 查询默认返回的最大条数
+QUERY_LIMIT = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY, path TEXT UNIQUE NOT NULL,
+    mtime INTEGER NOT NULL, size INTEGER NOT NULL, error TEXT);
+CREATE TABLE IF NOT EXISTS shapes (id INTEGER PRIMARY KEY, shape TEXT UNIQUE NOT NULL);
+CREATE TABLE IF NOT EXISTS entries (
+    file_id INTEGER NOT NULL, doc INTEGER NOT NULL, shape_id INTEGER NOT NULL,
+    indices TEXT, line INTEGER NOT NULL, value TEXT);
+CREATE INDEX IF NOT EXISTS entries_shape ON entries(shape_id);
+CREATE INDEX IF NOT EXISTS entries_file ON entries(file_id);
+CREATE TABLE IF NOT EXISTS objects (
+    file_id INTEGER NOT NULL, doc INTEGER NOT NULL, kind TEXT NOT NULL, name TEXT NOT NULL,
+    namespace TEXT, line INTEGER NOT NULL);
+CREATE INDEX IF NOT EXISTS objects_kind_name ON objects(kind, name);
+CREATE INDEX IF NOT EXISTS objects_name ON objects(name);
+CREATE INDEX IF NOT EXISTS objects_file ON objects(file_id);
+CREATE TABLE IF NOT EXISTS anchors (
+    file_id INTEGER NOT NULL, doc INTEGER NOT NULL, name TEXT NOT NULL,
+    path TEXT NOT NULL, line INTEGER NOT NULL);
+CREATE INDEX IF NOT EXISTS anchors_name ON anchors(name);
+CREATE INDEX IF NOT EXISTS anchors_file ON anchors(file_id);
+"""
+
+# 可以不加引号的键
+_PLAIN_KEY_RE = re.compile(r'[\w\-/$@]+')
+# 形状中代表列表下标的 [*]（不在带引号的键中）
+_INDEX_SLOT_RE = re.compile(r'(?<!")\[\*\](?!")')
+# 查询表达式的一段：.键、.*、.**、[下标]、[*]、["键"]
+_QUERY_TOKEN_RE = re.compile(
+    r'\.?(\*\*|\*|[\w\-/$@]+)|\[(?:(\d+)|(\*)|"((?:[^"\\]|\\.)*)")\]')
+# 任意一个键（用于 * 通配符）
+_ANY_KEY = r'(?:\.[\w\-/$@]+|\["(?:[^"\\]|\\.)*"\])'
+
+ANY_KEY = object()       # 查询中的 *：任意一个键
+ANY_PATH = object()      # 查询中的 **：任意多段
+ANY_INDEX = object()     # 查询中的 [*]：任意下标
+
+
+def database_path(root):
+    """返回工作区文件夹对应的索引数据库路径"""
+    digest = hashlib.blake2b(os.path.abspath(root).encode('utf-8', 'surrogatepass'),
+                             digest_size=16).hexdigest()
+    return os.path.join(INDEX_DIR, digest + '.sqlite')
+
+
+def _format_key(key):
+    key = str(key)
+    if _PLAIN_KEY_RE.fullmatch(key):
+        return '.' + key
+    return '["' + key.replace('\\', '\\\\').replace('"', '\\"') + '"]'
+
+
+def display_path(path):
+    """去掉路径开头的 . 用于显示"""
+    return path[1:] if path.startswith('.') else path
+
+
+def parse_query(expression):
+    """把路径表达式解析为段的列表：键（str）、下标（int）或通配符（ANY_KEY/ANY_PATH/ANY_INDEX）
+
+    表达式无效时抛出 ValueError。
+    """
+    expression = expression.strip()
+    segments = []
+    position = 0
+    while position < len(expression):
+        match = _QUERY_TOKEN_RE.match(expression, position)
+        if match is None or match.end() == position:
+            raise ValueError(f"无法解析的路径（位置 {position + 1}）: {expression}")
+        key, index, any_index, quoted = match.groups()
+        if key == '**':
+            segments.append(ANY_PATH)
+        elif key == '*':
+            segments.append(ANY_KEY)
+        elif key is not None:
+            segments.append(key)
+        elif index is not None:
+            segments.append(int(index))
+        elif any_index is not None:
+            segments.append(ANY_INDEX)
+        else:
+            segments.append(re.sub(r'\\(.)', r'\1', quoted))
+        position = match.end()
+    if not segments:
+        raise ValueError("路径为空")
+    return segments
+
+
+def _query_patterns(segments):
+    """返回 (形状, 形状的正则表达式, 路径的正则表达式)；有键通配符时形状为 None"""
+    shape = []
+    shape_re = []
+    path_re = []
+    exact = True
+    for segment in segments:
+        if segment is ANY_PATH:
+            exact = False
+            shape_re.append('.*')
+            path_re.append('.*')
+        elif segment is ANY_KEY:
+            exact = False
+            shape_re.append(_ANY_KEY)
+            path_re.append(_ANY_KEY)
+        elif segment is ANY_INDEX or isinstance(segment, int):
+            shape.append('[*]')
+            shape_re.append(r'\[\*\]')
+            path_re.append(r'\[\d+\]' if segment is ANY_INDEX else re.escape(f'[{segment}]'))
+        else:
+            text = _format_key(segment)
+            shape.append(text)
+            shape_re.append(re.escape(text))
+            path_re.append(re.escape(text))
+    return (''.join(shape) if exact else None,
+            re.compile(''.join(shape_re)), re.compile(''.join(path_re)))
+
+
+# ---- 单个文件的解析（在进程池中执行） ----
+
+def _scalar_text(node):
+    value = node.value
+    return value if len(value) <= VALUE_CHARS else value[:VALUE_CHARS] + '…'
+
+
+def _extract(text):
+    """解析文本，返回 (键路径记录, Kubernetes 对象, 锚点)
+
+    键路径记录为 (文档序号, 形状, 下标, 行号, 标量值)，行号从 1 开始，下标为逗号分隔的字符串，
+    容器节点的值为 None。别名指向的节点只在第一次出现（锚点所在）处展开。
+    """
+    entries = []
+    objects = []
+    anchors = []
+    for doc, root in enumerate(yaml_codec.compose_all(text)):
+        if root is None:
+            continue
+        if isinstance(root, yaml.MappingNode):
+            found = _kubernetes_object(root)
+            if found is not None:
+                objects.append((doc,) + found + (root.start_mark.line + 1,))
+        seen = {id(root)}
+        stack = [(root, '', '', ())]
+        while stack:
+            node, shape, path, indices = stack.pop()
+            name = yaml_codec.anchor_at(text, node.start_mark.index)
+            if name is not None:
+                anchors.append((doc, name, display_path(path), node.start_mark.line + 1))
+            if isinstance(node, yaml.MappingNode):
+                children = []
+                for key_node, value_node in node.value:
+                    if not isinstance(key_node, yaml.ScalarNode) or key_node.value == '<<':
+                        continue  # 复杂键和合并键
+                    key = _format_key(key_node.value)
+                    children.append((value_node, shape + key, path + key, indices,
+                                     key_node.start_mark.line))
+            elif isinstance(node, yaml.SequenceNode):
+                children = [(item, shape + '[*]', f'{path}[{i}]', indices + (i,),
+                             item.start_mark.line)
+                            for i, item in enumerate(node.value)]
+            else:
+                continue
+            for child, child_shape, child_path, child_indices, line in children:
+                scalar = isinstance(child, yaml.ScalarNode)
+                entries.append((doc, child_shape, ','.join(map(str, child_indices)) or None,
+                                line + 1, _scalar_text(child) if scalar else None))
+                if not scalar and id(child) not in seen:
+                    seen.add(id(child))
+                    stack.append((child, child_shape, child_path, child_indices))
+    return entries, objects, anchors
+
+
+def _mapping_value(node, key):
+    for key_node, value_node in node.value:
+        if isinstance(key_node, yaml.ScalarNode) and key_node.value == key:
+            return value_node
+    return None
+
+
+def _kubernetes_object(root):
+    """文档是 Kubernetes 对象时返回 (kind, name, namespace)，否则返回 None"""
+    kind = _mapping_value(root, 'kind')
+    metadata = _mapping_value(root, 'metadata')
+    if not isinstance(kind, yaml.ScalarNode) or not isinstance(metadata, yaml.MappingNode):
+        return None
+    name = _mapping_value(metadata, 'name')
+    if not isinstance(name, yaml.ScalarNode):
+        return None
+    namespace = _mapping_value(metadata, 'namespace')
+    return (kind.value, name.value,
+            namespace.value if isinstance(namespace, yaml.ScalarNode) else None)
+
+
+def index_file(path):
+    """解析一个文件，返回 (路径, 修改时间, 大小, 错误信息, 键路径记录, 对象, 锚点)"""
+    stat = None
+    try:
+        stat = os.stat(path)
+        if stat.st_size > MAX_FILE_BYTES:
+            return path, stat.st_mtime_ns, stat.st_size, "文件过大，未索引", [], [], []
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        entries, objects, anchors = _extract(text)
+        return path, stat.st_mtime_ns, stat.st_size, None, entries, objects, anchors
+    except Exception as e:
+        mtime, size = (stat.st_mtime_ns, stat.st_size) if stat is not None else (0, 0)
+        return path, mtime, size, str(e).split('\n')[0], [], [], []
+
+
+def scan_files(root):
+    """返回工作区中所有 YAML 文件的 {路径: (修改时间, 大小)}"""
+    files = {}
+    for directory, dirs, names in os.walk(root):
+        dirs[:] = [d for d in dirs if not d.startswith('.') and d not in SKIP_DIRS]
+        for name in names:
+            if name.endswith(YAML_SUFFIXES):
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files[path] = (stat.st_mtime_ns, stat.st_size)
+    return files
+
+
+class WorkspaceIndex:
+    """一个工作区文件夹的索引数据库
+
+    每个线程使用自己的实例（SQLite 连接不能跨线程使用）。数据库使用 WAL 模式，
+    后台线程更新索引时，其他线程仍可以查询。
+    """
+
+    def __init__(self, root, db_path=None):
+        self.root = os.path.abspath(root)
+        self.db_path = db_path or database_path(self.root)
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._db = sqlite3.connect(self.db_path, timeout=30)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        if self._db.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+            self._reset_schema()
+        self._shape_ids = None
+
+    def _reset_schema(self):
+        """数据库格式与当前版本不一致时清空重建"""
+        with self._db:
+            for table in ('files', 'shapes', 'entries', 'objects', 'anchors'):
+                self._db.execute(f'DROP TABLE IF EXISTS {table}')
+            self._db.executescript(_SCHEMA)
+            self._db.execute(f'PRAGMA user_version={SCHEMA_VERSION}')
+
+    def close(self):
+        self._db.close()
+
+    # ---- 更新 ----
+
+    def update(self, progress=None, should_stop=None, workers=None):
+        """按修改时间和大小增量更新索引，返回 (重新索引的文件数, 删除的文件数)
+
+        progress(已完成, 总数) 在每批提交后调用；should_stop() 返回 True 时停止，
+        已提交的部分保留，下次更新时继续。
+        """
+        current = scan_files(self.root)
+        known = {path: (file_id, mtime, size) for file_id, path, mtime, size
+                 in self._db.execute('SELECT id, path, mtime, size FROM files')}
+        removed = [known[path][0] for path in known.keys() - current.keys()]
+        changed = sorted(path for path, stat in current.items()
+                         if path not in known or known[path][1:] != stat)
+        with self._db:
+            self._delete_files(removed)
+        if progress is not None:
+            progress(0, len(changed))
+        if not changed:
+            return 0, len(removed)
+
+        self._shape_ids = dict(self._db.execute('SELECT shape, id FROM shapes'))
+        done = 0
+        pending = []
+        workers = workers or os.cpu_count() or 1
+        # 不使用 fork：GUI 进程中有多个线程，fork 出的子进程状态不可靠
+        context = multiprocessing.get_context('spawn')
+        with concurrent.futures.ProcessPoolExecutor(workers, mp_context=context) as pool:
+            try:
+                for result in pool.map(index_file, changed, chunksize=16):
+                    pending.append(result)
+                    if len(pending) >= COMMIT_FILES:
+                        done += self._store(pending, known)
+                        pending = []
+                        if progress is not None:
+                            progress(done, len(changed))
+                    if should_stop is not None and should_stop():
+                        pending = []
+                        pool.shutdown(cancel_futures=True)
+                        break
+            finally:
+                done += self._store(pending, known)
+        if progress is not None:
+            progress(done, len(changed))
+        return done, len(removed)
+
+    def _delete_files(self, file_ids):
+        for table in ('entries', 'objects', 'anchors'):
+            self._db.executemany(f'DELETE FROM {table} WHERE file_id = ?',
+                                 ((file_id,) for file_id in file_ids))
+        self._db.executemany('DELETE FROM files WHERE id = ?', ((file_id,) for file_id in file_ids))
+
+    def _shape_id(self, shape):
+        shape_id = self._shape_ids.get(shape)
+        if shape_id is None:
+            shape_id = self._db.execute('INSERT INTO shapes(shape) VALUES (?)', (shape,)).lastrowid
+            self._shape_ids[shape] = shape_id
+        return shape_id
+
+    def _store(self, results, known):
+        """在一个事务中写入一批文件的解析结果，返回文件数"""
+        if not results:
+            return 0
+        with self._db:
+            self._delete_files([known[path][0] for path, *_ in results if path in known])
+            for path, mtime, size, error, entries, objects, anchors in results:
+                file_id = self._db.execute(
+                    'INSERT INTO files(path, mtime, size, error) VALUES (?, ?, ?, ?)',
+                    (path, mtime, size, error)).lastrowid
+                self._db.executemany(
+                    'INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?)',
+                    [(file_id, doc, self._shape_id(shape), indices, line, value)
+                     for doc, shape, indices, line, value in entries])
+                self._db.executemany('INSERT INTO objects VALUES (?, ?, ?, ?, ?, ?)',
+                                     [(file_id,) + found for found in objects])
+                self._db.executemany('INSERT INTO anchors VALUES (?, ?, ?, ?, ?)',
+                                     [(file_id,) + anchor for anchor in anchors])
+        return len(results)
+
+    # ---- 查询 ----
+
+    def stats(self):
+        """返回 (文件数, 解析失败的文件数, 键路径记录数)"""
+        files, failed = self._db.execute(
+            'SELECT COUNT(*), COUNT(error) FROM files').fetchone()
+        entries = self._db.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+        return files, failed, entries
+
+    def find_path(self, expression, limit=QUERY_LIMIT):
+        """查找设置了该路径的位置，返回 [(文件, 行号, 路径, 标量值), ...]
+
+        表达式中可以使用 [*]（任意下标）、*（任意一个键）和 **（任意多段）；
+        不含 * 和 ** 时只需按形状做一次索引查找。表达式无效时抛出 ValueError。
+        """
+        segments = parse_query(expression)
+        shape, shape_re, path_re = _query_patterns(segments)
+        if shape is not None:
+            shapes = self._db.execute('SELECT id, shape FROM shapes WHERE shape = ?', (shape,))
+        else:
+            shapes = ((shape_id, text) for shape_id, text
+                      in self._db.execute('SELECT id, shape FROM shapes')
+                      if shape_re.fullmatch(text))
+        concrete = any(isinstance(segment, int) for segment in segments)
+        sql = ('SELECT f.path, e.line, e.indices, e.value FROM entries e '
+               'JOIN files f ON f.id = e.file_id WHERE e.shape_id = ?')
+        params = ()
+        if concrete and shape is not None:
+            # 下标的个数固定，可以直接在数据库中按下标筛选
+            sql += ' AND e.indices GLOB ?'
+            params = (','.join('*' if segment is ANY_INDEX else str(segment)
+                               for segment in segments
+                               if segment is ANY_INDEX or isinstance(segment, int)),)
+            concrete = False
+        sql += ' ORDER BY f.path, e.line'
+
+        results = []
+        for shape_id, text in list(shapes):
+            for file_path, line, indices, value in self._db.execute(sql, (shape_id,) + params):
+                path = self._expand(text, indices)
+                if concrete and not path_re.fullmatch(path):
+                    continue
+                results.append((file_path, line, display_path(path), value))
+                if len(results) >= limit:
+                    break
+            if len(results) >= limit:
+                break
+        results.sort()
+        return results
+
+    @staticmethod
+    def _expand(shape, indices):
+        """把形状中的 [*] 依次换成具体的下标"""
+        if not indices:
+            return shape
+        numbers = iter(indices.split(','))
+        return _INDEX_SLOT_RE.sub(lambda _: f'[{next(numbers)}]', shape)
+
+    def find_objects(self, kind=None, name=None, limit=QUERY_LIMIT):
+        """按 kind 和 name 查找 Kubernetes 对象（可以使用 * ? 通配符），
+        返回 [(文件, 行号, kind, name, namespace), ...]"""
+        conditions = []
+        params = []
+        for column, value in (('kind', kind), ('name', name)):
+            if value:
+                conditions.append(f'o.{column} GLOB ?' if any(c in value for c in '*?[')
+                                  else f'o.{column} = ?')
+                params.append(value)
+        where = ('WHERE ' + ' AND '.join(conditions)) if conditions else ''
+        return self._db.execute(
+            'SELECT f.path, o.line, o.kind, o.name, o.namespace FROM objects o '
+            f'JOIN files f ON f.id = o.file_id {where} ORDER BY o.kind, o.name, f.path LIMIT ?',
+            params + [limit]).fetchall()
+
+    def find_anchors(self, name, limit=QUERY_LIMIT):
+        """查找锚点定义，返回 [(文件, 行号, 路径, 锚点名), ...]"""
+        condition = 'a.name GLOB ?' if any(c in name for c in '*?[') else 'a.name = ?'
+        return self._db.execute(
+            'SELECT f.path, a.line, a.path, a.name FROM anchors a '
+            f'JOIN files f ON f.id = a.file_id WHERE {condition} ORDER BY f.path, a.line LIMIT ?',
+            (name, limit)).fetchall()
+
+    def failed_files(self, limit=QUERY_LIMIT):
+        """返回解析失败的文件 [(文件, 错误信息), ...]"""
+        return self._db.execute(
+            'SELECT path, error FROM files WHERE error IS NOT NULL ORDER BY path LIMIT ?',
+            (limit,)).fetchall()
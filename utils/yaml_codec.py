@@ -0,0 +1,336 @@
+"""YAML 编解码的统一入口
+
+所有加载和导出都通过这里完成：libyaml 可用时使用 C 实现的 CSafeLoader/CSafeDumper，
+否则回退到纯 Python 的 SafeLoader/SafeDumper。调用方不要自己选择 Loader。
+"""
+import logging
+import re
+import yaml
+
+logger = logging.getLogger(__name__)
+
+try:
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+    BACKEND = 'libyaml'
+except ImportError:
+    from yaml import SafeLoader, SafeDumper
+    BACKEND = 'python'
+
+YAMLError = yaml.YAMLError
+MarkedYAMLError = yaml.MarkedYAMLError
+
+# 可以原地替换的标量样式：普通、单引号、双引号（块标量需要整体重写）
+_PATCHABLE_STYLES = (None, '', "'", '"')
+# 超出 BMP 的字符在 QTextDocument 中占两个位置，字符下标不能直接用作文档位置
+_ASTRAL_RE = re.compile('[\U00010000-\U0010FFFF]')
+# 单行输出的最大宽度
+_MAX_WIDTH = 2 ** 31 - 1
+# 节点起始处的属性：可选的标签和锚点（节点的起始位置包含这些属性）
+_ANCHOR_RE = re.compile(r'(?:![^\s]*\s+)?&([^\s,\[\]{}]+)')
+_SPACE_RE = re.compile(r'\s*')
+
+
+class _SpanLoader(SafeLoader):
+    """记录每个标量值在源文本中的位置（字符下标）和是否位于流式集合中，以及容器和标量的锚点"""
+    def __init__(self, stream):
+        super().__init__(stream)
+        self.text = stream
+        self.child_spans = {}  # id(容器) -> [(键, 起始, 结束, 是否流式), ...]
+        self.anchor_names = {}  # id(容器) -> 锚点名
+        # 带锚点的标量和引用标量的别名：id(容器) -> [(键, 锚点节点的起始), ...]
+        self.scalar_anchors = {}
+        self.scalar_aliases = {}
+
+    def _record_anchor(self, data, node):
+        # 组合后的节点不保留锚点名，从节点起始处的原文中读取
+        match = _ANCHOR_RE.match(self.text, node.start_mark.index)
+        if match:
+            self.anchor_names[id(data)] = match.group(1)
+
+    def _record(self, data, key, key_end, node, flow):
+        if not isinstance(node, yaml.ScalarNode):
+            return
+        start = node.start_mark.index
+        if start < key_end:
+            # 别名引用的节点位于别处，修改时改的是锚点处的原文
+            self.scalar_aliases.setdefault(id(data), []).append((key, start))
+            return
+        match = _ANCHOR_RE.match(self.text, start)
+        if match:
+            self.scalar_anchors.setdefault(id(data), []).append((key, start))
+            # 只替换锚点之后的值；同时带标签时无法只替换值
+            start = _SPACE_RE.match(self.text, match.end()).end()
+            if match.group(0).startswith('!') or self.text.startswith('!', start):
+                return
+        if node.style not in _PATCHABLE_STYLES:
+            return
+        self.child_spans.setdefault(id(data), []).append(
+            (key, start, node.end_mark.index, flow))
+
+    def construct_yaml_map(self, node):
+        data = {}
+        yield data
+        self._record_anchor(data, node)
+        data.update(self.construct_mapping(node))
+        begin = node.start_mark.index
+        for key_node, value_node in node.value:
+            if key_node.start_mark.index < begin:
+                continue  # 通过 << 合并进来的键
+            key = self.construct_object(key_node)
+            if isinstance(key, (dict, list)):
+                continue
+            self._record(data, key, key_node.end_mark.index, value_node, bool(node.flow_style))
+
+    def construct_yaml_seq(self, node):
+        data = []
+        yield data
+        self._record_anchor(data, node)
+        data.extend(self.construct_sequence(node))
+        # 每一项都应在前一项之后开始，否则是引用别处（包括本列表前面）锚点的别名
+        end = node.start_mark.index
+        for i, item_node in enumerate(node.value):
+            self._record(data, i, end, item_node, bool(node.flow_style))
+            if item_node.start_mark.index >= end:
+                end = item_node.end_mark.index
+
+
+_SpanLoader.add_constructor('tag:yaml.org,2002:map', _SpanLoader.construct_yaml_map)
+_SpanLoader.add_constructor('tag:yaml.org,2002:seq', _SpanLoader.construct_yaml_seq)
+
+
+def _collect_spans(data, loader):
+    """把按容器记录的位置和锚点转换为 路径 -> (起始, 结束, 是否流式) 和 路径 -> 锚点，
+    每个容器只访问一次"""
+    spans = {}
+    anchors = {}
+    scalar_anchors = {}  # 锚点节点的起始 -> 锚点所在路径
+    scalar_aliases = {}  # 锚点节点的起始 -> [别名所在路径, ...]
+    seen = set()
+    stack = [(data, ())]
+    while stack:
+        container, path = stack.pop()
+        if id(container) in seen:
+            continue  # 别名共享的容器只按第一次出现（即锚点所在）的路径记录
+        seen.add(id(container))
+        name = loader.anchor_names.get(id(container))
+        if name is not None:
+            anchors[path] = name
+        for key, start, end, flow in loader.child_spans.get(id(container), ()):
+            spans[path + (key,)] = (start, end, flow)
+        for key, start in loader.scalar_anchors.get(id(container), ()):
+            scalar_anchors[start] = path + (key,)
+        for key, start in loader.scalar_aliases.get(id(container), ()):
+            scalar_aliases.setdefault(start, []).append(path + (key,))
+        items = container.items() if isinstance(container, dict) else enumerate(container)
+        children = [(value, path + (key,)) for key, value in items
+                    if isinstance(value, (dict, list))]
+        stack.extend(reversed(children))  # 按文档顺序访问
+    for start, path in scalar_anchors.items():
+        anchors[path] = (anchor_at(loader.text, start), tuple(scalar_aliases.get(start, ())))
+    return spans, anchors
+
+
+def load(stream):
+    """加载单个文档"""
+    return yaml.load(stream, Loader=SafeLoader)
+
+
+def load_all(stream):
+    """逐个加载多文档流"""
+    return yaml.load_all(stream, Loader=SafeLoader)
+
+
+def compose_all(text):
+    """逐个返回多文档流中每个文档的节点树（不构造数据，别名指向同一个节点对象）"""
+    return yaml.compose_all(text, Loader=SafeLoader)
+
+
+def anchor_at(text, index):
+    """返回从 index 开始的节点属性中的锚点名（节点的起始位置包含属性），没有锚点时返回 None"""
+    match = _ANCHOR_RE.match(text, index)
+    return match.group(1) if match else None
+
+
+def load_with_spans(text):
+    """加载单个文档，返回 (数据, 位置表, 锚点表)
+
+    位置表是标量值的源码位置 {路径: (起始, 结束, 是否位于流式集合中)}，文本含有 BMP 以外的字符时
+    位置无法直接对应到编辑器，位置表为 None。锚点表中带锚点的容器为 {路径: 锚点名}，
+    路径为锚点所在的位置，别名引用处不重复记录；带锚点的标量为 {路径: (锚点名, 别名所在路径)}，
+    标量不是共享对象，引用它的别名需要逐一记录。
+    """
+    loader = _SpanLoader(text)
+    try:
+        data = loader.get_single_data()
+    finally:
+        loader.dispose()
+    if not isinstance(data, (dict, list)):
+        return data, None, {}
+    spans, anchors = _collect_spans(data, loader)
+    if _ASTRAL_RE.search(text):
+        spans = None
+    return data, spans, anchors
+
+
+class _SharedScalar:
+    """导出时代替带锚点的标量：锚点处和别名处放同一个对象，导出为锚点和别名"""
+    __slots__ = ('value', 'name')
+
+    def __init__(self, value, name):
+        self.value = value
+        self.name = name
+
+
+class _AnchorDumper(yaml.SafeDumper):
+    """导出时沿用原文中的锚点名（C 实现的 Dumper 只能生成 id001 这样的名字）"""
+    anchor_names = {}  # id(容器) -> 锚点名
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._node_names = {}
+
+    def represent_data(self, data):
+        node = super().represent_data(data)
+        if isinstance(data, _SharedScalar):
+            name = data.name
+        else:
+            name = self.anchor_names.get(id(data))
+        if name is not None:
+            self._node_names[id(node)] = name
+        return node
+
+    def represent_shared_scalar(self, data):
+        node = self.represent_data(data.value)
+        # 标量本身不会被当作共享对象，由这里记下节点，再次出现时导出为别名
+        self.represented_objects[id(data)] = node
+        return node
+
+    def generate_anchor(self, node):
+        name = self._node_names.get(id(node))
+        return name if name is not None else super().generate_anchor(node)
+
+
+_AnchorDumper.add_representer(_SharedScalar, _AnchorDumper.represent_shared_scalar)
+
+
+def _slot(data, path):
+    """返回路径所在的 (容器, 键)，路径无效时返回 None"""
+    for key in path[:-1]:
+        try:
+            data = data[key]
+        except (KeyError, IndexError, TypeError):
+            return None
+    if isinstance(data, dict) and path[-1] in data:
+        return data, path[-1]
+    if isinstance(data, list) and isinstance(path[-1], int) and 0 <= path[-1] < len(data):
+        return data, path[-1]
+    return None
+
+
+def _share_scalars(data, anchors):
+    """把带锚点的标量和仍与之相等的别名处换成同一个 _SharedScalar，返回 [(容器, 键, 原值), ...]
+    以便导出后还原"""
+    replaced = []
+    for path, entry in anchors.items():
+        if not isinstance(path, tuple) or not path or not isinstance(entry, tuple):
+            continue
+        name, alias_paths = entry
+        slot = _slot(data, path)
+        if slot is None or isinstance(slot[0][slot[1]], (dict, list, _SharedScalar)):
+            continue
+        value = slot[0][slot[1]]
+        shared = _SharedScalar(value, name)
+        for slot in [slot] + [_slot(data, alias_path) for alias_path in alias_paths]:
+            if slot is None:
+                continue
+            container, key = slot
+            current = container[key]
+            if type(current) is type(value) and current == value:
+                replaced.append((container, key, current))
+                container[key] = shared
+    return replaced
+
+
+def dump(data, stream=None, anchors=None, **kwargs):
+    """导出为YAML文本；未指定 stream 时返回字符串
+
+    被多处引用的容器导出为锚点和别名；anchors 为 {id(容器): 锚点名} 时使用其中的名字。
+    anchors 中还可以有带锚点的标量 {路径: (锚点名, 别名所在路径)}，导出时锚点处和值仍与之
+    相等的别名处写成锚点和别名（导出期间临时替换 data 中的这些值）。
+    """
+    if anchors:
+        dumper = type('AnchorDumper', (_AnchorDumper,), {'anchor_names': anchors})
+        replaced = _share_scalars(data, anchors)
+        try:
+            return yaml.dump(data, stream, Dumper=dumper, **kwargs)
+        finally:
+            for container, key, value in reversed(replaced):
+                container[key] = value
+    return yaml.dump(data, stream, Dumper=SafeDumper, **kwargs)
+
+
+def _dump_single(value, style):
+    text = dump(value, default_style=style, default_flow_style=True,
+                allow_unicode=True, width=_MAX_WIDTH)
+    if text.endswith('\n...\n'):
+        text = text[:-5]
+    return text.rstrip('\n')
+
+
+def dump_scalar(value, flow=False):
+    """把标量导出为单行的YAML片段，用于原地替换源文本中的值
+
+    flow 表示该值位于流式集合（[...] 或 {...}）中：普通标量的规则按块上下文判断，
+    其中的 , [ ] { } 等在流式集合里会改变结构，放回集合后读不回原值时改用双引号。
+    """
+    style = '"' if isinstance(value, str) and ('\n' in value or '\r' in value) else None
+    text = _dump_single(value, style)
+    if flow and style is None and isinstance(value, str):
+        try:
+            same = load(f'[{text}]') == [value]
+        except YAMLError:
+            same = False
+        if not same:
+            text = _dump_single(value, '"')
+    return text
+
+
+def error_location(error):
+    """返回解析错误所在的 (行, 列)（从 0 开始），位置未知时返回 None"""
+    mark = getattr(error, 'problem_mark', None) or getattr(error, 'context_mark', None)
+    if mark is None:
+        return None
+    return mark.line, mark.column
+
+
+def _pack_mark(mark):
+    return None if mark is None else (mark.index, mark.line, mark.column)
+
+
+def _unpack_mark(packed):
+    return None if packed is None else yaml.Mark('<unicode string>', *packed, None, None)
+
+
+def pack_error(error):
+    """把解析错误转换为可以跨进程传递的形式（保留出错位置，不含源文本）"""
+    if isinstance(error, MarkedYAMLError):
+        return (error.context, _pack_mark(error.context_mark),
+                error.problem, _pack_mark(error.problem_mark), error.note)
+    return str(error)
+
+
+def unpack_error(packed):
+    """还原 pack_error 的结果"""
+    if isinstance(packed, tuple):
+        context, context_mark, problem, problem_mark, note = packed
+        return MarkedYAMLError(context, _unpack_mark(context_mark),
+                               problem, _unpack_mark(problem_mark), note)
+    return YAMLError(packed)
+
+
+def log_backend():
+    """在启动日志中报告当前使用的解析后端"""
+    if BACKEND == 'libyaml':
+        logger.info("YAML 后端: libyaml (CSafeLoader/CSafeDumper)")
+    else:
+        logger.info("YAML 后端: 纯 Python (SafeLoader/SafeDumper)，未检测到 libyaml")
@@ -1,12 +1,12 @@
-import yaml
 import os
+from utils import yaml_codec
 
 class YamlHandler:
     @staticmethod
     def load_yaml(file_path):
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
-                return yaml.safe_load(f)
+                return yaml_codec.load(f)
         except Exception as e:
             raise Exception(f"加载YAML文件失败: {str(e)}")
     
@@ -14,7 +14,7 @@ class YamlHandler:
     def save_yaml(data, file_path):
         try:
             with open(file_path, 'w', encoding='utf-8') as f:
-                yaml.dump(data, f, allow_unicode=True)
+                yaml_codec.dump(data, f, allow_unicode=True)
         except Exception as e:
             raise Exception(f"保存YAML文件失败: {str(e)}")
     
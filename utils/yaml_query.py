@@ -0,0 +1,404 @@
+"""键路径查询
+
+在解析后的数据（dict/list）上执行类似 yq / JSONPath 的路径表达式，返回匹配节点的
+(键路径, 值)。支持的写法：
+
+    .spec.template          键（以 . 开头可以省略，$ 表示根）
+    ["app.kubernetes.io/name"] 或 ['…']   含有特殊字符的键
+    [0]  [-1]  [1:3]  [0,2]   列表下标、切片和多个下标（也可以是多个带引号的键）
+    .*  [*]  []              全部子节点
+    ..name  ..*  ..[0]      递归：在该节点及其所有子孙上继续匹配
+    [?(@.name == "app")]    筛选子节点，条件中可以使用 == != < <= > >= =~（正则），
+                            && || ! 和括号；@ 是被筛选的节点，单独的 @.key 表示该键存在
+
+表达式编译为一串生成器步骤，节点逐个流过各个步骤，不生成中间列表；编译结果会缓存。
+别名引用的容器只在第一次出现处向下递归（与查找索引一致），循环引用不会死循环。
+"""
+import functools
+import json
+import re
+
+# 不需要加引号的键
+_NAME_RE = re.compile(r'[\w\-/$]+')
+_SPACE_RE = re.compile(r'\s*')
+_INT_RE = re.compile(r'-?\d+')
+_NUMBER_RE = re.compile(r'-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?')
+_STRING_RE = re.compile(r'"(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\'')
+_REGEX_RE = re.compile(r'/((?:[^/\\]|\\.)*)/(i?)')
+_OPERATOR_RE = re.compile(r'==|!=|<=|>=|=~|<|>')
+_WORD_RE = re.compile(r'true|false|null')
+_WORDS = {'true': True, 'false': False, 'null': None}
+
+_MISSING = object()  # 条件中的路径没有匹配
+
+
+def _items(value):
+    return value.items() if isinstance(value, dict) else enumerate(value)
+
+
+# ---- 步骤：每个步骤接收 (路径, 值) 的迭代器，返回新的迭代器 ----
+
+def _child_step(keys):
+    """按键取子节点；列表上按下标取（负数从末尾算起）"""
+    def step(nodes):
+        for path, value in nodes:
+            if isinstance(value, dict):
+                for key in keys:
+                    if key in value:
+                        yield path + (key,), value[key]
+            elif isinstance(value, list):
+                for key in keys:
+                    if isinstance(key, int) and not isinstance(key, bool) \
+                            and -len(value) <= key < len(value):
+                        index = key % len(value)
+                        yield path + (index,), value[index]
+    return step
+
+
+def _slice_step(start, stop, stride):
+    def step(nodes):
+        for path, value in nodes:
+            if isinstance(value, list):
+                for index in range(*slice(start, stop, stride).indices(len(value))):
+                    yield path + (index,), value[index]
+    return step
+
+
+def _child_nodes(path, value):
+    for key, child in _items(value):
+        yield path + (key,), child
+
+
+def _children(nodes):
+    for path, value in nodes:
+        if isinstance(value, (dict, list)):
+            yield from _child_nodes(path, value)
+
+
+def _filter_step(condition):
+    """保留满足条件的子节点"""
+    def step(nodes):
+        for path, value in _children(nodes):
+            if condition(value):
+                yield path, value
+    return step
+
+
+def _descendants(nodes):
+    """依次返回每个节点及其所有子孙（先序，按文档顺序），别名引用的容器只展开一次"""
+    seen = set()
+    for node in nodes:
+        stack = [iter((node,))]
+        while stack:
+            for path, value in stack[-1]:
+                yield path, value
+                if isinstance(value, (dict, list)) and id(value) not in seen:
+                    seen.add(id(value))
+                    stack.append(_child_nodes(path, value))
+                    break
+            else:
+                stack.pop()
+
+
+def _recursive_step(inner):
+    """..X：在节点自身和所有子孙上执行步骤 X"""
+    def step(nodes):
+        return inner(_descendants(nodes))
+    return step
+
+
+# ---- 筛选条件 ----
+
+def _path_operand(steps):
+    """条件中的 @ 路径：返回第一个匹配的值，没有匹配时返回 _MISSING"""
+    def operand(value):
+        for _, found in _run(steps, iter((((), value),))):
+            return found
+        return _MISSING
+    return operand
+
+
+def _equal(a, b):
+    """比较两个值是否相等，布尔值不等于 1 和 0"""
+    if isinstance(a, bool) or isinstance(b, bool):
+        return a is b
+    return a == b
+
+
+def _compare(operator, left, right):
+    def condition(value):
+        a, b = left(value), right(value)
+        if a is _MISSING or b is _MISSING:
+            return operator == '!='
+        try:
+            if operator == '==':
+                return _equal(a, b)
+            if operator == '!=':
+                return not _equal(a, b)
+            if operator == '<':
+                return a < b
+            if operator == '<=':
+                return a <= b
+            if operator == '>':
+                return a > b
+            return a >= b
+        except TypeError:
+            return False
+    return condition
+
+
+def _matches(left, pattern):
+    def condition(value):
+        found = left(value)
+        if found is _MISSING or isinstance(found, (dict, list)):
+            return False
+        text = found if isinstance(found, str) else json.dumps(found, default=str)
+        return pattern.search(text) is not None
+    return condition
+
+
+def _truth(operand, is_path):
+    def condition(value):
+        found = operand(value)
+        return found is not _MISSING if is_path else bool(found)
+    return condition
+
+
+def _run(steps, nodes):
+    for step in steps:
+        nodes = step(nodes)
+    return nodes
+
+
+class _Parser:
+    """把表达式解析为步骤列表，语法错误时抛出 ValueError"""
+
+    def __init__(self, text):
+        self.text = text
+        self.pos = 0
+
+    def error(self, message="无法解析"):
+        raise ValueError(f"{message}（位置 {self.pos + 1}）: {self.text}")
+
+    def skip_space(self):
+        self.pos = _SPACE_RE.match(self.text, self.pos).end()
+
+    def peek(self, literal):
+        return self.text.startswith(literal, self.pos)
+
+    def take(self, literal):
+        if self.peek(literal):
+            self.pos += len(literal)
+            return True
+        return False
+
+    def expect(self, literal):
+        if not self.take(literal):
+            self.error(f"缺少 {literal}")
+
+    def match(self, regex):
+        found = regex.match(self.text, self.pos)
+        if found is not None:
+            self.pos = found.end()
+        return found
+
+    def string(self):
+        found = self.match(_STRING_RE)
+        if found is None:
+            return None
+        body = found.group()[1:-1]
+        if found.group()[0] == '"':
+            return json.loads('"' + body + '"')
+        return re.sub(r"\\(.)", r'\1', body)
+
+    # 路径
+
+    def query(self):
+        self.skip_space()
+        self.take('$')
+        steps = self.steps(stop='')
+        self.skip_space()
+        if self.pos < len(self.text):
+            self.error()
+        return steps
+
+    def steps(self, stop):
+        """解析一串步骤，直到表达式结束或遇到不属于路径的字符"""
+        steps = []
+        first = True
+        while self.pos < len(self.text) and not self.text[self.pos] in stop:
+            if self.take('..'):
+                steps.append(_recursive_step(self.step_after_dot()))
+            elif self.take('.'):
+                if self.pos >= len(self.text) or self.text[self.pos] in stop + ' ':
+                    break  # 单独的 . 表示根
+                steps.append(self.step_after_dot())
+            elif self.peek('['):
+                steps.append(self.bracket())
+            elif first and _NAME_RE.match(self.text, self.pos):
+                steps.append(self.step_after_dot())  # 开头的 . 可以省略
+            else:
+                break
+            first = False
+        return steps
+
+    def step_after_dot(self):
+        if self.take('*'):
+            return _children
+        if self.peek('['):
+            return self.bracket()
+        key = self.string()
+        if key is None:
+            found = self.match(_NAME_RE)
+            if found is None:
+                self.error("缺少键名")
+            key = found.group()
+        return _child_step((key,))
+
+    def bracket(self):
+        self.expect('[')
+        self.skip_space()
+        if self.take(']'):
+            return _children
+        if self.take('*'):
+            step = _children
+        elif self.take('?'):
+            self.skip_space()
+            parenthesized = self.take('(')
+            condition = self.condition()
+            if parenthesized:
+                self.skip_space()
+                self.expect(')')
+            step = _filter_step(condition)
+        else:
+            step = self.selectors()
+        self.skip_space()
+        self.expect(']')
+        return step
+
+    def selectors(self):
+        """[键或下标, ...] 或切片 [起始:结束:步长]"""
+        number = self.match(_INT_RE)
+        self.skip_space()
+        if self.peek(':'):
+            parts = [number]
+            while len(parts) < 3 and self.take(':'):
+                self.skip_space()
+                parts.append(self.match(_INT_RE))
+                self.skip_space()
+            start, stop, stride = (int(p.group()) if p else None
+                                   for p in parts + [None] * (3 - len(parts)))
+            if stride == 0:
+                self.error("切片的步长不能为 0")
+            return _slice_step(start, stop, stride)
+        keys = []
+        while True:
+            if number is not None:
+                keys.append(int(number.group()))
+            else:
+                key = self.string()
+                if key is None:
+                    self.error("缺少下标或键")
+                keys.append(key)
+            self.skip_space()
+            if not self.take(','):
+                return _child_step(tuple(keys))
+            self.skip_space()
+            number = self.match(_INT_RE)
+
+    # 条件
+
+    def condition(self):
+        left = self.conjunction()
+        while True:
+            self.skip_space()
+            if not self.take('||'):
+                return left
+            right = self.conjunction()
+            left = (lambda a, b: lambda value: a(value) or b(value))(left, right)
+
+    def conjunction(self):
+        left = self.unary()
+        while True:
+            self.skip_space()
+            if not self.take('&&'):
+                return left
+            right = self.unary()
+            left = (lambda a, b: lambda value: a(value) and b(value))(left, right)
+
+    def unary(self):
+        self.skip_space()
+        if self.take('!'):
+            inner = self.unary()
+            return lambda value: not inner(value)
+        if self.take('('):
+            inner = self.condition()
+            self.skip_space()
+            self.expect(')')
+            return inner
+        left, is_path = self.operand()
+        self.skip_space()
+        operator = self.match(_OPERATOR_RE)
+        if operator is None:
+            return _truth(left, is_path)
+        operator = operator.group()
+        self.skip_space()
+        if operator == '=~':
+            found = self.match(_REGEX_RE)
+            if found is not None:
+                source, flags = found.group(1).replace('\\/', '/'), found.group(2)
+            else:
+                source, flags = self.string(), ''
+                if source is None:
+                    self.error("缺少正则表达式")
+            try:
+                pattern = re.compile(source, re.IGNORECASE if flags else 0)
+            except re.error as e:
+                self.error(f"正则表达式无效: {e}")
+            return _matches(left, pattern)
+        right, _ = self.operand()
+        return _compare(operator, left, right)
+
+    def operand(self):
+        """返回 (取值函数, 是否为路径)"""
+        self.skip_space()
+        if self.take('@'):
+            return _path_operand(self.steps(stop=' )]=!<>&|')), True
+        text = self.string()
+        if text is not None:
+            return (lambda value: text), False
+        found = self.match(_NUMBER_RE)
+        if found is not None:
+            number = found.group()
+            constant = int(number) if _INT_RE.fullmatch(number) else float(number)
+            return (lambda value: constant), False
+        found = self.match(_WORD_RE)
+        if found is not None:
+            constant = _WORDS[found.group()]
+            return (lambda value: constant), False
+        self.error("缺少 @ 路径或常量")
+
+
+class Query:
+    """编译后的查询"""
+
+    def __init__(self, expression, steps):
+        self.expression = expression
+        self._steps = steps
+
+    def evaluate(self, data, prefix=()):
+        """在一份数据上执行查询，逐个返回 (键路径, 值)，键路径以 prefix 开头"""
+        return _run(self._steps, iter(((prefix, data),)))
+
+    def evaluate_all(self, roots):
+        """在多份数据 [(路径前缀, 数据), ...]（可以是生成器）上依次执行查询"""
+        return _run(self._steps, roots)
+
+
+@functools.lru_cache(maxsize=256)
+def compile_query(expression):
+    """编译查询表达式（结果会缓存），表达式无效时抛出 ValueError"""
+    expression = expression.strip()
+    if not expression:
+        raise ValueError("查询为空")
+    return Query(expression, _Parser(expression).query())
@@ -0,0 +1,373 @@
+"""多文档 YAML 流
+
+用逐行扫描找出 '---' 文档分隔行，把文本切分成若干文档。每个文档只在需要时
+（例如在树中展开）才解析；重新切分时，文本没有变化的文档直接沿用之前的解析结果。
+"""
+import re
+from bisect import bisect_right
+from itertools import accumulate
+from utils import parse_cache, yaml_codec
+from utils.parse_worker import ParseCancelled, CANCELLED
+from utils.tree_index import TreeIndex
+
+# 顶格的 '---' 后跟空白或行尾即为文档开始；块标量和引号字符串中不允许出现这样的行
+_DOC_START_RE = re.compile(r'^---(?=[ \t\r\n]|\Z)', re.M)
+# 第一个 '---' 之前允许出现的非内容行：空行、注释、指令和文档结束标记
+_PREAMBLE_LINE_RE = re.compile(r'[ \t]*(#.*|%.*|\.\.\.[ \t]*(#.*)?)?\r?')
+
+
+def split_documents(text):
+    """返回每个文档的 (起始, 结束) 字符下标，至少包含一个文档"""
+    starts = [m.start() for m in _DOC_START_RE.finditer(text)]
+    if not starts:
+        return [(0, len(text))]
+    if starts[0] != 0:
+        if _is_preamble(text[:starts[0]]):
+            starts[0] = 0  # 开头的注释和指令属于第一个文档
+        else:
+            starts.insert(0, 0)  # 省略了 '---' 的第一个文档
+    return list(zip(starts, starts[1:] + [len(text)]))
+
+
+def _is_preamble(text):
+    """文本是否只包含空行、注释和指令"""
+    return all(_PREAMBLE_LINE_RE.fullmatch(line) for line in text.split('\n'))
+
+
+def _lookup_path(data, path):
+    """按路径取值，路径无效时返回 None"""
+    try:
+        for key in path:
+            data = data[key]
+    except (KeyError, IndexError, TypeError):
+        return None
+    return data
+
+
+def _find_path(data, target):
+    """按文档顺序查找容器第一次出现的路径，找不到时返回 None"""
+    seen = set()
+    stack = [(data, ())]
+    while stack:
+        container, path = stack.pop()
+        if container is target:
+            return path
+        if id(container) in seen:
+            continue
+        seen.add(id(container))
+        items = container.items() if isinstance(container, dict) else enumerate(container)
+        children = [(value, path + (key,)) for key, value in items
+                    if isinstance(value, (dict, list))]
+        stack.extend(reversed(children))
+    return None
+
+
+def _resolve_anchors(data, anchors):
+    """把锚点表拆分为容器的 {id(容器): (锚点名, 路径, 容器)} 和标量的 {路径: (锚点名, 别名所在路径)}"""
+    resolved = {}
+    scalars = {}
+    for path, name in anchors.items():
+        if isinstance(name, tuple):
+            scalars[path] = name
+            continue
+        container = _lookup_path(data, path)
+        if isinstance(container, (dict, list)):
+            resolved[id(container)] = (name, path, container)
+    return resolved, scalars
+
+
+class YamlDocument:
+    """流中的一个文档
+
+    text 是该文档的原文（含开头的 '---' 行），start 是它在整个流中的起始下标；
+    spans 中的位置相对于 text。anchors 记录带锚点的容器
+    {id(容器): (锚点名, 锚点所在路径, 容器)}，保存容器本身是为了让编号在编辑期间保持有效；
+    scalar_anchors 记录带锚点的标量 {锚点所在路径: (锚点名, 别名所在路径)}。
+    index 是解析时生成的查找索引（TreeIndex），数据被修改后置为 None，下次查找时重新生成。
+    """
+    __slots__ = ('text', 'start', 'parsed', 'data', 'spans', 'spans_valid', 'error',
+                 'anchors', 'scalar_anchors', 'index')
+
+    def __init__(self, text, start=0):
+        self.text = text
+        self.start = start
+        self.parsed = False
+        self.data = None
+        self.spans = None
+        self.spans_valid = False  # False 表示位置表需要按 text 重新生成
+        self.error = None
+        self.anchors = {}
+        self.scalar_anchors = {}
+        self.index = None
+
+    def parse(self, token=None):
+        """解析文档（只在第一次调用时执行），返回是否成功
+
+        被 token 取消时抛出 ParseCancelled，文档保持未解析状态；
+        超时或超出内存上限时与语法错误一样记录在 error 中。
+        """
+        if not self.parsed:
+            try:
+                data, self.spans, anchors = parse_cache.load_with_spans(self.text, token)
+                self.data = data if data is not None else {}
+                self.anchors, self.scalar_anchors = _resolve_anchors(self.data, anchors)
+                self.spans_valid = True
+                self.index = TreeIndex(self.data)
+            except ParseCancelled as e:
+                if e.reason == CANCELLED:
+                    raise
+                self.error = e
+            except Exception as e:
+                self.error = e
+            self.parsed = True
+        return self.error is None
+
+    def adopt(self, other):
+        """沿用另一个同文本文档的解析结果"""
+        self.parsed = other.parsed
+        self.data = other.data
+        self.spans = dict(other.spans) if other.spans else other.spans
+        self.spans_valid = other.spans_valid
+        self.error = other.error
+        self.anchors = other.anchors
+        self.scalar_anchors = other.scalar_anchors
+        self.index = other.index
+
+    def anchor_of(self, container):
+        """返回容器的 (锚点名, 锚点所在路径)，容器没有锚点时返回 None
+
+        编辑后原来的路径可能失效，此时按文档顺序重新查找容器第一次出现的位置，
+        导出时锚点也写在那里。
+        """
+        entry = self.anchors.get(id(container))
+        if entry is None:
+            return None
+        name, path, _ = entry
+        if _lookup_path(self.data, path) is not container:
+            path = _find_path(self.data, container)
+            self.anchors[id(container)] = (name, path, container)
+        return name, path
+
+    def anchor_names(self):
+        """返回导出时使用的锚点：{id(容器): 锚点名} 和带锚点的标量 {路径: (锚点名, 别名所在路径)}"""
+        names = {key: name for key, (name, _, _) in self.anchors.items()}
+        names.update(self.scalar_anchors)
+        return names
+
+    def source_path(self, path):
+        """返回路径在原文中实际所在的位置：经过别名的部分换成锚点所在的路径，
+        别名处的标量换成锚点处的标量"""
+        if self.anchors:
+            node = self.data
+            i = 0
+            while i < len(path):
+                try:
+                    node = node[path[i]]
+                except (KeyError, IndexError, TypeError):
+                    return path
+                i += 1
+                found = self.anchor_of(node) if isinstance(node, (dict, list)) else None
+                if found is not None and found[1] is not None and found[1] != path[:i]:
+                    path = found[1] + path[i:]
+                    i = len(found[1])
+        for anchor_path, (_, alias_paths) in self.scalar_anchors.items():
+            if path in alias_paths:
+                return anchor_path
+        return path
+
+    def set_shared_scalar(self, path, old_value, new_value):
+        """路径处的标量来自锚点时，把锚点处和各别名处仍为 old_value 的值一起改为 new_value，
+        返回是否修改了其他位置"""
+        self.ensure_spans()
+        path = self.source_path(path)
+        entry = self.scalar_anchors.get(path)
+        if entry is None:
+            return False
+        changed = False
+        for shared_path in (path,) + entry[1]:
+            container = _lookup_path(self.data, shared_path[:-1])
+            if not isinstance(container, (dict, list)):
+                continue
+            current = _lookup_path(container, shared_path[-1:])
+            if type(current) is type(old_value) and current == old_value:
+                container[shared_path[-1]] = new_value
+                changed = True
+        return changed
+
+    def remap_scalar_anchors(self, remap):
+        """结构修改后按 remap(路径) 更新标量锚点和别名所在的路径，remap 返回 None 表示该处已删除；
+        锚点处被删除时由剩下的第一个别名处接替"""
+        updated = {}
+        for path, (name, alias_paths) in self.scalar_anchors.items():
+            paths = [p for p in map(remap, (path,) + alias_paths) if p is not None]
+            if paths:
+                updated[paths[0]] = (name, tuple(paths[1:]))
+        self.scalar_anchors = updated
+
+    def search_index(self):
+        """返回查找索引，索引已失效时按当前数据重新生成；文档未解析或解析失败时返回 None"""
+        if not self.parsed or self.error is not None:
+            return None
+        if self.index is None:
+            self.index = TreeIndex(self.data)
+        return self.index
+
+    def ensure_spans(self):
+        """位置表失效时重新解析原文生成，返回位置表（可能为 None）"""
+        if not self.spans_valid and self.error is None:
+            try:
+                self.spans = parse_cache.load_spans(self.text)
+                # 结构修改后文本是重新导出的，标量锚点的路径也按新文本更新
+                self.scalar_anchors = _resolve_anchors(
+                    self.data, parse_cache.load_anchors(self.text))[1]
+            except Exception:
+                self.spans = None
+            self.spans_valid = True
+        return self.spans
+
+
+class YamlStream:
+    """按文档切分后的 YAML 文本"""
+
+    def __init__(self, text, previous=None):
+        reuse = {}
+        if previous is not None:
+            for doc in previous.documents:
+                if doc.parsed:
+                    reuse.setdefault(doc.text, []).append(doc)
+        self.documents = []
+        for start, end in split_documents(text):
+            doc = YamlDocument(text[start:end], start)
+            same = reuse.get(doc.text)
+            if same:
+                doc.adopt(same.pop(0))  # 每个旧文档只沿用一次，相同的文档不共享数据
+            self.documents.append(doc)
+
+    @classmethod
+    def from_data(cls, data):
+        """用已有数据构造只有一个文档的流（没有原文，也没有位置表）"""
+        stream = cls('')
+        doc = stream.documents[0]
+        doc.parsed = True
+        doc.data = data
+        doc.spans_valid = True
+        return stream
+
+    def is_multi(self):
+        """是否包含多个文档"""
+        return len(self.documents) > 1
+
+    def source_span(self, doc_index, path):
+        """返回文档内路径对应标量在整个流中的 (起始, 结束, 是否位于流式集合中)，未知时返回 None"""
+        doc = self.documents[doc_index]
+        if not doc.parsed or doc.error is not None:
+            return None
+        spans = doc.ensure_spans()
+        span = spans.get(doc.source_path(path)) if spans else None
+        if span is None:
+            return None
+        return doc.start + span[0], doc.start + span[1], span[2]
+
+    def source_region(self, doc_index, path):
+        """返回路径对应节点在整个流中的位置：标量为其本身的位置，容器为其中第一个到
+        最后一个标量的范围；未知时返回 None"""
+        span = self.source_span(doc_index, path)
+        if span is not None:
+            return span[:2]
+        doc = self.documents[doc_index]
+        if not doc.parsed or doc.error is not None:
+            return None
+        spans = doc.ensure_spans()
+        if not spans:
+            return None
+        depth = len(path)
+        inside = [span for key_path, span in spans.items() if key_path[:depth] == path]
+        if not inside:
+            return None
+        return (doc.start + min(span[0] for span in inside),
+                doc.start + max(span[1] for span in inside))
+
+    def patch(self, doc_index, path, replacement):
+        """源文本中该标量被替换后，更新文档原文、文档内位置表和后续文档的起始位置"""
+        self.patch_many(doc_index, {path: replacement})
+
+    def patch_many(self, doc_index, replacements):
+        """源文本中一批标量 {路径: 新文本} 被替换后，一次更新文档原文和位置表"""
+        if not replacements:
+            return
+        doc = self.documents[doc_index]
+        spans = doc.spans
+        # 经过别名的路径替换的是锚点处的原文，同一处只替换一次
+        replacements = {doc.source_path(path): text for path, text in replacements.items()}
+        edits = sorted(((spans[path], path, text) for path, text in replacements.items()),
+                       key=lambda edit: edit[0])
+        pieces = []
+        position = 0
+        for (start, end, _), _, text in edits:
+            pieces.append(doc.text[position:start])
+            pieces.append(text)
+            position = end
+        pieces.append(doc.text[position:])
+        doc.text = ''.join(pieces)
+
+        # 每个位置按之前结束的被替换片段的长度变化累计平移
+        ends = [end for (_, end, _), _, _ in edits]
+        shifts = list(accumulate(len(text) - (end - start) for (start, end, _), _, text in edits))
+        if any(shifts):
+            for other, (s, e, flow) in spans.items():
+                count = bisect_right(ends, s)
+                if count:
+                    spans[other] = (s + shifts[count - 1], e + shifts[count - 1], flow)
+        for i, ((start, _, flow), path, text) in enumerate(edits):
+            start += shifts[i - 1] if i else 0
+            spans[path] = (start, start + len(text), flow)
+        if shifts[-1]:
+            for later in self.documents[doc_index + 1:]:
+                later.start += shifts[-1]
+
+    def _dump_documents(self):
+        """依次返回 (文档, 重新生成的文本)；已解析的文档按数据重新导出，
+        未解析或解析失败的文档保留原文，重新导出的文本为 None"""
+        for i, doc in enumerate(self.documents):
+            if doc.parsed and doc.error is None:
+                text = yaml_codec.dump(doc.data, anchors=doc.anchor_names(),
+                                       allow_unicode=True, sort_keys=False)
+                if i > 0 or doc.text.startswith('---'):
+                    text = '---\n' + text
+                yield doc, text
+            else:
+                yield doc, None
+
+    def to_text(self):
+        """重新生成整个流的文本（注释和格式不保留），不修改各文档的原文、起始位置和位置表"""
+        return ''.join(doc.text if text is None else text for doc, text in self._dump_documents())
+
+    def rewrite(self):
+        """重新生成整个流的文本，并把各文档的原文和起始位置改为新文本中的，
+        位置表在下次使用时重新生成。只能在编辑器的内容随之替换为返回的文本时调用。
+        """
+        parts = []
+        pos = 0
+        for doc, text in list(self._dump_documents()):
+            if text is not None:
+                doc.text = text
+                doc.spans_valid = False
+            doc.start = pos
+            pos += len(doc.text)
+            parts.append(doc.text)
+        return ''.join(parts)
+
+
+def parse_stream(text, previous=None, token=None):
+    """切分文本并返回 (YamlStream, 异常)
+
+    只有一个文档时立即解析（失败时返回异常）；多个文档时只切分，各文档在使用时再解析。
+    previous 是之前的解析结果，文本未变的文档沿用其中的数据；token 用于取消解析。
+    """
+    stream = YamlStream(text, previous)
+    if not stream.is_multi():
+        doc = stream.documents[0]
+        if not doc.parse(token):
+            return None, doc.error
+        doc.ensure_spans()
+    return stream, None